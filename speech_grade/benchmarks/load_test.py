@@ -0,0 +1,296 @@
+"""
+Load test of /analyze_video served by a single uvicorn worker.
+
+Starts the OpenAI stand-in (see openai_stand_in.py) and the app pointed at it,
+then sends videos of a mix of lengths at a fixed request rate, without waiting
+for earlier requests to finish. Every rate of --rates runs against a freshly
+started app with the result and LLM caches disabled, and reports the latency
+percentiles of successful requests, throughput, error rate, highest number of
+requests in flight and peak RSS of the app process.
+
+Usage: python benchmarks/load_test.py [--rates 0.05,0.1,0.2] [--requests 20]
+    [--video-sizes 30,60,120] [--chat-latency-s 1] [--transcription-latency-s 5]
+    [--jitter-s 0.5] [--rate-limit-ratio 0.05] [--output PATH]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import httpx
+import numpy as np
+from typing import Any, Dict, List
+from openai_stand_in import StandInServer
+from synthetic import synthetic_video
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def peak_rss_mb(pid: int) -> float:
+    """Peak resident set size of the process (VmHWM), 0 when it's gone."""
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except FileNotFoundError:
+        pass
+
+    return 0.0
+
+
+class ChildrenRssSampler:
+    """Samples the summed RSS of the app's child processes, eg. ffmpeg, and keeps the peak."""
+
+    def __init__(self, pid: int, interval_s: float = 0.2):
+        self.pid = pid
+        self.interval_s = interval_s
+        self.peak_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            self.peak_mb = max(self.peak_mb, self._children_rss_mb())
+
+    def _children_rss_mb(self) -> float:
+        rss_kb = 0
+        try:
+            for task in os.listdir(f"/proc/{self.pid}/task"):
+                with open(f"/proc/{self.pid}/task/{task}/children") as children:
+                    for child in children.read().split():
+                        rss_kb += _rss_kb(int(child))
+        except FileNotFoundError:
+            pass
+
+        return rss_kb / 1024
+
+
+def _rss_kb(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except FileNotFoundError:
+        pass
+
+    return 0
+
+
+def start_app(port: int, openai_base_url: str, cache_dir: str) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "OPENAI_BASE_URL": openai_base_url,
+        "OPENAI_API_KEY": "stand-in",
+        "SPEECH_GRADE_CACHE_PATH": os.path.join(cache_dir, "cache.sqlite"),
+        "SPEECH_GRADE_RESULT_CACHE": "0",
+        "SPEECH_GRADE_LLM_CACHE": "0",
+    }
+    # fmt: off
+    command = [
+        sys.executable, "-m", "uvicorn", "speech_grade.app:app",
+        "--host", "127.0.0.1", "--port", str(port), "--workers", "1",
+        "--log-level", "warning",
+    ]
+    # fmt: on
+
+    return subprocess.Popen(
+        command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+
+def wait_until_ready(url: str, process: subprocess.Popen, timeout_s: float = 120):
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"App exited with {process.returncode}")
+        try:
+            if httpx.get(f"{url}/metrics").status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.5)
+
+    raise TimeoutError(f"App at {url} didn't start in {timeout_s}s")
+
+
+async def send_requests(
+    url: str, videos: List[str], rate: float, requests: int, seed: int = 0
+) -> Dict[str, Any]:
+    """Send requests at rate per second with videos picked at random, return their outcomes."""
+    rng = np.random.default_rng(seed)
+    outcomes = []
+    in_flight = 0
+    max_in_flight = 0
+
+    async def send(client: httpx.AsyncClient, video_path: str):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+
+        started_at = time.perf_counter()
+        try:
+            with open(video_path, "rb") as video:
+                response = await client.post(
+                    f"{url}/analyze_video",
+                    files={"video": (os.path.basename(video_path), video, "video/mp4")},
+                )
+            status = response.status_code
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        finally:
+            in_flight -= 1
+
+        outcomes.append(
+            {
+                "video": os.path.basename(video_path),
+                "status": status,
+                "latency_s": time.perf_counter() - started_at,
+            }
+        )
+
+    started_at = time.perf_counter()
+    async with httpx.AsyncClient(timeout=None) as client:
+        tasks = []
+        for i in range(requests):
+            # Requests go out on schedule, however long the earlier ones take
+            await asyncio.sleep(max(0.0, started_at + i / rate - time.perf_counter()))
+            video_path = videos[rng.integers(len(videos))]
+            tasks.append(asyncio.create_task(send(client, video_path)))
+
+        await asyncio.gather(*tasks)
+
+    return {
+        "outcomes": outcomes,
+        "elapsed_s": time.perf_counter() - started_at,
+        "max_in_flight": max_in_flight,
+    }
+
+
+def summarize(run: Dict[str, Any], rate: float) -> Dict[str, Any]:
+    outcomes = run["outcomes"]
+    latencies = [o["latency_s"] for o in outcomes if o["status"] == 200]
+    statuses: Dict[str, int] = {}
+    for outcome in outcomes:
+        statuses[str(outcome["status"])] = statuses.get(str(outcome["status"]), 0) + 1
+
+    summary = {
+        "rate": rate,
+        "requests": len(outcomes),
+        "throughput_per_s": len(latencies) / run["elapsed_s"],
+        "error_rate": 1 - len(latencies) / len(outcomes) if outcomes else 0.0,
+        "statuses": statuses,
+        "max_in_flight": run["max_in_flight"],
+    }
+    if latencies:
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99]).tolist()
+        summary.update({"p50_s": p50, "p95_s": p95, "p99_s": p99})
+
+    return summary
+
+
+def parse_floats(value: str) -> List[float]:
+    return [float(item) for item in value.split(",") if item]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rates", type=parse_floats, default=[0.05, 0.1, 0.2])
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--video-sizes", type=parse_floats, default=[30, 60, 120])
+    parser.add_argument("--chat-latency-s", type=float, default=1.0)
+    parser.add_argument(
+        "--transcription-latency-s",
+        type=float,
+        default=5.0,
+        help="Time of transcribing a minute of audio",
+    )
+    parser.add_argument("--jitter-s", type=float, default=0.5)
+    parser.add_argument("--rate-limit-ratio", type=float, default=0.05)
+    parser.add_argument("--output", help="Path of the JSON results")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="speech_grade_load_test_")
+    stand_in = StandInServer(
+        chat_latency_s=args.chat_latency_s,
+        transcription_latency_s=args.transcription_latency_s,
+        jitter_s=args.jitter_s,
+        rate_limit_ratio=args.rate_limit_ratio,
+    )
+    stand_in.start_in_thread()
+
+    results = []
+    try:
+        videos = []
+        for duration_s in args.video_sizes:
+            video_path = os.path.join(work_dir, f"video_{duration_s:g}s.mp4")
+            synthetic_video(video_path, duration_s)
+            videos.append(video_path)
+
+        for rate in args.rates:
+            port = free_port()
+            url = f"http://127.0.0.1:{port}"
+            cache_dir = tempfile.mkdtemp(dir=work_dir)
+            stats_before = dict(stand_in.stats)
+
+            app = start_app(port, stand_in.base_url, cache_dir)
+            try:
+                wait_until_ready(url, app)
+                with ChildrenRssSampler(app.pid) as children:
+                    run = asyncio.run(send_requests(url, videos, rate, args.requests))
+                    summary = summarize(run, rate)
+                    summary["peak_rss_mb"] = peak_rss_mb(app.pid)
+                    summary["peak_children_rss_mb"] = children.peak_mb
+            finally:
+                app.terminate()
+                app.wait()
+
+            summary["stand_in"] = {
+                key: value - stats_before[key] for key, value in stand_in.stats.items()
+            }
+            results.append(summary)
+            print(json.dumps(summary))
+    finally:
+        stand_in.shutdown()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(
+        f"{'rate/s':>8} {'p50 s':>8} {'p95 s':>8} {'p99 s':>8} {'done/s':>8} "
+        f"{'errors':>7} {'flight':>7} {'rss MB':>8}"
+    )
+    for summary in results:
+        print(
+            f"{summary['rate']:>8.3f} {summary.get('p50_s', float('nan')):>8.2f} "
+            f"{summary.get('p95_s', float('nan')):>8.2f} "
+            f"{summary.get('p99_s', float('nan')):>8.2f} "
+            f"{summary['throughput_per_s']:>8.3f} {summary['error_rate']:>7.1%} "
+            f"{summary['max_in_flight']:>7} {summary['peak_rss_mb']:>8.0f}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump({"args": vars(args), "results": results}, output_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+Local OpenAI-compatible server standing in for the chat and transcription APIs.
+
+Chat completions are answered with stub_response (see stubs.py), transcriptions
+with synthetic words covering the uploaded audio. Every request waits latency
+plus a random jitter, and a share of them is rejected with 429 like a rate
+limited API. Point the app at it with OPENAI_BASE_URL=http://host:port/v1.
+
+Usage: python benchmarks/openai_stand_in.py [--port 8001] [--chat-latency-s 1]
+    [--transcription-latency-s 5] [--jitter-s 0.5] [--rate-limit-ratio 0.05]
+"""
+
+import argparse
+import email.parser
+import email.policy
+import json
+import subprocess
+import threading
+import time
+import numpy as np
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from stubs import stub_response
+from synthetic import FFMPEG_BINARY, synthetic_words
+
+
+class StandInServer(ThreadingHTTPServer):
+    """
+    The server, run it with serve_forever or start_in_thread.
+
+    :param chat_latency_s: Time a chat completion takes
+    :param transcription_latency_s: Time a transcription of a minute of audio takes
+    :param jitter_s: Maximum random time added to every request
+    :param rate_limit_ratio: Share of requests rejected with 429
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address=("127.0.0.1", 0),
+        chat_latency_s: float = 1.0,
+        transcription_latency_s: float = 5.0,
+        jitter_s: float = 0.5,
+        rate_limit_ratio: float = 0.0,
+        seed: int = 0,
+    ):
+        super().__init__(address, StandInHandler)
+        self.chat_latency_s = chat_latency_s
+        self.transcription_latency_s = transcription_latency_s
+        self.jitter_s = jitter_s
+        self.rate_limit_ratio = rate_limit_ratio
+
+        self.stats: Dict[str, int] = {"chat": 0, "transcription": 0, "rate_limited": 0}
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+
+        return f"http://{host}:{port}/v1"
+
+    def start_in_thread(self) -> threading.Thread:
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+
+        return thread
+
+    def count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def jitter(self) -> float:
+        with self._lock:
+            return float(self._rng.uniform(0, self.jitter_s))
+
+    def rate_limited(self) -> bool:
+        with self._lock:
+            return bool(self._rng.random() < self.rate_limit_ratio)
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: StandInServer
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        if self.server.rate_limited():
+            self.server.count("rate_limited")
+            time.sleep(self.server.jitter())
+            self._send_json(
+                429,
+                {"error": {"message": "Rate limit reached", "type": "requests"}},
+                {"retry-after-ms": "500"},
+            )
+            return
+
+        if self.path.endswith("/chat/completions"):
+            self._chat_completion(json.loads(body))
+        elif self.path.endswith("/audio/transcriptions"):
+            self._transcription(body)
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+    def _chat_completion(self, request: dict):
+        self.server.count("chat")
+        time.sleep(self.server.chat_latency_s + self.server.jitter())
+
+        texts = [_message_text(message) for message in request["messages"]]
+        try:
+            content = stub_response(texts[0], "\n".join(texts))
+        except ValueError as e:
+            self._send_json(400, {"error": {"message": str(e)}})
+            return
+
+        prompt_tokens = sum(len(text) for text in texts) // 4
+        completion_tokens = len(content) // 4
+        self._send_json(
+            200,
+            {
+                "id": "chatcmpl-stand-in",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "stand-in"),
+                "choices": [
+                    {
+                        "index": 0,
+                        "finish_reason": "stop",
+                        "message": {"role": "assistant", "content": content},
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            },
+        )
+
+    def _transcription(self, body: bytes):
+        self.server.count("transcription")
+
+        audio = _multipart_file(self.headers["Content-Type"], body)
+        duration_s = _audio_duration_s(audio) if audio else 0.0
+        time.sleep(
+            self.server.transcription_latency_s * duration_s / 60 + self.server.jitter()
+        )
+
+        words = synthetic_words(duration_s)
+        self._send_json(
+            200,
+            {
+                "task": "transcribe",
+                "language": "polish",
+                "duration": duration_s,
+                "text": " ".join(word.word for word in words),
+                "words": [word.model_dump() for word in words],
+            },
+        )
+
+    def _send_json(self, status: int, data: dict, headers: Optional[dict] = None):
+        payload = json.dumps(data).encode("utf-8")
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def _message_text(message: dict) -> str:
+    content = message.get("content") or ""
+    if isinstance(content, str):
+        return content
+
+    return "\n".join(part.get("text", "") for part in content)
+
+
+def _multipart_file(content_type: str, body: bytes) -> Optional[bytes]:
+    message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode("utf-8") + body
+    )
+    for part in message.iter_parts():
+        if part.get_param("name", header="content-disposition") == "file":
+            return part.get_payload(decode=True)
+
+    return None
+
+
+def _audio_duration_s(audio: bytes, sample_rate: int = 8000) -> float:
+    """Exact duration of the audio, decoded to mono PCM with ffmpeg."""
+    # fmt: off
+    command = [
+        FFMPEG_BINARY, "-v", "error", "-i", "pipe:0",
+        "-ac", "1", "-ar", str(sample_rate), "-f", "s16le", "pipe:1",
+    ]
+    # fmt: on
+    process = subprocess.run(command, input=audio, capture_output=True)
+
+    return len(process.stdout) / 2 / sample_rate
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--chat-latency-s", type=float, default=1.0)
+    parser.add_argument("--transcription-latency-s", type=float, default=5.0)
+    parser.add_argument("--jitter-s", type=float, default=0.5)
+    parser.add_argument("--rate-limit-ratio", type=float, default=0.05)
+    args = parser.parse_args()
+
+    server = StandInServer(
+        (args.host, args.port),
+        chat_latency_s=args.chat_latency_s,
+        transcription_latency_s=args.transcription_latency_s,
+        jitter_s=args.jitter_s,
+        rate_limit_ratio=args.rate_limit_ratio,
+    )
+    print(f"Serving at {server.base_url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Local, deterministic replacements of the OpenAI models for the benchmarks.
+
+StubChatModel answers every prompt with a JSON instance of the output schema
+found in the prompt's format instructions, so all chains parse its responses.
+install_stubs swaps it in for every chat model and a fixed word list in for
+the transcription.
+"""
+
+import asyncio
+import contextlib
+import json
+import re
+import time
+import zlib
+import numpy as np
+from typing import Any, Dict, List, Optional
+from unittest import mock
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from openai.types.audio import TranscriptionWord
+from speech_grade.pipeline import graph, llm
+
+SCHEMA_PATTERN = re.compile(r"```\n(\{.*\})\n```", re.DOTALL)
+
+
+def example_from_schema(
+    schema: Dict[str, Any], rng: np.random.Generator, defs: Dict[str, Any]
+) -> Any:
+    """Build a small instance of a JSON schema, enum values are picked with rng."""
+    if "$ref" in schema:
+        return example_from_schema(defs[schema["$ref"].split("/")[-1]], rng, defs)
+
+    if "enum" in schema:
+        return schema["enum"][rng.integers(len(schema["enum"]))]
+
+    schema_type = schema.get("type", "object")
+    if schema_type == "object":
+        return {
+            name: example_from_schema(property_schema, rng, defs)
+            for name, property_schema in schema.get("properties", {}).items()
+        }
+    if schema_type == "array":
+        return [
+            example_from_schema(schema.get("items", {}), rng, defs)
+            for _ in range(rng.integers(1, 4))
+        ]
+    if schema_type == "integer":
+        # Valid as a word id and as a frame index
+        return 1
+    if schema_type == "number":
+        return 1.0
+    if schema_type == "boolean":
+        return False
+
+    return "a"
+
+
+def stub_response(system_prompt: str, prompt: str) -> str:
+    """
+    JSON instance of the output schema in the system prompt, the same for the same prompt.
+
+    :param system_prompt: System message with the format instructions of the output parser
+    :param prompt: Whole prompt, seeds the choice of enum values
+    :return: Response of the model
+    """
+    match = SCHEMA_PATTERN.search(system_prompt)
+    if match is None:
+        raise ValueError("No output schema in the prompt")
+
+    schema = json.loads(match.group(1))
+    rng = np.random.default_rng(zlib.crc32(prompt.encode("utf-8")))
+
+    return json.dumps(
+        example_from_schema(schema, rng, schema.get("$defs", {})), ensure_ascii=False
+    )
+
+
+class StubChatModel(BaseChatModel):
+    """
+    Chat model answering with a JSON instance of the output schema in the prompt.
+
+    The response depends only on the prompt. Token usage is estimated from the
+    message lengths, so the usage and metrics callbacks see realistic numbers.
+    """
+
+    model_name: str = "stub"
+    latency_s: float = 0.0
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        time.sleep(self.latency_s)
+
+        return self._respond(messages)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        await asyncio.sleep(self.latency_s)
+
+        return self._respond(messages)
+
+    def _respond(self, messages: List[BaseMessage]) -> ChatResult:
+        self.calls += 1
+
+        prompt = "\n".join(str(message.content) for message in messages)
+        content = stub_response(str(messages[0].content), prompt)
+
+        return ChatResult(
+            generations=[ChatGeneration(message=AIMessage(content=content))],
+            llm_output={
+                "model_name": self.model_name,
+                "token_usage": {
+                    "prompt_tokens": len(prompt) // 4,
+                    "completion_tokens": len(content) // 4,
+                },
+            },
+        )
+
+
+@contextlib.contextmanager
+def install_stubs(words: List[TranscriptionWord], latency_s: float = 0.0):
+    """
+    Replace the chat models with a StubChatModel and the transcription with words.
+
+    The LLM response cache is disabled, so every run calls the stub.
+
+    :param words: Transcription returned for every audio file
+    :param latency_s: Time every model call takes
+    :return: The stub model, its calls attribute counts the model calls
+    """
+    model = StubChatModel(latency_s=latency_s)
+
+    def transcribe(*_args, **_kwargs):
+        return words
+
+    async def atranscribe(*_args, **_kwargs):
+        return words
+
+    with contextlib.ExitStack() as stack:
+        stack.enter_context(mock.patch.object(llm, "ChatOpenAI", lambda **_: model))
+        stack.enter_context(mock.patch.object(llm, "get_llm_cache", lambda: None))
+        for name in ["transcribe_audio", "transcribe_chunked"]:
+            stack.enter_context(mock.patch.object(graph, name, transcribe))
+        for name in ["atranscribe_audio", "atranscribe_chunked"]:
+            stack.enter_context(mock.patch.object(graph, name, atranscribe))
+
+        llm.get_chat_model.cache_clear()
+        llm.clear_chains()
+        try:
+            yield model
+        finally:
+            llm.get_chat_model.cache_clear()
+            llm.clear_chains()
@@ -0,0 +1,275 @@
+"""
+Benchmark suite of the pipeline stages and of the whole graph on synthetic inputs.
+
+Media stages run on rendered videos of every --media-sizes length, the
+transcript and event stages on synthetic data of every --sizes length. The
+graph runs on a video of --graph-size seconds with the chat models and the
+transcription replaced by the local stubs (see stubs.py), sync and async.
+
+Results are written as JSON. With --baseline, every benchmark is compared with
+the baseline results and the script exits with 1 when one of them got slower
+than --tolerance allows. Timings depend on the machine, so store a baseline
+per machine, eg.
+
+    python benchmarks/suite.py --output baseline.json
+    python benchmarks/suite.py --baseline baseline.json --output results.json
+
+Usage: python benchmarks/suite.py [--sizes 60,600,3600] [--media-sizes 60,300]
+    [--graph-size 60] [--repeats 3] [--only NAME] [--output PATH]
+    [--baseline PATH] [--tolerance 0.25]
+"""
+
+import argparse
+import asyncio
+import copy
+import datetime
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import traceback
+from typing import Any, Callable, Dict, List, Optional
+from speech_grade.convert_video_to_audio import extract_audio_from_mp4
+from speech_grade.pipeline.graph import build_graph
+from speech_grade.pipeline.tools.clarity_score import gunning_fog
+from speech_grade.pipeline.tools.disfluencies import (
+    find_filler_words,
+    find_repetitions,
+)
+from speech_grade.pipeline.tools.extract_images import extract_frames
+from speech_grade.pipeline.tools.format_transcription import format_transcription
+from speech_grade.pipeline.tools.media_ingest import ingest_media
+from speech_grade.pipeline.tools.pause_detection import detect_silences
+from speech_grade.pipeline.tools.speech_speed import speech_speed
+from speech_grade.pipeline.tools.volume_analisis import analyze_speech_volume
+from speech_grade.pipeline.transcript import Transcript
+from speech_grade.pipeline.utils import combine_overlapping_events
+from stubs import install_stubs
+from synthetic import (
+    synthetic_events,
+    synthetic_samples,
+    synthetic_video,
+    synthetic_words,
+)
+
+# Benchmarks faster than this are not compared, their timings are mostly noise
+MIN_COMPARED_S = 0.005
+
+
+def measure(
+    func: Callable[..., Any],
+    repeats: int,
+    setup: Optional[Callable[[], tuple]] = None,
+) -> Dict[str, Any]:
+    """
+    Time func over repeats runs, arguments come from setup which isn't timed.
+
+    :return: Median, minimum and maximum wall time, or the error of the first failed run
+    """
+    timings = []
+    for _ in range(repeats):
+        args = setup() if setup is not None else ()
+
+        started_at = time.perf_counter()
+        try:
+            func(*args)
+        except Exception as e:
+            traceback.print_exc()
+            return {"error": f"{type(e).__name__}: {e}"}
+        timings.append(time.perf_counter() - started_at)
+
+    return {
+        "median_s": statistics.median(timings),
+        "min_s": min(timings),
+        "max_s": max(timings),
+        "repeats": repeats,
+    }
+
+
+def media_benchmarks(duration_s: int, work_dir: str) -> Dict[str, Callable]:
+    video_path = os.path.join(work_dir, f"video_{duration_s}.mp4")
+    if not os.path.exists(video_path):
+        synthetic_video(video_path, duration_s)
+
+    audio_path = os.path.join(work_dir, "audio.mp3")
+
+    return {
+        f"extract_audio_from_mp4[{duration_s}s]": lambda: (
+            extract_audio_from_mp4(video_path, audio_path)
+        ),
+        f"extract_frames[{duration_s}s]": lambda: extract_frames(video_path),
+        f"ingest_media[{duration_s}s]": lambda: ingest_media(video_path, audio_path),
+    }
+
+
+def transcript_benchmarks(duration_s: int) -> Dict[str, tuple]:
+    """Benchmarks with a setup creating their arguments, name -> (func, setup)."""
+    words = synthetic_words(duration_s)
+    transcript = Transcript.from_words(words)
+    text = transcript.text()
+    events = synthetic_events(duration_s)
+
+    sample_rate = 16000
+    samples = synthetic_samples(duration_s, sample_rate)
+
+    return {
+        f"Transcript.from_words[{duration_s}s]": (
+            Transcript.from_words,
+            lambda: (words,),
+        ),
+        f"analyze_speech_volume[{duration_s}s]": (
+            analyze_speech_volume,
+            lambda: (samples, sample_rate, transcript),
+        ),
+        f"detect_silences[{duration_s}s]": (
+            detect_silences,
+            lambda: (samples, sample_rate),
+        ),
+        f"speech_speed[{duration_s}s]": (speech_speed, lambda: (transcript,)),
+        f"find_filler_words[{duration_s}s]": (
+            find_filler_words,
+            lambda: (transcript,),
+        ),
+        f"find_repetitions[{duration_s}s]": (
+            find_repetitions,
+            lambda: (transcript,),
+        ),
+        f"gunning_fog[{duration_s}s]": (gunning_fog, lambda: (text,)),
+        f"format_transcription[{duration_s}s]": (
+            format_transcription,
+            lambda: (transcript,),
+        ),
+        # It merges the events in place, so every run gets a fresh copy
+        f"combine_overlapping_events[{duration_s}s]": (
+            combine_overlapping_events,
+            lambda: (copy.deepcopy(events),),
+        ),
+    }
+
+
+def graph_benchmarks(duration_s: int, work_dir: str) -> Dict[str, Callable]:
+    video_path = os.path.join(work_dir, f"video_{duration_s}.mp4")
+    if not os.path.exists(video_path):
+        synthetic_video(video_path, duration_s)
+
+    def run(mode: str):
+        temp_dir = tempfile.mkdtemp(dir=work_dir)
+        state = {"temp_dir": temp_dir, "video_path": video_path, "events": []}
+        try:
+            graph = build_graph()
+            if mode == "async":
+                asyncio.run(graph.ainvoke(state))
+            else:
+                graph.invoke(state)
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    return {
+        f"graph_sync[{duration_s}s]": lambda: run("sync"),
+        f"graph_async[{duration_s}s]": lambda: run("async"),
+    }
+
+
+def compare(
+    results: Dict[str, Dict[str, Any]],
+    baseline: Dict[str, Dict[str, Any]],
+    tolerance: float,
+) -> List[str]:
+    """Print the change of every benchmark, return the names of the regressed ones."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None or "median_s" not in base or "median_s" not in result:
+            print(f"{name}: not compared")
+            continue
+
+        ratio = result["median_s"] / base["median_s"]
+        regressed = ratio > 1 + tolerance and result["median_s"] > MIN_COMPARED_S
+        print(
+            f"{name}: {base['median_s']:.4f}s -> {result['median_s']:.4f}s "
+            f"({ratio:.2f}x){' REGRESSION' if regressed else ''}"
+        )
+        if regressed:
+            regressions.append(name)
+
+    return regressions
+
+
+def parse_sizes(value: str) -> List[int]:
+    return [int(size) for size in value.split(",") if size]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=parse_sizes, default=[60, 600, 3600])
+    parser.add_argument("--media-sizes", type=parse_sizes, default=[60, 300])
+    parser.add_argument("--graph-size", type=int, default=60)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--only", help="Run only benchmarks with this in the name")
+    parser.add_argument("--output", help="Path of the JSON results")
+    parser.add_argument("--baseline", help="Path of the JSON results to compare with")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.25, help="Allowed slowdown, 0.25 is 25%%"
+    )
+    parser.add_argument("--model-latency-s", type=float, default=0.0)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="speech_grade_benchmarks_")
+    results: Dict[str, Dict[str, Any]] = {}
+
+    def run(name: str, func: Callable, setup: Optional[Callable] = None):
+        if args.only and args.only not in name:
+            return
+
+        results[name] = measure(func, args.repeats, setup)
+        print(f"{name}: {results[name]}")
+
+    try:
+        for duration_s in args.sizes:
+            for name, (func, setup) in transcript_benchmarks(duration_s).items():
+                run(name, func, setup)
+
+        for duration_s in args.media_sizes:
+            for name, func in media_benchmarks(duration_s, work_dir).items():
+                run(name, func)
+
+        words = synthetic_words(args.graph_size)
+        with install_stubs(words, latency_s=args.model_latency_s) as model:
+            for name, func in graph_benchmarks(args.graph_size, work_dir).items():
+                calls_before = model.calls
+                run(name, func)
+                if name in results:
+                    results[name]["model_calls"] = (model.calls - calls_before) // (
+                        args.repeats
+                    )
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    output = {
+        "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "args": vars(args),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(output, output_file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)["results"]
+
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} benchmarks regressed: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Synthetic inputs for the benchmarks: videos, transcripts and events of any length.
+
+Everything is generated from a seed, so the same arguments give the same data.
+"""
+
+import subprocess
+import numpy as np
+from typing import List
+from moviepy.config import get_setting
+from openai.types.audio import TranscriptionWord
+from speech_grade.pipeline.types import Event
+
+FFMPEG_BINARY = get_setting("FFMPEG_BINARY")
+
+# Common Polish words of various lengths, with a filler word
+VOCABULARY = [
+    "i",
+    "w",
+    "nie",
+    "się",
+    "na",
+    "to",
+    "jest",
+    "że",
+    "do",
+    "jak",
+    "ale",
+    "tak",
+    "yyy",
+    "bardzo",
+    "dzisiaj",
+    "chciałbym",
+    "powiedzieć",
+    "właśnie",
+    "rozwiązanie",
+    "przedsiębiorstwa",
+    "odpowiedzialność",
+]
+
+EVENT_TYPES = [
+    ("Słowa wypełniające", "#FFA500"),
+    ("Powtórzenia", "#4CAF50"),
+    ("Długa przerwa", "#03A9F4"),
+    ("Wysoki poziom głośności", "#F44336"),
+    ("Zła postawa / gestykulacja", "#9C27B0"),
+]
+
+
+def synthetic_video(
+    path: str,
+    duration_s: float,
+    fps: int = 30,
+    width: int = 640,
+    height: int = 360,
+    keyframe_interval_s: float = 2,
+):
+    """
+    Render an H.264/AAC video with a moving test pattern, and a tone with a changing
+    volume mixed with pink noise as the audio.
+
+    :param path: Path of the MP4 file to write
+    :param duration_s: Length of the video in seconds
+    :param fps: Frames per second
+    :param width: Width of the frames
+    :param height: Height of the frames
+    :param keyframe_interval_s: Time between keyframes (GOP length)
+    """
+    # fmt: off
+    command = [
+        FFMPEG_BINARY, "-v", "error", "-y",
+        "-f", "lavfi", "-i", f"testsrc2=size={width}x{height}:rate={fps}:duration={duration_s}",
+        "-f", "lavfi", "-i", f"sine=frequency=220:sample_rate=44100:duration={duration_s},volume='0.05+0.95*abs(sin(t/3))':eval=frame",
+        "-f", "lavfi", "-i", f"anoisesrc=color=pink:amplitude=0.05:sample_rate=44100:duration={duration_s}:seed=0",
+        "-filter_complex", "[1:a][2:a]amix=inputs=2:normalize=0[a]",
+        "-map", "0:v", "-map", "[a]",
+        "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p",
+        "-g", str(int(fps * keyframe_interval_s)),
+        "-c:a", "aac", "-shortest", path,
+    ]
+    # fmt: on
+
+    process = subprocess.run(command, stderr=subprocess.PIPE)
+    if process.returncode != 0:
+        raise RuntimeError(
+            f"ffmpeg failed to render {path}: {process.stderr.decode(errors='replace')}"
+        )
+
+
+def synthetic_samples(duration_s: int, sample_rate: int, seed: int = 0) -> np.ndarray:
+    """Mono int16 noise with a volume changing every second."""
+    rng = np.random.default_rng(seed)
+
+    gains = np.repeat(rng.uniform(50, 20000, duration_s), sample_rate)
+    samples = rng.standard_normal(duration_s * sample_rate) * gains
+
+    return np.clip(samples, -32768, 32767).astype(np.int16)
+
+
+def synthetic_words(duration_s: float, seed: int = 0) -> List[TranscriptionWord]:
+    """
+    Words from VOCABULARY at ~2.5 words per second, with sentences of ~12 words
+    ended with a period and an occasional long pause.
+    """
+    rng = np.random.default_rng(seed)
+
+    words = []
+    start = 0.0
+    while start < duration_s:
+        end = start + rng.uniform(0.1, 0.5)
+        word = VOCABULARY[rng.integers(len(VOCABULARY))]
+        if rng.random() < 1 / 12:
+            word += "."
+        words.append(TranscriptionWord(word=word, start=start, end=end))
+
+        pause_s = rng.uniform(1.5, 3) if rng.random() < 0.01 else rng.uniform(0, 0.2)
+        start = end + pause_s
+
+    return words
+
+
+def synthetic_events(duration_s: float, seed: int = 0) -> List[Event]:
+    """About one event of EVENT_TYPES every 2 seconds, many of them overlapping."""
+    rng = np.random.default_rng(seed)
+
+    events = []
+    for _ in range(int(duration_s / 2)):
+        start_s = float(rng.uniform(0, duration_s))
+        name, color = EVENT_TYPES[rng.integers(len(EVENT_TYPES))]
+        events.append(
+            Event(
+                start_s=start_s,
+                end_s=start_s + float(rng.uniform(0.2, 4)),
+                event=name,
+                description=name,
+                color=color,
+            )
+        )
+
+    return events
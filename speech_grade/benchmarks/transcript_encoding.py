@@ -0,0 +1,92 @@
+"""
+Size of the detect_audio_problems prompt with the verbose and compact transcript encodings.
+
+Renders the prompt for a synthetic transcript without calling the model and
+reports its length in characters and tokens, for the whole transcript and for
+the largest window sent in a single call.
+
+Usage: python benchmarks/transcript_encoding.py [--duration-s 3600] [--window-size 1500]
+"""
+
+import argparse
+import numpy as np
+from openai.types.audio import TranscriptionWord
+from speech_grade.pipeline.prompts import detect_audio_problems
+from speech_grade.pipeline.tokens import count_message_tokens
+from speech_grade.pipeline.transcript import Transcript
+
+# Common Polish words of various lengths
+VOCABULARY = [
+    "i",
+    "w",
+    "nie",
+    "się",
+    "na",
+    "to",
+    "jest",
+    "że",
+    "do",
+    "jak",
+    "ale",
+    "tak",
+    "bardzo",
+    "dzisiaj",
+    "chciałbym",
+    "powiedzieć",
+    "właśnie",
+    "rozwiązanie",
+    "przedsiębiorstwa",
+    "odpowiedzialność",
+]
+
+
+def synthetic_transcript(duration_s: float, seed: int = 0) -> Transcript:
+    """Random words from VOCABULARY at ~2.5 words per second."""
+    rng = np.random.default_rng(seed)
+
+    words = []
+    start = 0.0
+    while start < duration_s:
+        end = start + rng.uniform(0.1, 0.5)
+        word = VOCABULARY[rng.integers(len(VOCABULARY))]
+        words.append(TranscriptionWord(word=word, start=start, end=end))
+        start = end + rng.uniform(0, 0.2)
+
+    return Transcript.from_words(words)
+
+
+def prompt_size(transcript: Transcript, encoding: str):
+    prompt = detect_audio_problems._build_chain.__wrapped__().first
+    messages = prompt.invoke(
+        detect_audio_problems._chain_input(transcript, encoding)
+    ).to_messages()
+
+    chars = sum(len(message.content) for message in messages)
+
+    return chars, count_message_tokens(messages)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--duration-s", type=float, default=3600)
+    parser.add_argument("--window-size", type=int, default=1500)
+    args = parser.parse_args()
+
+    transcript = synthetic_transcript(args.duration_s)
+    window = transcript[: args.window_size]
+    print(f"{args.duration_s:.0f}s transcript, {len(transcript)} words")
+
+    for name, words in [("whole", transcript), ("window", window)]:
+        verbose_chars, verbose_tokens = prompt_size(words, "verbose")
+        compact_chars, compact_tokens = prompt_size(words, "compact")
+
+        print(
+            f"{name} ({len(words)} words): "
+            f"verbose {verbose_chars} chars / {verbose_tokens} tokens, "
+            f"compact {compact_chars} chars / {compact_tokens} tokens "
+            f"({verbose_tokens / compact_tokens:.1f}x fewer tokens)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Benchmark of the audio uploaded for transcription, per SPEECH_GRADE_TRANSCRIPTION_AUDIO_FORMAT.
+
+For a synthetic video of every --sizes length, compares the stereo MP3 written
+by moviepy (extract_audio_from_mp4), the MP3 written by the ingest pass, and
+the 16 kHz mono WAV, FLAC and Opus encoded in memory from the ingested PCM.
+Reports the extraction time (the ingest plus the in-memory encoding), the
+uploaded bytes, the upload time at --upload-mbps and the transcription
+latency against the local OpenAI stand-in (see openai_stand_in.py), which
+includes encoding, the upload and the stand-in decoding the file.
+
+Usage: python benchmarks/transcription_audio.py [--sizes 60,600] [--upload-mbps 20]
+    [--repeats 3]
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+from openai_stand_in import StandInServer
+from synthetic import synthetic_video
+from speech_grade.convert_video_to_audio import extract_audio_from_mp4
+from speech_grade.pipeline import llm
+from speech_grade.pipeline.tools.audio_chunks import (
+    AUDIO_FORMATS,
+    encode_audio,
+    max_chunk_s,
+)
+from speech_grade.pipeline.tools.media_ingest import ingest_media
+from speech_grade.transcription import transcribe_audio, transcribe_chunked
+
+
+def median_time(func: Callable[[], Any], repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        started_at = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started_at)
+
+    return statistics.median(timings)
+
+
+def compare_formats(
+    duration_s: int, work_dir: str, repeats: int
+) -> List[Dict[str, Any]]:
+    video_path = os.path.join(work_dir, f"video_{duration_s}.mp4")
+    synthetic_video(video_path, duration_s)
+    moviepy_path = os.path.join(work_dir, "moviepy.mp3")
+    ingest_path = os.path.join(work_dir, "ingest.mp3")
+
+    rows = []
+
+    def file_row(name: str, extract: Callable[[], Any], audio_path: str):
+        extraction_s = median_time(extract, repeats)
+        words = transcribe_audio(audio_path)
+        rows.append(
+            {
+                "format": name,
+                "extraction_s": extraction_s,
+                "upload_bytes": os.path.getsize(audio_path),
+                "transcription_s": median_time(
+                    lambda: transcribe_audio(audio_path), repeats
+                ),
+                "words": len(words or []),
+            }
+        )
+
+    file_row(
+        "moviepy mp3",
+        lambda: extract_audio_from_mp4(video_path, moviepy_path),
+        moviepy_path,
+    )
+    file_row("ingest mp3", lambda: ingest_media(video_path, ingest_path), ingest_path)
+
+    ingest_s = median_time(lambda: ingest_media(video_path, None), repeats)
+    samples, sample_rate, _ = ingest_media(video_path, None)
+    for audio_format in AUDIO_FORMATS:
+        encoding_s = median_time(
+            lambda: encode_audio(samples, sample_rate, audio_format), repeats
+        )
+        _, content, _ = encode_audio(samples, sample_rate, audio_format)
+
+        def transcribe():
+            # As with chunking disabled, a single chunk unless it exceeds an upload
+            return transcribe_chunked(
+                samples,
+                sample_rate,
+                chunk_s=min(duration_s + 1, max_chunk_s(audio_format, sample_rate)),
+                overlap_s=0,
+                audio_format=audio_format,
+            )
+
+        words = transcribe()
+        rows.append(
+            {
+                "format": f"pcm {audio_format}",
+                "extraction_s": ingest_s + encoding_s,
+                "upload_bytes": len(content),
+                "transcription_s": median_time(transcribe, repeats),
+                "words": len(words or []),
+            }
+        )
+
+    return rows
+
+
+def parse_sizes(value: str) -> List[int]:
+    return [int(size) for size in value.split(",") if size]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=parse_sizes, default=[60, 600])
+    parser.add_argument(
+        "--upload-mbps",
+        type=float,
+        default=20.0,
+        help="Upload bandwidth the upload times are computed for",
+    )
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    # No transcription latency, the stand-in time is spent on transferring and decoding
+    stand_in = StandInServer(chat_latency_s=0, transcription_latency_s=0, jitter_s=0)
+    stand_in.start_in_thread()
+    os.environ["OPENAI_BASE_URL"] = stand_in.base_url
+    os.environ["OPENAI_API_KEY"] = "stand-in"
+    llm.get_openai_client.cache_clear()
+
+    work_dir = tempfile.mkdtemp(prefix="speech_grade_transcription_audio_")
+    try:
+        print(
+            f"{'size':>6} {'format':<12} {'extract s':>10} {'upload kB':>10} "
+            f"{'upload s':>9} {'transcribe s':>13} {'words':>6}"
+        )
+        for duration_s in args.sizes:
+            for row in compare_formats(duration_s, work_dir, args.repeats):
+                upload_s = row["upload_bytes"] * 8 / (args.upload_mbps * 1e6)
+                print(
+                    f"{duration_s:>5}s {row['format']:<12} {row['extraction_s']:>10.3f} "
+                    f"{row['upload_bytes'] / 1000:>10.0f} {upload_s:>9.2f} "
+                    f"{row['transcription_s']:>13.3f} {row['words']:>6}"
+                )
+    finally:
+        stand_in.shutdown()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Benchmark of analyze_speech_volume on a synthetic track.
+
+Compares the current implementation with the previous per-word loop and with
+a cumulative sum-of-squares index over the whole track, and checks that all of
+them give the same results.
+
+Usage: python benchmarks/volume_analysis.py [--duration-s 3600]
+"""
+
+import argparse
+import time
+import numpy as np
+from openai.types.audio import TranscriptionWord
+from speech_grade.pipeline.tools.volume_analisis import analyze_speech_volume
+from speech_grade.pipeline.transcript import Transcript
+
+
+def synthetic_track(duration_s: float, sample_rate: int, seed: int = 0):
+    """Noise with a volume changing every second and a word every ~0.4s."""
+    rng = np.random.default_rng(seed)
+
+    gains = rng.uniform(50, 20000, int(np.ceil(duration_s)))
+    samples = (
+        rng.standard_normal(int(duration_s * sample_rate))
+        * np.repeat(gains, sample_rate)[: int(duration_s * sample_rate)]
+    )
+    samples = np.clip(samples, -32768, 32767).astype(np.int16)
+
+    words = []
+    start = 0.0
+    while start < duration_s:
+        end = start + rng.uniform(0.1, 0.5)
+        words.append(TranscriptionWord(word="słowo", start=start, end=end))
+        start = end + rng.uniform(0, 0.2)
+
+    return samples, words
+
+
+def analyze_speech_volume_loop(
+    samples, sample_rate, words, high_threshold_db=70, low_threshold_db=45
+):
+    """Previous implementation, computing the RMS of every word separately."""
+    high_volume_words = []
+    low_volume_words = []
+
+    volumes = []
+    volumes_timestamps = []
+
+    for word in words:
+        segment = samples[
+            int(word.start * sample_rate) : int(word.end * sample_rate)
+        ].astype(np.float64)
+
+        rms = np.sqrt(np.mean(segment**2)) if len(segment) > 0 else 0
+        db = 20 * np.log10(rms) if rms > 0 else -float("inf")
+
+        if db > high_threshold_db:
+            high_volume_words.append(word)
+        elif db < low_threshold_db:
+            low_volume_words.append(word)
+
+        volumes.append(db)
+        volumes_timestamps.append((word.start, word.end))
+
+    return high_volume_words, low_volume_words, volumes, volumes_timestamps
+
+
+def analyze_speech_volume_prefix_sum(
+    samples, sample_rate, words, high_threshold_db=70, low_threshold_db=45
+):
+    """Per-word energies taken from a cumulative sum-of-squares index."""
+    prefix = np.zeros(len(samples) + 1, dtype=np.int64)
+    np.square(samples, out=prefix[1:], dtype=np.int64)
+    np.cumsum(prefix, out=prefix)
+
+    starts = np.array([word.start for word in words])
+    ends = np.array([word.end for word in words])
+    start_indices = np.clip((starts * sample_rate).astype(np.int64), 0, len(samples))
+    end_indices = np.clip((ends * sample_rate).astype(np.int64), 0, len(samples))
+    end_indices = np.maximum(end_indices, start_indices)
+
+    lengths = end_indices - start_indices
+    energies = (prefix[end_indices] - prefix[start_indices]).astype(np.float64)
+    mean_squares = np.divide(
+        energies, lengths, out=np.zeros_like(energies), where=lengths > 0
+    )
+
+    db = np.full(len(words), -np.inf)
+    np.log10(mean_squares, out=db, where=mean_squares > 0)
+    db[mean_squares > 0] *= 10
+
+    high_volume_words = [w for w, high in zip(words, db > high_threshold_db) if high]
+    low_volume_words = [w for w, low in zip(words, db < low_threshold_db) if low]
+
+    return (
+        high_volume_words,
+        low_volume_words,
+        db.tolist(),
+        list(zip(starts.tolist(), ends.tolist())),
+    )
+
+
+def timed(func, *args):
+    started_at = time.perf_counter()
+    result = func(*args)
+
+    return result, time.perf_counter() - started_at
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--duration-s", type=float, default=3600)
+    parser.add_argument("--sample-rate", type=int, default=16000)
+    args = parser.parse_args()
+
+    samples, words = synthetic_track(args.duration_s, args.sample_rate)
+    print(f"{args.duration_s:.0f}s track, {len(samples)} samples, {len(words)} words")
+
+    loop_result, loop_s = timed(
+        analyze_speech_volume_loop, samples, args.sample_rate, words
+    )
+    print(f"loop:       {loop_s:.3f}s")
+
+    transcript = Transcript.from_words(words)
+    for name, func, func_input in [
+        ("prefix sum", analyze_speech_volume_prefix_sum, words),
+        ("current", analyze_speech_volume, transcript),
+    ]:
+        result, elapsed_s = timed(func, samples, args.sample_rate, func_input)
+
+        high_words, low_words = result[0], result[1]
+        if isinstance(high_words, Transcript):
+            high_words, low_words = high_words.to_words(), low_words.to_words()
+
+        assert high_words == loop_result[0] and low_words == loop_result[1]
+        assert np.allclose(result[2], loop_result[2])
+        assert result[3] == loop_result[3]
+
+        print(f"{name + ':':<12}{elapsed_s:.3f}s ({loop_s / elapsed_s:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,242 @@
-from fastapi import FastAPI, UploadFile, File
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Dict
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Tuple
+import asyncio
+import hashlib
+import json
+import shutil
 import time
-from speech_grade.pipeline.graph import build_graph
-from tempfile import TemporaryDirectory
 from dotenv import load_dotenv
-import os
 
+# python-multipart is imported as multipart before 0.0.13
+try:
+    from python_multipart import MultipartParser
+    from python_multipart.exceptions import FormParserError
+    from python_multipart.multipart import parse_options_header
+except ModuleNotFoundError:
+    from multipart import MultipartParser
+    from multipart.exceptions import FormParserError
+    from multipart.multipart import parse_options_header
+
+# Load the settings before importing modules which read them at import time
 load_dotenv()
 
+from speech_grade.pipeline.graph import build_graph, PIPELINE_VERSION
+from speech_grade.pipeline.usage import UsageCallbackHandler
+from speech_grade.pipeline.metrics import MetricsCallbackHandler
+from speech_grade.pipeline.trace import TraceCallbackHandler
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, generate_latest
+from speech_grade.disk_cache import DiskCache
+from speech_grade.jobs import Job, JobQueue, QueueFullError
+from tempfile import TemporaryDirectory, mkdtemp
+import os
+
 graph = build_graph()
-app = FastAPI()
+
+result_cache = DiskCache(
+    path=os.environ.get("SPEECH_GRADE_CACHE_PATH", ".cache/speech_grade.sqlite"),
+    namespace="analysis",
+    version=PIPELINE_VERSION,
+    ttl_s=float(os.environ.get("SPEECH_GRADE_RESULT_CACHE_TTL_S", 30 * 24 * 3600)),
+    max_bytes=int(os.environ.get("SPEECH_GRADE_RESULT_CACHE_MAX_BYTES", 512 * 2**20)),
+)
+RESULT_CACHE_ENABLED = os.environ.get("SPEECH_GRADE_RESULT_CACHE", "1") == "1"
+RESULT_CACHE_REQUESTS = Counter(
+    "speech_grade_result_cache_requests_total",
+    "Lookups of finished analyses by video hash",
+    ["result"],
+)
+
+MAX_UPLOAD_BYTES = int(os.environ.get("SPEECH_GRADE_MAX_UPLOAD_BYTES", 4 * 2**30))
+UPLOAD_PATHS = ("/analyze_video", "/analyze_video/stream", "/jobs")
+# The upload handlers parse the form themselves, so it's documented by hand
+UPLOAD_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {"video": {"type": "string", "format": "binary"}},
+                    "required": ["video"],
+                }
+            }
+        },
+    }
+}
+
+# Warn about LLM calls with more input tokens, 0 disables the warning
+PROMPT_TOKEN_BUDGET = int(os.environ.get("SPEECH_GRADE_PROMPT_TOKEN_BUDGET", 0))
+
+
+# Response field -> graph state key
+RESPONSE_FIELDS = {
+    "score": "clarity_score",
+    "detected_events": "events",
+    "transcription": "formatted_transcription",
+    "wpm_data": "words_per_minute",
+    "wpm_timestamps": "words_per_minute_timestamps",
+    "keywords": "keywords",
+    "target_audience": "target_group",
+    "sentiment": "sentiment",
+    "named_entities": "named_entities",
+    "fog_index": "fog_index",
+    "questions": "questions",
+    "volumes": "volumes",
+    "volumes_timestamps": "volumes_timestamps",
+    "readable_transcription": "readable_transcription",
+    "english_translation": "english_translation",
+    "suggestions": "suggestions",
+}
+
+
+def format_response(video_name: str, res: Dict) -> Dict:
+    return {
+        "video_name": video_name,
+        **{field: res[key] for field, key in RESPONSE_FIELDS.items()},
+        "creation_date": time.strftime("%Y-%m-%d"),
+    }
+
+
+def format_partial_response(update: Dict) -> Dict:
+    """Map a single node update to response fields, internal state keys are dropped."""
+    return {
+        field: update[key]
+        for field, key in RESPONSE_FIELDS.items()
+        if key in (update or {})
+    }
+
+
+def get_cached_response(video_md5: str) -> Optional[Dict]:
+    if not RESULT_CACHE_ENABLED:
+        return None
+
+    cached = result_cache.get(video_md5)
+    RESULT_CACHE_REQUESTS.labels(result="hit" if cached is not None else "miss").inc()
+
+    return json.loads(cached) if cached is not None else None
+
+
+def cache_response(video_md5: str, response: Dict):
+    if RESULT_CACHE_ENABLED:
+        result_cache.set(video_md5, json.dumps(response))
+
+
+def print_usage(video_name: str, usage: UsageCallbackHandler, started_at: float):
+    print(
+        f"Analyzed {video_name} in {time.perf_counter() - started_at:.2f}s, LLM usage:\n{usage.report()}"
+    )
+
+
+async def run_analysis(
+    video_name: str,
+    temp_dir: str,
+    video_path: str,
+    video_md5: str,
+    trace: bool = False,
+) -> Dict:
+    """
+    Analyze the video, or return the stored analysis of the same video.
+
+    With trace, the graph is always run and the response gets a "trace" field
+    with the timeline of the run in the Chrome trace event format.
+    """
+    cached_response = (
+        None if trace else await asyncio.to_thread(get_cached_response, video_md5)
+    )
+    if cached_response is not None:
+        return {**cached_response, "video_name": video_name}
+
+    usage = UsageCallbackHandler(prompt_token_budget=PROMPT_TOKEN_BUDGET)
+    callbacks = [usage, MetricsCallbackHandler()]
+    tracer = TraceCallbackHandler() if trace else None
+    if tracer is not None:
+        callbacks.append(tracer)
+
+    started_at = time.perf_counter()
+    res = await graph.ainvoke(
+        {"temp_dir": temp_dir, "video_path": video_path, "events": []},
+        {"callbacks": callbacks},
+    )
+    print_usage(video_name, usage, started_at)
+
+    response = format_response(video_name, res)
+    await asyncio.to_thread(cache_response, video_md5, response)
+
+    if tracer is not None:
+        return {**response, "trace": tracer.to_chrome_trace()}
+
+    return response
+
+
+def format_sse(event: str, data: Dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+
+async def stream_analysis(
+    video_name: str, temp_dir: str, video_path: str, video_md5: str
+) -> AsyncIterator[str]:
+    """
+    Run the graph and yield server-sent events as its nodes finish.
+
+    A "node" event is sent for every node update with the response fields it
+    produced ("detected_events" only holds the events added by that node), then
+    a single "result" event with the full response, or an "error" event.
+    """
+    try:
+        cached_response = await asyncio.to_thread(get_cached_response, video_md5)
+        if cached_response is not None:
+            yield format_sse("result", {**cached_response, "video_name": video_name})
+            return
+
+        usage = UsageCallbackHandler(prompt_token_budget=PROMPT_TOKEN_BUDGET)
+        started_at = time.perf_counter()
+        res = {}
+        async for mode, chunk in graph.astream(
+            {"temp_dir": temp_dir, "video_path": video_path, "events": []},
+            {"callbacks": [usage, MetricsCallbackHandler()]},
+            stream_mode=["updates", "values"],
+        ):
+            if mode == "values":
+                res = chunk
+                continue
+
+            for node, update in chunk.items():
+                partial_response = format_partial_response(update)
+                if partial_response:
+                    yield format_sse("node", {"node": node, **partial_response})
+        print_usage(video_name, usage, started_at)
+
+        response = format_response(video_name, res)
+        await asyncio.to_thread(cache_response, video_md5, response)
+
+        yield format_sse("result", response)
+    except Exception as e:
+        yield format_sse("error", {"detail": str(e)})
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+job_queue = JobQueue(
+    run_analysis,
+    workers=int(os.environ.get("SPEECH_GRADE_JOB_WORKERS", "2")),
+    max_queued=int(os.environ.get("SPEECH_GRADE_JOB_QUEUE_SIZE", "8")),
+    result_ttl_s=float(os.environ.get("SPEECH_GRADE_JOB_RESULT_TTL_S", "3600")),
+)
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    job_queue.start()
+    yield
+    await job_queue.stop()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Configure CORS to allow all origins
 app.add_middleware(
@@ -22,39 +248,255 @@ app.add_middleware(
 )
 
 
-@app.post("/analyze_video", response_model=Dict)
-async def analyze_video(video: UploadFile = File(...)):
-    video_name = video.filename or "unnamed_video"
+@app.middleware("http")
+async def reject_uploads_early(request: Request, call_next):
+    """
+    Refuse uploads before their body is received when they can't be processed anyway.
+
+    The size check relies on the Content-Length header. Uploads without it,
+    eg. with chunked transfer encoding, pass this check and are rejected with
+    413 by save_upload once the limit is crossed.
+    """
+    if request.method == "POST" and request.url.path in UPLOAD_PATHS:
+        content_length = request.headers.get("content-length")
+        if content_length is not None:
+            try:
+                too_large = int(content_length) > MAX_UPLOAD_BYTES
+            except ValueError:
+                return JSONResponse(
+                    status_code=400,
+                    content={"detail": "Invalid Content-Length header"},
+                )
+
+            if too_large:
+                return JSONResponse(
+                    status_code=413,
+                    content={
+                        "detail": f"Video is larger than {MAX_UPLOAD_BYTES} bytes"
+                    },
+                )
+
+        if request.url.path == "/jobs" and job_queue.is_full():
+            return JSONResponse(
+                status_code=429,
+                content={"detail": "Too many videos queued, try again later"},
+                headers={"Retry-After": "30"},
+            )
+
+    return await call_next(request)
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics of the graph nodes, LLM calls and caches."""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+@app.get("/analysis/{video_md5}", response_model=Dict)
+async def get_analysis(video_md5: str, video_name: Optional[str] = None):
+    """
+    Return a stored analysis for a video with the given MD5 without uploading it.
+
+    The stored video_name is the one of whoever uploaded the video first, so it's
+    replaced with the video_name query parameter or left out.
+    """
+    response = await asyncio.to_thread(get_cached_response, video_md5.lower())
+
+    if response is None:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+
+    response.pop("video_name", None)
+    if video_name is not None:
+        response["video_name"] = video_name
+
+    return response
+
+
+class _VideoPart:
+    """Callbacks of the multipart parser keeping the data of the video field."""
+
+    def __init__(self):
+        self.filename: Optional[str] = None
+        self.md5 = hashlib.md5()
+        self.size = 0
+        self._in_video = False
+        self._pending = []
+        self._header_name = b""
+        self._header_value = b""
+        self._disposition = b""
+
+    def callbacks(self) -> Dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+        }
+
+    def on_part_begin(self):
+        self._disposition = b""
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def on_header_end(self):
+        if self._header_name.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self._disposition)
+        # Only the first video file is kept, other fields are skipped
+        self._in_video = (
+            self.filename is None
+            and options.get(b"name") == b"video"
+            and b"filename" in options
+        )
+        if self._in_video:
+            self.filename = options[b"filename"].decode(errors="replace")
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if not self._in_video:
+            return
+
+        self.size += end - start
+        if self.size > MAX_UPLOAD_BYTES:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Video is larger than {MAX_UPLOAD_BYTES} bytes",
+            )
+
+        self._pending.append(data[start:end])
+
+    def on_part_end(self):
+        self._in_video = False
+
+    def flush(self, buffer):
+        for chunk in self._pending:
+            self.md5.update(chunk)
+            buffer.write(chunk)
+        self._pending.clear()
+
+
+async def save_upload(request: Request, video_path: str) -> Tuple[str, str]:
+    """
+    Stream the video field of the multipart form to video_path and return the
+    uploaded file name and the video's MD5.
+
+    The body is parsed as it arrives instead of being spooled by Starlette first,
+    so the video is written to disk once and memory use doesn't depend on its
+    size. Uploads above MAX_UPLOAD_BYTES are rejected with 413 as soon as the
+    limit is crossed, also when they come without Content-Length.
+    """
+    _, params = parse_options_header(request.headers.get("content-type"))
+    if b"boundary" not in params:
+        raise HTTPException(
+            status_code=400, detail="Expected a multipart/form-data body"
+        )
+
+    video = _VideoPart()
+    parser = MultipartParser(params[b"boundary"], video.callbacks())
+    try:
+        with open(video_path, "wb") as buffer:
+            async for chunk in request.stream():
+                parser.write(chunk)
+                await run_in_threadpool(video.flush, buffer)
+            parser.finalize()
+    except FormParserError:
+        raise HTTPException(status_code=400, detail="Invalid multipart data")
+
+    if video.filename is None:
+        raise HTTPException(status_code=422, detail="The video file is missing")
+
+    return video.filename or "unnamed_video", video.md5.hexdigest()
+
+
+@app.post("/analyze_video", response_model=Dict, openapi_extra=UPLOAD_REQUEST_BODY)
+async def analyze_video(request: Request, trace: bool = False):
+    """
+    Analyze the video, with ?trace=true the response includes a Chrome trace of
+    the run, which can be opened in chrome://tracing or ui.perfetto.dev.
+    """
     with TemporaryDirectory() as temp_dir:
         # Write the uploaded video to a temporary file
         video_path = f"{temp_dir}/video.mp4"
-        with open(video_path, "wb") as buffer:
-            buffer.write(video.file.read())
+        video_name, video_md5 = await save_upload(request, video_path)
 
-        res = graph.invoke(
-            {"temp_dir": temp_dir, "video_path": video_path, "events": []}
+        return await run_analysis(
+            video_name, temp_dir, video_path, video_md5, trace=trace
         )
 
-    return {
-        "video_name": video_name,
-        "score": res["clarity_score"],
-        "detected_events": res["events"],
-        "transcription": res["formatted_transcription"],
-        "wpm_data": res["words_per_minute"],
-        "wpm_timestamps": res["words_per_minute_timestamps"],
-        "keywords": res["keywords"],
-        "target_audience": res["target_group"],
-        "sentiment": res["sentiment"],
-        "named_entities": res["named_entities"],
-        "creation_date": time.strftime("%Y-%m-%d"),
-        "fog_index": res["fog_index"],
-        "questions": res["questions"],
-        "volumes": res["volumes"],
-        "volumes_timestamps": res["volumes_timestamps"],
-        "readable_transcription": res["readable_transcription"],
-        "english_translation": res["english_translation"],
-        "suggestions": res["suggestions"],
-    }
+
+@app.post("/analyze_video/stream", openapi_extra=UPLOAD_REQUEST_BODY)
+async def analyze_video_stream(request: Request):
+    """Analyze the video and push partial results as server-sent events."""
+
+    # The upload is closed once this handler returns, so store it before streaming
+    temp_dir = mkdtemp()
+    video_path = f"{temp_dir}/video.mp4"
+    try:
+        video_name, video_md5 = await save_upload(request, video_path)
+    except BaseException:
+        # Also on a disconnect or cancellation, stream_analysis never starts
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+
+    return StreamingResponse(
+        stream_analysis(video_name, temp_dir, video_path, video_md5),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post(
+    "/jobs", response_model=Job, status_code=202, openapi_extra=UPLOAD_REQUEST_BODY
+)
+async def submit_job(request: Request):
+    """Queue a video for analysis and return the job to poll at /jobs/{job_id}."""
+
+    # The directory outlives the request, the worker removes it when the job is done
+    temp_dir = mkdtemp()
+    video_path = f"{temp_dir}/video.mp4"
+    try:
+        video_name, video_md5 = await save_upload(request, video_path)
+        cached_response = await asyncio.to_thread(get_cached_response, video_md5)
+    except BaseException:
+        # Also on a disconnect or cancellation, nothing else would remove it
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+
+    if cached_response is not None:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        return job_queue.add_finished(
+            video_name, {**cached_response, "video_name": video_name}
+        )
+
+    try:
+        return job_queue.submit(video_name, temp_dir, video_path, video_md5)
+    except QueueFullError:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise HTTPException(
+            status_code=429,
+            detail="Too many videos queued, try again later",
+            headers={"Retry-After": "30"},
+        )
+
+
+@app.get("/jobs/{job_id}", response_model=Job)
+async def get_job(job_id: str):
+    job = job_queue.get(job_id)
+
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return job
 
 
 if __name__ == "__main__":
@@ -0,0 +1,170 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+
+class DiskCache:
+    """
+    Persistent key-value cache stored in a SQLite file.
+
+    Entries are grouped by namespace and tagged with a version. Entries written
+    under a different version are misses but stay stored, so processes running
+    different versions during a deploy can share the file. Entries older than
+    ttl_s are treated as misses and the least recently used entries, of any
+    version, are evicted once the namespace grows above max_bytes.
+
+    :param path: Path to the SQLite file (created if it doesn't exist)
+    :param namespace: Name separating this cache from others stored in the same file
+    :param version: Version tag, changing it invalidates all stored entries
+    :param ttl_s: Time to live of an entry in seconds (None means no expiry)
+    :param max_bytes: Maximum total size of stored values (None means unbounded)
+    """
+
+    def __init__(
+        self,
+        path: str,
+        namespace: str,
+        version: str,
+        ttl_s: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+    ):
+        self.path = path
+        self.namespace = namespace
+        self.version = version
+        self.ttl_s = ttl_s
+        self.max_bytes = max_bytes
+
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+
+        with self._lock, self._connection:
+            self._connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cache (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    version TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+                """
+            )
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                "SELECT value, created_at FROM cache WHERE namespace = ? AND key = ? AND version = ?",
+                (self.namespace, key, self.version),
+            ).fetchone()
+
+            if row is not None and self._is_expired(row[1], now):
+                self._connection.execute(
+                    "DELETE FROM cache WHERE namespace = ? AND key = ?",
+                    (self.namespace, key),
+                )
+                row = None
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self._connection.execute(
+                "UPDATE cache SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                (now, self.namespace, key),
+            )
+            self.hits += 1
+
+            return row[0]
+
+    def set(self, key: str, value: str):
+        now = time.time()
+        size = len(value.encode("utf-8"))
+
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (self.namespace, key, self.version, value, size, now, now),
+            )
+            self._evict(now)
+
+    def delete(self, key: str):
+        with self._lock, self._connection:
+            self._connection.execute(
+                "DELETE FROM cache WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            )
+
+    def clear(self):
+        with self._lock, self._connection:
+            self._connection.execute(
+                "DELETE FROM cache WHERE namespace = ?", (self.namespace,)
+            )
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            entries, total_bytes = self._connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache WHERE namespace = ?",
+                (self.namespace,),
+            ).fetchone()
+
+        return {
+            "entries": entries,
+            "bytes": total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def _is_expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_s is not None and now - created_at > self.ttl_s
+
+    def _evict(self, now: float):
+        if self.ttl_s is not None:
+            self._connection.execute(
+                "DELETE FROM cache WHERE namespace = ? AND created_at < ?",
+                (self.namespace, now - self.ttl_s),
+            )
+
+        if self.max_bytes is None:
+            return
+
+        (total_bytes,) = self._connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM cache WHERE namespace = ?",
+            (self.namespace,),
+        ).fetchone()
+
+        if total_bytes <= self.max_bytes:
+            return
+
+        # Drop least recently used entries until we fit into the budget
+        rows = self._connection.execute(
+            "SELECT key, size FROM cache WHERE namespace = ? ORDER BY accessed_at ASC",
+            (self.namespace,),
+        ).fetchall()
+
+        evicted_keys = []
+        for key, size in rows:
+            if total_bytes <= self.max_bytes:
+                break
+            evicted_keys.append((self.namespace, key))
+            total_bytes -= size
+
+        self._connection.executemany(
+            "DELETE FROM cache WHERE namespace = ? AND key = ?", evicted_keys
+        )
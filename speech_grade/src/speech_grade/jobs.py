@@ -0,0 +1,162 @@
+import asyncio
+import shutil
+import time
+import traceback
+import uuid
+from typing import Awaitable, Callable, Dict, List, Literal, Optional
+from typing_extensions import TypedDict
+
+
+class Job(TypedDict):
+    job_id: str
+    status: Literal["queued", "running", "done", "failed"]
+    video_name: str
+    created_at: float
+    finished_at: Optional[float]
+    result: Optional[Dict]
+    error: Optional[str]
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class JobQueue:
+    """
+    Runs analysis jobs in a fixed number of asyncio workers behind a bounded queue.
+
+    Every job owns a temporary directory holding the uploaded video, it is removed
+    once the job finishes. Finished jobs are kept for result_ttl_s seconds so that
+    clients can fetch their results.
+
+    :param run: Coroutine function called with (video_name, temp_dir, video_path, video_md5)
+    :param workers: Number of jobs processed at the same time
+    :param max_queued: Number of jobs waiting for a worker before submit is rejected
+    :param result_ttl_s: How long finished jobs are kept
+    """
+
+    def __init__(
+        self,
+        run: Callable[[str, str, str, str], Awaitable[Dict]],
+        workers: int = 2,
+        max_queued: int = 8,
+        result_ttl_s: float = 3600,
+    ):
+        self.run = run
+        self.workers = workers
+        self.result_ttl_s = result_ttl_s
+
+        self.jobs: Dict[str, Job] = {}
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queued)
+        self._worker_tasks: List[asyncio.Task] = []
+
+    def start(self):
+        for _ in range(self.workers):
+            self._worker_tasks.append(asyncio.create_task(self._worker()))
+
+    async def stop(self):
+        """
+        Cancel the workers and fail the jobs they haven't finished.
+
+        Running jobs are cancelled and queued ones are dropped, both are marked
+        as failed and their temporary directories are removed.
+        """
+        for task in self._worker_tasks:
+            task.cancel()
+
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+
+        while not self._queue.empty():
+            job, temp_dir, _, _ = self._queue.get_nowait()
+            job["error"] = "Server shut down before the job started"
+            job["status"] = "failed"
+            job["finished_at"] = time.time()
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            self._queue.task_done()
+
+    def is_full(self) -> bool:
+        return self._queue.full()
+
+    def submit(
+        self, video_name: str, temp_dir: str, video_path: str, video_md5: str
+    ) -> Job:
+        self._expire_jobs()
+
+        job = Job(
+            job_id=uuid.uuid4().hex,
+            status="queued",
+            video_name=video_name,
+            created_at=time.time(),
+            finished_at=None,
+            result=None,
+            error=None,
+        )
+
+        try:
+            self._queue.put_nowait((job, temp_dir, video_path, video_md5))
+        except asyncio.QueueFull:
+            raise QueueFullError("Job queue is full")
+
+        self.jobs[job["job_id"]] = job
+
+        return job
+
+    def add_finished(self, video_name: str, result: Dict) -> Job:
+        """Register a job which result is already known (eg. cached), it never enters the queue."""
+        self._expire_jobs()
+
+        now = time.time()
+        job = Job(
+            job_id=uuid.uuid4().hex,
+            status="done",
+            video_name=video_name,
+            created_at=now,
+            finished_at=now,
+            result=result,
+            error=None,
+        )
+        self.jobs[job["job_id"]] = job
+
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self._expire_jobs()
+
+        return self.jobs.get(job_id)
+
+    async def _worker(self):
+        while True:
+            job, temp_dir, video_path, video_md5 = await self._queue.get()
+
+            job["status"] = "running"
+            try:
+                job["result"] = await self.run(
+                    job["video_name"], temp_dir, video_path, video_md5
+                )
+                job["status"] = "done"
+            except asyncio.CancelledError:
+                job["error"] = "Server shut down before the job finished"
+                job["status"] = "failed"
+                raise
+            except Exception as e:
+                traceback.print_exc()
+                job["error"] = str(e)
+                job["status"] = "failed"
+            finally:
+                job["finished_at"] = time.time()
+                shutil.rmtree(temp_dir, ignore_errors=True)
+                self._queue.task_done()
+
+    def _expire_jobs(self):
+        now = time.time()
+
+        expired_ids = [
+            job_id
+            for job_id, job in self.jobs.items()
+            if job["finished_at"] is not None
+            and now - job["finished_at"] > self.result_ttl_s
+        ]
+
+        for job_id in expired_ids:
+            del self.jobs[job_id]
@@ -1,42 +1,96 @@
-from typing import TypedDict, Annotated, List, Tuple
-from openai.types.audio import TranscriptionWord
-from speech_grade.transcription import transcribe_audio
-from speech_grade.convert_video_to_audio import extract_audio_from_mp4
+from typing import TypedDict, Annotated, List, Optional, Tuple
+import numpy as np
+from speech_grade.transcription import (
+    transcribe_audio,
+    atranscribe_audio,
+    transcribe_chunked,
+    atranscribe_chunked,
+)
 import os
-from speech_grade.pipeline.types import Event, TranscriptionSentence
+from speech_grade.pipeline.types import Event, Frame, TranscriptionSentence
+from speech_grade.pipeline.transcript import Transcript
 import operator
 from speech_grade.pipeline.tools.clarity_score import clarity_score, gunning_fog
-from speech_grade.pipeline.prompts.extract_keywords import extract_keywords
-from speech_grade.pipeline.prompts.classify_sentiment import classify_sentiment
-from speech_grade.pipeline.prompts.ner import extract_named_entities
+from speech_grade.pipeline.prompts.extract_keywords import (
+    extract_keywords,
+    aextract_keywords,
+)
+from speech_grade.pipeline.prompts.classify_sentiment import (
+    classify_sentiment,
+    aclassify_sentiment,
+)
+from speech_grade.pipeline.prompts.ner import (
+    extract_named_entities,
+    aextract_named_entities,
+)
 from speech_grade.pipeline.tools.volume_analisis import analyze_speech_volume
 from speech_grade.pipeline.utils import filter_out_short_events
-from speech_grade.pipeline.tools.extract_images import extract_frames
-from speech_grade.pipeline.prompts.classify_images import classify_image
+from speech_grade.pipeline.tools.media_ingest import ingest_media, probe_duration_s
+from speech_grade.pipeline.tools.audio_chunks import AUDIO_FORMATS, max_chunk_s
+from speech_grade.pipeline.tools.dedupe_frames import dedupe_frames
+from speech_grade.pipeline.prompts.classify_images import (
+    classify_image,
+    aclassify_image,
+    classify_images,
+    aclassify_images,
+)
 from langgraph.types import Send
 from langgraph.pregel import RetryPolicy
-from speech_grade.pipeline.prompts.translate_to_english import translate_to_english
+from speech_grade.pipeline.prompts.translate_to_english import (
+    translate_to_english,
+    atranslate_to_english,
+)
 from speech_grade.pipeline.tools.speech_speed import speech_speed
-from speech_grade.pipeline.prompts.extract_target_group import extract_target_group
-from speech_grade.pipeline.prompts.generate_questions import generate_questions
+from speech_grade.pipeline.prompts.extract_target_group import (
+    extract_target_group,
+    aextract_target_group,
+)
+from speech_grade.pipeline.prompts.generate_questions import (
+    generate_questions,
+    agenerate_questions,
+)
 
 from typing_extensions import TypedDict
 from speech_grade.pipeline.utils import combine_overlapping_events
 
 from langgraph.graph import StateGraph, START, END
-from speech_grade.pipeline.prompts.detect_audio_problems import detect_audio_problems
+from speech_grade.pipeline.prompts.detect_audio_problems import (
+    detect_audio_problems,
+    adetect_audio_problems,
+    check_window_settings,
+    class_colors,
+    class_pl_names,
+    class_pl_problem_description,
+)
+from speech_grade.pipeline.tools.pause_detection import detect_silences
+from speech_grade.pipeline.tools.disfluencies import (
+    find_filler_words,
+    find_repetitions,
+)
 from speech_grade.pipeline.tools.format_transcription import format_transcription
 from speech_grade.pipeline.prompts.convert_transcript_to_text import (
     convert_transcript_to_text,
+    aconvert_transcript_to_text,
 )
-from speech_grade.pipeline.prompts.generate_suggestions import generate_suggestions
+from speech_grade.pipeline.prompts.generate_suggestions import (
+    generate_suggestions,
+    agenerate_suggestions,
+)
+from speech_grade.pipeline.prompts.analyze_transcript import (
+    TranscriptAnalysis,
+    analyze_transcript,
+    aanalyze_transcript,
+)
+from langchain_core.runnables import RunnableLambda
 
 
 class State(TypedDict):
     temp_dir: str
     video_path: str
-    audio_path: str
-    transcription_words: List[TranscriptionWord]
+    audio_path: Optional[str]
+    audio_samples: np.ndarray
+    audio_sample_rate: int
+    transcript: Transcript
     formatted_transcription: List[TranscriptionSentence]
     readable_transcription: str
     events: Annotated[List[Event], operator.add]
@@ -48,7 +102,8 @@ class State(TypedDict):
     sentiment: str
     target_group: str
     named_entities: List[str]
-    frames_dir_path: str
+    frames: List[Frame]
+    deduplicated_frames: List[Frame]
     place_holder: Annotated[List[str], operator.add]
     fog_index: int
     questions: List[str]
@@ -60,22 +115,169 @@ class State(TypedDict):
 
 DEFAULT_RETRY_POLICY = RetryPolicy(max_attempts=3, backoff_factor=2)
 
+FRAME_SAMPLING = os.environ.get("SPEECH_GRADE_FRAME_SAMPLING", "auto")
+# Negative value disables the deduplication
+FRAME_DEDUP_DISTANCE = int(os.environ.get("SPEECH_GRADE_FRAME_DEDUP_DISTANCE", "6"))
+# Number of frames sent to the vision model in a single request
+FRAME_BATCH_SIZE = max(1, int(os.environ.get("SPEECH_GRADE_FRAME_BATCH_SIZE", "1")))
+
+# "mp3" uploads the MP3 written by the ingest, "wav", "flac" or "opus" skip it
+# and upload 16 kHz mono audio encoded in memory from the decoded PCM
+TRANSCRIPTION_AUDIO_FORMAT = os.environ.get(
+    "SPEECH_GRADE_TRANSCRIPTION_AUDIO_FORMAT", "mp3"
+)
+if TRANSCRIPTION_AUDIO_FORMAT not in ["mp3", *AUDIO_FORMATS]:
+    raise ValueError(
+        "SPEECH_GRADE_TRANSCRIPTION_AUDIO_FORMAT supports only"
+        f" {', '.join(['mp3', *AUDIO_FORMATS])}"
+    )
+# Audio longer than this is transcribed in chunks cut at silences, 0 disables
+# chunking, then audio encoded from the PCM is cut only to fit in an upload
+TRANSCRIPTION_CHUNK_S = float(
+    os.environ.get("SPEECH_GRADE_TRANSCRIPTION_CHUNK_S", "600")
+)
+TRANSCRIPTION_CHUNK_OVERLAP_S = float(
+    os.environ.get("SPEECH_GRADE_TRANSCRIPTION_CHUNK_OVERLAP_S", "2")
+)
+# Long audio with the MP3 format is cut from the PCM, its chunks go as WAV
+TRANSCRIPTION_CHUNK_FORMAT = (
+    TRANSCRIPTION_AUDIO_FORMAT if TRANSCRIPTION_AUDIO_FORMAT != "mp3" else "wav"
+)
+# Longest chunk which fits in an upload with the overlap on both sides, the
+# ingest decodes the audio at 16 kHz
+TRANSCRIPTION_MAX_CHUNK_S = (
+    max_chunk_s(TRANSCRIPTION_CHUNK_FORMAT, 16000) - 2 * TRANSCRIPTION_CHUNK_OVERLAP_S
+)
+if TRANSCRIPTION_CHUNK_S > TRANSCRIPTION_MAX_CHUNK_S:
+    raise ValueError(
+        f"SPEECH_GRADE_TRANSCRIPTION_CHUNK_S can be at most"
+        f" {TRANSCRIPTION_MAX_CHUNK_S:.0f} for {TRANSCRIPTION_CHUNK_FORMAT} chunks,"
+        " the transcription API takes files up to 25 MB"
+    )
+TRANSCRIPTION_MAX_CONCURRENCY = int(
+    os.environ.get("SPEECH_GRADE_TRANSCRIPTION_MAX_CONCURRENCY", "4")
+)
+
+# Transcripts longer than this are analyzed for audio problems in overlapping windows
+AUDIO_PROBLEMS_WINDOW_SIZE = int(
+    os.environ.get("SPEECH_GRADE_AUDIO_PROBLEMS_WINDOW_SIZE", "1500")
+)
+AUDIO_PROBLEMS_WINDOW_OVERLAP = int(
+    os.environ.get("SPEECH_GRADE_AUDIO_PROBLEMS_WINDOW_OVERLAP", "100")
+)
+check_window_settings(AUDIO_PROBLEMS_WINDOW_SIZE, AUDIO_PROBLEMS_WINDOW_OVERLAP)
+AUDIO_PROBLEMS_MAX_CONCURRENCY = int(
+    os.environ.get("SPEECH_GRADE_AUDIO_PROBLEMS_MAX_CONCURRENCY", "4")
+)
+
+# Problem classes found by local detectors instead of the LLM, comma separated
+LOCAL_DETECTORS = ["long_pause", "filler_words", "repetitions"]
+LOCAL_AUDIO_PROBLEMS = [
+    name
+    for name in os.environ.get("SPEECH_GRADE_LOCAL_AUDIO_PROBLEMS", "").split(",")
+    if name
+]
+if set(LOCAL_AUDIO_PROBLEMS) - set(LOCAL_DETECTORS):
+    raise ValueError(
+        f"SPEECH_GRADE_LOCAL_AUDIO_PROBLEMS supports only {', '.join(LOCAL_DETECTORS)}"
+    )
+
+# How word ids are rendered in prompts, "compact" uses sparse id markers
+TRANSCRIPT_ENCODING = os.environ.get("SPEECH_GRADE_TRANSCRIPT_ENCODING", "verbose")
+
+# Get keywords, sentiment, target group, named entities and questions from a single LLM call
+FUSED_TRANSCRIPT_ANALYSIS = (
+    os.environ.get("SPEECH_GRADE_FUSED_TRANSCRIPT_ANALYSIS", "0") == "1"
+)
+
+# Bump whenever the graph output changes, cached results of older versions are dropped
+PIPELINE_VERSION = "4"
+
+
+def _ingest_audio_path(state: State) -> Optional[str]:
+    """Path of the MP3 written by the ingest, None when it wouldn't be uploaded."""
+    if TRANSCRIPTION_AUDIO_FORMAT != "mp3":
+        return None
+
+    # Long audio is transcribed in chunks cut from the PCM, the MP3 would go unused.
+    # A wrong guess only costs time, _transcribe_from_samples decides on the PCM.
+    if TRANSCRIPTION_CHUNK_S > 0:
+        duration_s = probe_duration_s(state["video_path"])
+        if duration_s is not None and duration_s > TRANSCRIPTION_CHUNK_S:
+            return None
+
+    return os.path.join(state["temp_dir"], "audio.mp3")
+
+
+def step_ingest_media(state: State) -> State:
+    audio_path = _ingest_audio_path(state)
+
+    audio_samples, audio_sample_rate, frames = ingest_media(
+        state["video_path"], audio_path, frame_sampling=FRAME_SAMPLING
+    )
+
+    return {
+        "audio_path": audio_path,
+        "audio_samples": audio_samples,
+        "audio_sample_rate": audio_sample_rate,
+        "frames": frames,
+    }
+
+
+def to_transcript(words) -> Transcript:
+    # Failed transcription is passed on as None, same as the words
+    return Transcript.from_words(words) if words is not None else None
 
-def step_extract_audio(state: State) -> State:
-    audio_path = os.path.join(state["temp_dir"], "audio.mp3")
-    extract_audio_from_mp4(state["video_path"], audio_path)
 
-    return {"audio_path": audio_path}
+def _transcribe_from_samples(state: State) -> bool:
+    """Upload audio encoded from the PCM instead of the MP3 file, in chunks when long."""
+    duration_s = len(state["audio_samples"]) / state["audio_sample_rate"]
+
+    return state.get("audio_path") is None or 0 < TRANSCRIPTION_CHUNK_S < duration_s
+
+
+def _chunked_transcription_args(state: State) -> dict:
+    return {
+        "samples": state["audio_samples"],
+        "sample_rate": state["audio_sample_rate"],
+        # With chunking disabled the chunks are as long as an upload allows
+        "chunk_s": TRANSCRIPTION_CHUNK_S or TRANSCRIPTION_MAX_CHUNK_S,
+        "overlap_s": TRANSCRIPTION_CHUNK_OVERLAP_S,
+        "max_concurrency": TRANSCRIPTION_MAX_CONCURRENCY,
+        "audio_format": TRANSCRIPTION_CHUNK_FORMAT,
+    }
 
 
 def step_transcribe_audio(state: State) -> State:
-    return {"transcription_words": transcribe_audio(state["audio_path"])}
+    if _transcribe_from_samples(state):
+        words = transcribe_chunked(**_chunked_transcription_args(state))
+    else:
+        words = transcribe_audio(state["audio_path"])
+
+    return {"transcript": to_transcript(words)}
+
+
+async def astep_transcribe_audio(state: State) -> State:
+    if _transcribe_from_samples(state):
+        words = await atranscribe_chunked(**_chunked_transcription_args(state))
+    else:
+        words = await atranscribe_audio(state["audio_path"])
+
+    return {"transcript": to_transcript(words)}
 
 
 def step_convert_transcript_to_text(state: State) -> State:
     return {
         "readable_transcription": convert_transcript_to_text(
-            state["transcription_words"]
+            state["transcript"], TRANSCRIPT_ENCODING
+        )
+    }
+
+
+async def astep_convert_transcript_to_text(state: State) -> State:
+    return {
+        "readable_transcription": await aconvert_transcript_to_text(
+            state["transcript"], TRANSCRIPT_ENCODING
         )
     }
 
@@ -86,44 +288,129 @@ def step_translate_to_english(state: State) -> State:
     }
 
 
+async def astep_translate_to_english(state: State) -> State:
+    return {
+        "english_translation": await atranslate_to_english(
+            state["readable_transcription"]
+        )
+    }
+
+
 def step_detect_audio_problems(state: State) -> State:
-    events = detect_audio_problems(state["transcription_words"])
+    events = detect_audio_problems(
+        state["transcript"],
+        window_size=AUDIO_PROBLEMS_WINDOW_SIZE,
+        window_overlap=AUDIO_PROBLEMS_WINDOW_OVERLAP,
+        max_concurrency=AUDIO_PROBLEMS_MAX_CONCURRENCY,
+        encoding=TRANSCRIPT_ENCODING,
+        exclude_classes=LOCAL_AUDIO_PROBLEMS,
+    )
 
     return {"events": events}
 
 
-def step_extract_frames(state: State) -> State:
-    frames_dir_path = os.path.join(state["temp_dir"], "frames")
-    extract_frames(state["video_path"], frames_dir_path)
+async def astep_detect_audio_problems(state: State) -> State:
+    events = await adetect_audio_problems(
+        state["transcript"],
+        window_size=AUDIO_PROBLEMS_WINDOW_SIZE,
+        window_overlap=AUDIO_PROBLEMS_WINDOW_OVERLAP,
+        max_concurrency=AUDIO_PROBLEMS_MAX_CONCURRENCY,
+        encoding=TRANSCRIPT_ENCODING,
+        exclude_classes=LOCAL_AUDIO_PROBLEMS,
+    )
 
-    return {"frames_dir_path": frames_dir_path}
+    return {"events": events}
 
 
-def route_classify_image(state: State) -> State:
-    files = [
-        f
-        for f in os.listdir(state["frames_dir_path"])
-        if f.lower().endswith((".png", ".jpg", ".jpeg", ".gif", ".bmp"))
+def _problem_events(
+    problem_class: str, ranges: List[Tuple[float, float]]
+) -> List[Event]:
+    """Events of a detect_audio_problems class found by a local detector."""
+    return [
+        Event(
+            start_s=start_s,
+            end_s=end_s,
+            event=class_pl_names[problem_class],
+            description=class_pl_problem_description[problem_class],
+            color=class_colors[problem_class],
+        )
+        for start_s, end_s in ranges
     ]
 
-    print(files)
 
-    return [
-        Send(
-            "step_classify_image",
-            {"image_path": os.path.join(state["frames_dir_path"], image_file)},
+def step_detect_pauses(state: State) -> State:
+    LONG_PAUSE_S = 2.0
+
+    silences = detect_silences(
+        state["audio_samples"], state["audio_sample_rate"], min_silence_s=LONG_PAUSE_S
+    )
+
+    events = _problem_events("long_pause", silences)
+    for event in events:
+        event["description"] = (
+            f"({event['end_s'] - event['start_s']:.1f} s)\n" + event["description"]
+        )
+
+    return {"events": events}
+
+
+def step_detect_disfluencies(state: State) -> State:
+    events = []
+    if "filler_words" in LOCAL_AUDIO_PROBLEMS:
+        events += _problem_events(
+            "filler_words", find_filler_words(state["transcript"])
         )
-        for image_file in files
+    if "repetitions" in LOCAL_AUDIO_PROBLEMS:
+        events += _problem_events("repetitions", find_repetitions(state["transcript"]))
+
+    events = combine_overlapping_events(events)
+
+    return {"events": events}
+
+
+def step_dedupe_frames(state: State) -> State:
+    if FRAME_DEDUP_DISTANCE < 0:
+        return {"deduplicated_frames": state["frames"]}
+
+    return {"deduplicated_frames": dedupe_frames(state["frames"], FRAME_DEDUP_DISTANCE)}
+
+
+def route_classify_image(state: State) -> State:
+    frames = state["deduplicated_frames"]
+
+    return [
+        Send("step_classify_image", {"frames": frames[i : i + FRAME_BATCH_SIZE]})
+        for i in range(0, len(frames), FRAME_BATCH_SIZE)
     ]
 
 
 class ClassifyImageState(TypedDict):
-    image_path: str
+    frames: List[Frame]
 
 
 def step_classify_image(state: ClassifyImageState) -> State:
     try:
-        events = classify_image(state["image_path"])
+        frames = state["frames"]
+        if len(frames) == 1:
+            events = classify_image(frames[0])
+        else:
+            events = classify_images(frames)
+
+        events = combine_overlapping_events(events)
+
+        return {"events": events}
+    except Exception as e:
+        print(e)
+        return {"events": []}
+
+
+async def astep_classify_image(state: ClassifyImageState) -> State:
+    try:
+        frames = state["frames"]
+        if len(frames) == 1:
+            events = await aclassify_image(frames[0])
+        else:
+            events = await aclassify_images(frames)
 
         events = combine_overlapping_events(events)
 
@@ -137,35 +424,71 @@ def step_gather_images(_state: State) -> State:
     return {"place_holder": []}
 
 
+def _transcript_analysis_update(result: TranscriptAnalysis) -> State:
+    return {
+        "keywords": result.keywords,
+        "sentiment": result.sentiment,
+        "target_group": result.target_group,
+        "named_entities": result.entities,
+        "questions": result.questions,
+    }
+
+
+def step_analyze_transcript(state: State) -> State:
+    return _transcript_analysis_update(analyze_transcript(state["transcript"]))
+
+
+async def astep_analyze_transcript(state: State) -> State:
+    return _transcript_analysis_update(await aanalyze_transcript(state["transcript"]))
+
+
 def step_extract_keywords(state: State) -> State:
-    return {"keywords": extract_keywords(state["transcription_words"])}
+    return {"keywords": extract_keywords(state["transcript"])}
+
+
+async def astep_extract_keywords(state: State) -> State:
+    return {"keywords": await aextract_keywords(state["transcript"])}
 
 
 def step_generate_questions(state: State) -> State:
-    return {"questions": generate_questions(state["transcription_words"])}
+    return {"questions": generate_questions(state["transcript"], TRANSCRIPT_ENCODING)}
+
+
+async def astep_generate_questions(state: State) -> State:
+    return {
+        "questions": await agenerate_questions(state["transcript"], TRANSCRIPT_ENCODING)
+    }
 
 
 def step_analyze_speech_volume(state: State) -> State:
     high_volume_words, low_volume_words, volumes, volumes_timestamps = (
-        analyze_speech_volume(state["audio_path"], state["transcription_words"])
+        analyze_speech_volume(
+            state["audio_samples"],
+            state["audio_sample_rate"],
+            state["transcript"],
+        )
     )
 
     events = []
-    for word in high_volume_words:
+    for start_s, end_s in zip(
+        high_volume_words.starts.tolist(), high_volume_words.ends.tolist()
+    ):
         events.append(
             Event(
-                start_s=word.start,
-                end_s=word.end,
+                start_s=start_s,
+                end_s=end_s,
                 event="Wysoki poziom głośności",
                 description="Głośność jest wyższa niż przewidywana dla danego materiału, co może być niekomfortowe do słuchania.",
                 color="#FF5722",
             )
         )
-    for word in low_volume_words:
+    for start_s, end_s in zip(
+        low_volume_words.starts.tolist(), low_volume_words.ends.tolist()
+    ):
         events.append(
             Event(
-                start_s=word.start,
-                end_s=word.end,
+                start_s=start_s,
+                end_s=end_s,
                 event="Niski poziom głośności",
                 description="Głośność jest niższa niż przewidywana dla danego materiału, co może być niezrozumiała dla słuchacza.",
                 color="#2196F3",
@@ -183,29 +506,41 @@ def step_analyze_speech_volume(state: State) -> State:
 
 
 def step_generate_suggestions(state: State) -> State:
+    return {"suggestions": generate_suggestions(state["transcript"], state["events"])}
+
+
+async def astep_generate_suggestions(state: State) -> State:
     return {
-        "suggestions": generate_suggestions(
-            state["transcription_words"], state["events"]
-        )
+        "suggestions": await agenerate_suggestions(state["transcript"], state["events"])
     }
 
 
 def step_extract_named_entities(state: State) -> State:
-    return {"named_entities": extract_named_entities(state["transcription_words"])}
+    return {"named_entities": extract_named_entities(state["transcript"])}
+
+
+async def astep_extract_named_entities(state: State) -> State:
+    return {"named_entities": await aextract_named_entities(state["transcript"])}
 
 
 def step_add_formatted_transcription(state: State) -> State:
-    return {
-        "formatted_transcription": format_transcription(state["transcription_words"])
-    }
+    return {"formatted_transcription": format_transcription(state["transcript"])}
 
 
 def step_extract_target_group(state: State) -> State:
-    return {"target_group": extract_target_group(state["transcription_words"])}
+    return {"target_group": extract_target_group(state["transcript"])}
+
+
+async def astep_extract_target_group(state: State) -> State:
+    return {"target_group": await aextract_target_group(state["transcript"])}
 
 
 def step_classify_sentiment(state: State) -> State:
-    return {"sentiment": classify_sentiment(state["transcription_words"])}
+    return {"sentiment": classify_sentiment(state["transcript"])}
+
+
+async def astep_classify_sentiment(state: State) -> State:
+    return {"sentiment": await aclassify_sentiment(state["transcript"])}
 
 
 def step_calculate_speech_speed(state: State) -> State:
@@ -219,7 +554,7 @@ def step_calculate_speech_speed(state: State) -> State:
         wpm_timestamps,
         pauses,
         pauses_timestamps,
-    ) = speech_speed(state["transcription_words"])
+    ) = speech_speed(state["transcript"])
 
     events = []
     if len(words_per_minute) > 0:
@@ -246,15 +581,16 @@ def step_calculate_speech_speed(state: State) -> State:
                     )
                 )
 
+    # Words following each other almost without a gap
     for pause, timestamp in zip(pauses, pauses_timestamps):
-        print(pause)
         if pause < 0.1:
             events.append(
                 Event(
                     start_s=timestamp[0],
                     end_s=timestamp[1],
                     event="Wysoka szybkość mówienia",
-                    description=f"(WPM: {int(wpm)})\n" + description,
+                    description=f"(Przerwa między słowami: {pause:.2f} s)\n"
+                    + description,
                     color="#F44336",
                 )
             )
@@ -276,19 +612,10 @@ def step_add_clarity_score(state: State) -> State:
     fog_index = gunning_fog(state["readable_transcription"])
 
     if fog_index > HARD_FOG_THRESHOLD:
-        min_word_timestamp = 999999
-        max_word_timestamp = -1
-
-        for word in state["transcription_words"]:
-            if word.start < min_word_timestamp:
-                min_word_timestamp = word.start
-            if word.end > max_word_timestamp:
-                max_word_timestamp = word.end
-
         events = [
             Event(
-                start_s=min_word_timestamp,
-                end_s=max_word_timestamp,
+                start_s=state["transcript"].start_s,
+                end_s=state["transcript"].end_s,
                 event="Mglista wypowiedź (Wysoki Fog Index)",
                 description="Indeks Foga (Gunning Fog Index) mierzy czytelność tekstu, określając poziom wykształcenia potrzebny do jego zrozumienia. Typowe wartości: 7-8 bardzo prosty tekst łatwy dla 13-latków, 9-12 średni poziom przeciętny dorosły, 13-16 trudny tekst np. artykuły naukowe, powyżej 17 bardzo trudny wyższe wykształcenie.",
                 color="#607D8B",
@@ -308,27 +635,41 @@ def step_add_clarity_score(state: State) -> State:
     }
 
 
-def build_graph():
+def with_async(func, afunc) -> RunnableLambda:
+    """
+    Wrap a node so that graph.invoke runs func and graph.ainvoke awaits afunc.
+
+    Nodes without an async variant are run in a thread pool by ainvoke, so only
+    the ones waiting on the network need one.
+    """
+    return RunnableLambda(func, afunc=afunc, name=func.__name__)
+
+
+def build_graph(fused_transcript_analysis: bool = FUSED_TRANSCRIPT_ANALYSIS):
     graph_builder = StateGraph(State)
 
     graph_builder.add_node(
-        "step_extract_audio", step_extract_audio, retry=DEFAULT_RETRY_POLICY
+        "step_ingest_media", step_ingest_media, retry=DEFAULT_RETRY_POLICY
     )
     graph_builder.add_node(
-        "step_transcribe_audio", step_transcribe_audio, retry=DEFAULT_RETRY_POLICY
+        "step_transcribe_audio",
+        with_async(step_transcribe_audio, astep_transcribe_audio),
+        retry=DEFAULT_RETRY_POLICY,
     )
     graph_builder.add_node(
-        "step_extract_frames", step_extract_frames, retry=DEFAULT_RETRY_POLICY
+        "step_dedupe_frames", step_dedupe_frames, retry=DEFAULT_RETRY_POLICY
     )
     graph_builder.add_node(
-        "step_classify_image", step_classify_image, retry=DEFAULT_RETRY_POLICY
+        "step_classify_image",
+        with_async(step_classify_image, astep_classify_image),
+        retry=DEFAULT_RETRY_POLICY,
     )
     graph_builder.add_node(
         "step_gather_images", step_gather_images, retry=DEFAULT_RETRY_POLICY
     )
     graph_builder.add_node(
         "step_detect_audio_problems",
-        step_detect_audio_problems,
+        with_async(step_detect_audio_problems, astep_detect_audio_problems),
         retry=DEFAULT_RETRY_POLICY,
     )
     graph_builder.add_node(
@@ -338,34 +679,20 @@ def build_graph():
     )
     graph_builder.add_node(
         "step_convert_transcript_to_text",
-        step_convert_transcript_to_text,
+        with_async(step_convert_transcript_to_text, astep_convert_transcript_to_text),
         retry=DEFAULT_RETRY_POLICY,
     )
     graph_builder.add_node("step_calculate_speech_speed", step_calculate_speech_speed)
-    graph_builder.add_node("step_extract_keywords", step_extract_keywords)
-    graph_builder.add_node(
-        "step_extract_target_group",
-        step_extract_target_group,
-        retry=DEFAULT_RETRY_POLICY,
-    )
     graph_builder.add_node(
         "step_translate_to_english",
-        step_translate_to_english,
-        retry=DEFAULT_RETRY_POLICY,
-    )
-    graph_builder.add_node(
-        "step_extract_named_entities",
-        step_extract_named_entities,
+        with_async(step_translate_to_english, astep_translate_to_english),
         retry=DEFAULT_RETRY_POLICY,
     )
     graph_builder.add_node(
         "step_generate_suggestions",
-        step_generate_suggestions,
+        with_async(step_generate_suggestions, astep_generate_suggestions),
         retry=DEFAULT_RETRY_POLICY,
     )
-    graph_builder.add_node(
-        "step_classify_sentiment", step_classify_sentiment, retry=DEFAULT_RETRY_POLICY
-    )
     graph_builder.add_node(
         "step_analyze_speech_volume",
         step_analyze_speech_volume,
@@ -374,18 +701,15 @@ def build_graph():
     graph_builder.add_node(
         "step_add_clarity_score", step_add_clarity_score, retry=DEFAULT_RETRY_POLICY
     )
-    graph_builder.add_node(
-        "step_generate_questions", step_generate_questions, retry=DEFAULT_RETRY_POLICY
-    )
 
-    graph_builder.add_edge(START, "step_extract_audio")
-    graph_builder.add_edge("step_extract_audio", "step_transcribe_audio")
+    graph_builder.add_edge(START, "step_ingest_media")
+    graph_builder.add_edge("step_ingest_media", "step_transcribe_audio")
     graph_builder.add_edge("step_transcribe_audio", "step_detect_audio_problems")
     graph_builder.add_edge("step_detect_audio_problems", "step_generate_suggestions")
 
-    graph_builder.add_edge(START, "step_extract_frames")
+    graph_builder.add_edge("step_ingest_media", "step_dedupe_frames")
     graph_builder.add_conditional_edges(
-        "step_extract_frames", route_classify_image, ["step_classify_image"]
+        "step_dedupe_frames", route_classify_image, ["step_classify_image"]
     )
     graph_builder.add_edge("step_classify_image", "step_gather_images")
     graph_builder.add_edge("step_gather_images", "step_generate_suggestions")
@@ -397,26 +721,67 @@ def build_graph():
     graph_builder.add_edge("step_convert_transcript_to_text", "step_add_clarity_score")
     graph_builder.add_edge("step_add_clarity_score", "step_generate_suggestions")
 
-    graph_builder.add_edge("step_transcribe_audio", "step_classify_sentiment")
-    graph_builder.add_edge("step_classify_sentiment", END)
-
     graph_builder.add_edge("step_transcribe_audio", "step_add_formatted_transcription")
     graph_builder.add_edge("step_add_formatted_transcription", END)
 
     graph_builder.add_edge("step_transcribe_audio", "step_calculate_speech_speed")
     graph_builder.add_edge("step_calculate_speech_speed", "step_generate_suggestions")
 
-    graph_builder.add_edge("step_transcribe_audio", "step_extract_named_entities")
-    graph_builder.add_edge("step_extract_named_entities", END)
-
-    graph_builder.add_edge("step_transcribe_audio", "step_extract_keywords")
-    graph_builder.add_edge("step_extract_keywords", END)
-
-    graph_builder.add_edge("step_transcribe_audio", "step_extract_target_group")
-    graph_builder.add_edge("step_extract_target_group", END)
+    if "long_pause" in LOCAL_AUDIO_PROBLEMS:
+        graph_builder.add_node("step_detect_pauses", step_detect_pauses)
+        # Only needs the audio, but starting it after the transcription keeps it in
+        # the same step as the other audio analyses feeding the suggestions
+        graph_builder.add_edge("step_transcribe_audio", "step_detect_pauses")
+        graph_builder.add_edge("step_detect_pauses", "step_generate_suggestions")
+
+    if {"filler_words", "repetitions"} & set(LOCAL_AUDIO_PROBLEMS):
+        graph_builder.add_node("step_detect_disfluencies", step_detect_disfluencies)
+        graph_builder.add_edge("step_transcribe_audio", "step_detect_disfluencies")
+        graph_builder.add_edge("step_detect_disfluencies", "step_generate_suggestions")
+
+    if fused_transcript_analysis:
+        graph_builder.add_node(
+            "step_analyze_transcript",
+            with_async(step_analyze_transcript, astep_analyze_transcript),
+            retry=DEFAULT_RETRY_POLICY,
+        )
+        graph_builder.add_edge("step_transcribe_audio", "step_analyze_transcript")
+        graph_builder.add_edge("step_analyze_transcript", END)
+    else:
+        graph_builder.add_node(
+            "step_extract_keywords",
+            with_async(step_extract_keywords, astep_extract_keywords),
+        )
+        graph_builder.add_node(
+            "step_extract_target_group",
+            with_async(step_extract_target_group, astep_extract_target_group),
+            retry=DEFAULT_RETRY_POLICY,
+        )
+        graph_builder.add_node(
+            "step_extract_named_entities",
+            with_async(step_extract_named_entities, astep_extract_named_entities),
+            retry=DEFAULT_RETRY_POLICY,
+        )
+        graph_builder.add_node(
+            "step_classify_sentiment",
+            with_async(step_classify_sentiment, astep_classify_sentiment),
+            retry=DEFAULT_RETRY_POLICY,
+        )
+        graph_builder.add_node(
+            "step_generate_questions",
+            with_async(step_generate_questions, astep_generate_questions),
+            retry=DEFAULT_RETRY_POLICY,
+        )
 
-    graph_builder.add_edge("step_transcribe_audio", "step_generate_questions")
-    graph_builder.add_edge("step_generate_questions", END)
+        for node in [
+            "step_extract_keywords",
+            "step_classify_sentiment",
+            "step_extract_target_group",
+            "step_extract_named_entities",
+            "step_generate_questions",
+        ]:
+            graph_builder.add_edge("step_transcribe_audio", node)
+            graph_builder.add_edge(node, END)
 
     graph_builder.add_edge(
         "step_convert_transcript_to_text", "step_translate_to_english"
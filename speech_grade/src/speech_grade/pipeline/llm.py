@@ -0,0 +1,163 @@
+import asyncio
+import functools
+import os
+import threading
+import weakref
+import httpx
+from typing import Callable, Dict, Optional
+from langchain_core.runnables import Runnable
+from langchain_openai import ChatOpenAI
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI
+from speech_grade.disk_cache import DiskCache
+from speech_grade.pipeline.llm_cache import LLM_CACHE_VERSION, cached_chain
+from speech_grade.pipeline.metrics import arecord_http_response, record_http_response
+
+# Connections kept open to the OpenAI API, shared by every model and the transcription
+LLM_MAX_CONNECTIONS = int(os.environ.get("SPEECH_GRADE_LLM_MAX_CONNECTIONS", "20"))
+LLM_KEEPALIVE_EXPIRY_S = float(
+    os.environ.get("SPEECH_GRADE_LLM_KEEPALIVE_EXPIRY_S", "60")
+)
+
+_chains: Dict[str, Runnable] = {}
+_chains_lock = threading.Lock()
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_MAX_CONNECTIONS,
+        keepalive_expiry=LLM_KEEPALIVE_EXPIRY_S,
+    )
+
+
+class LoopLocalTransport(httpx.AsyncBaseTransport):
+    """
+    Async transport keeping a separate connection pool for every event loop.
+
+    Pooled connections can only be used by the event loop which opened them, so
+    a client shared by consecutive asyncio.run calls, eg. in the benchmarks,
+    would hand the new loop connections of a closed one. Pools are dropped
+    together with their loop.
+
+    :param kwargs: Arguments of every httpx.AsyncHTTPTransport, eg. limits
+    """
+
+    def __init__(self, **kwargs):
+        self._kwargs = kwargs
+        self._transports: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    def _transport(self) -> httpx.AsyncHTTPTransport:
+        loop = asyncio.get_running_loop()
+
+        # A loop runs in a single thread, so no lock is needed
+        transport = self._transports.get(loop)
+        if transport is None:
+            transport = httpx.AsyncHTTPTransport(**self._kwargs)
+            self._transports[loop] = transport
+
+        return transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._transport().handle_async_request(request)
+
+    async def aclose(self):
+        transport = self._transports.pop(asyncio.get_running_loop(), None)
+        if transport is not None:
+            await transport.aclose()
+
+
+@functools.lru_cache(maxsize=None)
+def get_http_client() -> httpx.Client:
+    return DefaultHttpxClient(
+        limits=_limits(), event_hooks={"response": [record_http_response]}
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def get_async_http_client() -> httpx.AsyncClient:
+    """Pooled async HTTP client, with a separate pool for every event loop."""
+    return DefaultAsyncHttpxClient(
+        transport=LoopLocalTransport(limits=_limits()),
+        event_hooks={"response": [arecord_http_response]},
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def get_openai_client() -> OpenAI:
+    return OpenAI(http_client=get_http_client())
+
+
+@functools.lru_cache(maxsize=None)
+def get_async_openai_client() -> AsyncOpenAI:
+    return AsyncOpenAI(http_client=get_async_http_client())
+
+
+@functools.lru_cache(maxsize=None)
+def get_chat_model(model: str, **kwargs) -> ChatOpenAI:
+    """
+    Chat model reusing the pooled HTTP clients, one instance per set of arguments.
+
+    :param model: OpenAI model name
+    :param kwargs: Other ChatOpenAI arguments, they have to be hashable
+    :return: Shared ChatOpenAI instance
+    """
+    return ChatOpenAI(
+        model=model,
+        http_client=get_http_client(),
+        http_async_client=get_async_http_client(),
+        **kwargs,
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def get_llm_cache() -> Optional[DiskCache]:
+    """Cache of parsed chain results, None when disabled with SPEECH_GRADE_LLM_CACHE=0."""
+    if os.environ.get("SPEECH_GRADE_LLM_CACHE", "1") != "1":
+        return None
+
+    return DiskCache(
+        path=os.environ.get("SPEECH_GRADE_CACHE_PATH", ".cache/speech_grade.sqlite"),
+        namespace="llm",
+        version=LLM_CACHE_VERSION,
+        ttl_s=float(os.environ.get("SPEECH_GRADE_LLM_CACHE_TTL_S", 7 * 24 * 3600)),
+        max_bytes=int(os.environ.get("SPEECH_GRADE_LLM_CACHE_MAX_BYTES", 256 * 2**20)),
+    )
+
+
+def registered_chain(build: Callable[[], Runnable]) -> Callable[[], Runnable]:
+    """
+    Decorator making a chain builder return a single, process wide chain.
+
+    The chain is built on the first call and registered under the builder's
+    qualified name, later calls return the registered chain. Chains are
+    stateless, so the same instance can serve concurrent calls. Unless
+    disabled, the registered chain is wrapped with the LLM response cache.
+    """
+    key = f"{build.__module__}.{build.__qualname__}"
+
+    @functools.wraps(build)
+    def get_chain() -> Runnable:
+        chain = _chains.get(key)
+        if chain is None:
+            with _chains_lock:
+                chain = _chains.get(key)
+                if chain is None:
+                    chain = build()
+
+                    llm_cache = get_llm_cache()
+                    if llm_cache is not None:
+                        chain = cached_chain(chain, key, llm_cache)
+
+                    _chains[key] = chain
+
+        return chain
+
+    return get_chain
+
+
+def clear_chains():
+    """Drop registered chains and chat models, they are rebuilt on the next call."""
+    with _chains_lock:
+        _chains.clear()
+
+    get_chat_model.cache_clear()
@@ -0,0 +1,89 @@
+import asyncio
+import hashlib
+import json
+from typing import Any
+from langchain_core.load import dumps
+from langchain_core.output_parsers import PydanticOutputParser
+from langchain_core.runnables import RunnableConfig, RunnableLambda, RunnableSequence
+from speech_grade.disk_cache import DiskCache
+from speech_grade.pipeline.metrics import record_cache_lookup
+from speech_grade.pipeline.trace import trace_event
+
+# Bump whenever the cached value format changes, older entries are dropped
+LLM_CACHE_VERSION = "2"
+
+
+def cached_chain(
+    chain: RunnableSequence, name: str, cache: DiskCache
+) -> RunnableLambda:
+    """
+    Put a persistent cache in front of a prompt | model | parser chain.
+
+    The key is made of the chain name, the model with all its parameters and
+    the rendered prompt, which includes the template, so editing a prompt
+    invalidates its entries. Only successfully parsed results are stored,
+    a hit returns the parsed result without calling the model.
+
+    :param chain: Chain starting with a prompt template and ending with an output parser
+    :param name: Name of the chain, part of the key
+    :param cache: Cache the parsed results are stored in
+    :return: Runnable with the same input and output as the chain
+    """
+    prompt = chain.first
+    model_and_parser = RunnableSequence(*chain.middle, chain.last)
+    parser = chain.last
+
+    # Every model in the chain with its parameters, eg. model name and max_tokens
+    llm_string = json.dumps(
+        [model._get_llm_string() for model in chain.middle], sort_keys=True
+    )
+
+    def key(prompt_value) -> str:
+        payload = "\n".join([name, llm_string, dumps(prompt_value)])
+
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def serialize(result: Any) -> str:
+        if isinstance(parser, PydanticOutputParser):
+            return result.model_dump_json()
+
+        return json.dumps(result)
+
+    def deserialize(value: str) -> Any:
+        if isinstance(parser, PydanticOutputParser):
+            return parser.pydantic_object.model_validate_json(value)
+
+        return json.loads(value)
+
+    def invoke(input: dict, config: RunnableConfig) -> Any:
+        prompt_value = prompt.invoke(input, config)
+        cache_key = key(prompt_value)
+
+        cached = cache.get(cache_key)
+        record_cache_lookup(config.get("metadata"), hit=cached is not None)
+        if cached is not None:
+            trace_event("llm_cache", name, config, hit=True)
+            return deserialize(cached)
+
+        result = model_and_parser.invoke(prompt_value, config)
+        cache.set(cache_key, serialize(result))
+
+        return result
+
+    async def ainvoke(input: dict, config: RunnableConfig) -> Any:
+        prompt_value = await prompt.ainvoke(input, config)
+        cache_key = key(prompt_value)
+
+        # SQLite calls block, they run in a thread to keep the event loop free
+        cached = await asyncio.to_thread(cache.get, cache_key)
+        record_cache_lookup(config.get("metadata"), hit=cached is not None)
+        if cached is not None:
+            trace_event("llm_cache", name, config, hit=True)
+            return deserialize(cached)
+
+        result = await model_and_parser.ainvoke(prompt_value, config)
+        await asyncio.to_thread(cache.set, cache_key, serialize(result))
+
+        return result
+
+    return RunnableLambda(invoke, afunc=ainvoke, name=name)
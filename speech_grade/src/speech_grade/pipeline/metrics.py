@@ -0,0 +1,244 @@
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set
+from uuid import UUID
+import httpx
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from prometheus_client import Counter, Histogram
+
+NODE_DURATION_BUCKETS = (
+    0.01,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    30,
+    60,
+    120,
+    300,
+    600,
+)
+LLM_DURATION_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120)
+
+# USD per 1M input and output tokens, looked up by the longest matching model prefix
+MODEL_PRICES_USD = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+}
+
+ANALYSIS_DURATION = Histogram(
+    "speech_grade_analysis_duration_seconds",
+    "Wall time of a whole graph run",
+    buckets=NODE_DURATION_BUCKETS,
+)
+NODE_DURATION = Histogram(
+    "speech_grade_node_duration_seconds",
+    "Wall time of a single graph node attempt",
+    ["node"],
+    buckets=NODE_DURATION_BUCKETS,
+)
+NODE_ERRORS = Counter(
+    "speech_grade_node_errors_total",
+    "Failed graph node attempts, including the ones retried later",
+    ["node", "error"],
+)
+NODE_RETRIES = Counter(
+    "speech_grade_node_retries_total",
+    "Graph node attempts repeated by the retry policy",
+    ["node"],
+)
+LLM_DURATION = Histogram(
+    "speech_grade_llm_request_duration_seconds",
+    "Wall time of a single LLM call, including the client's own retries",
+    ["node", "model"],
+    buckets=LLM_DURATION_BUCKETS,
+)
+LLM_TOKENS = Counter(
+    "speech_grade_llm_tokens_total",
+    "Tokens reported by the LLM API",
+    ["node", "model", "type"],
+)
+LLM_COST = Counter(
+    "speech_grade_llm_cost_usd_total",
+    "Estimated cost of the LLM calls in USD, see MODEL_PRICES_USD",
+    ["node", "model"],
+)
+LLM_ERRORS = Counter(
+    "speech_grade_llm_errors_total",
+    "LLM calls which failed after the client's retries",
+    ["node", "error"],
+)
+LLM_CACHE_REQUESTS = Counter(
+    "speech_grade_llm_cache_requests_total",
+    "Lookups in the LLM response cache",
+    ["node", "result"],
+)
+LLM_HTTP_RESPONSES = Counter(
+    "speech_grade_llm_http_responses_total",
+    "Responses of the OpenAI API by status, retried requests are counted once per attempt",
+    ["path", "status"],
+)
+
+
+def model_cost_usd(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """Cost of a call in USD, 0 for models missing from MODEL_PRICES_USD."""
+    prefixes = [prefix for prefix in MODEL_PRICES_USD if model.startswith(prefix)]
+    if not prefixes:
+        return 0.0
+
+    input_price, output_price = MODEL_PRICES_USD[max(prefixes, key=len)]
+
+    return (prompt_tokens * input_price + completion_tokens * output_price) / 1e6
+
+
+def record_cache_lookup(metadata: Optional[Dict[str, Any]], hit: bool):
+    node = (metadata or {}).get("langgraph_node", "unknown")
+    LLM_CACHE_REQUESTS.labels(node=node, result="hit" if hit else "miss").inc()
+
+
+def record_http_response(response: httpx.Response):
+    LLM_HTTP_RESPONSES.labels(
+        path=response.request.url.path, status=str(response.status_code)
+    ).inc()
+
+
+async def arecord_http_response(response: httpx.Response):
+    record_http_response(response)
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """
+    Records Prometheus metrics of a single graph run: node wall times, errors
+    and retries, and LLM latency, tokens, cost and errors per node.
+
+    Pass a new instance in the config of every run, eg.
+    graph.invoke(state, {"callbacks": [MetricsCallbackHandler()]}).
+    """
+
+    def __init__(self):
+        self._started_at: Dict[UUID, float] = {}
+        self._nodes: Dict[UUID, str] = {}
+        self._llm_started_at: Dict[UUID, float] = {}
+        self._llm_nodes: Dict[UUID, str] = {}
+        # Tasks already attempted, a task started again is being retried
+        self._tasks: Set[str] = set()
+        self._graph_run_id: Optional[UUID] = None
+        self._lock = threading.Lock()
+
+    def on_chain_start(
+        self,
+        serialized: Dict[str, Any],
+        inputs: Dict[str, Any],
+        *,
+        run_id: UUID,
+        parent_run_id: Optional[UUID] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ):
+        metadata = metadata or {}
+
+        with self._lock:
+            if parent_run_id is None:
+                self._graph_run_id = run_id
+                self._started_at[run_id] = time.perf_counter()
+                return
+
+            node = metadata.get("langgraph_node", "")
+            # Only the nodes themselves, not the runnables inside them
+            if parent_run_id != self._graph_run_id or node.startswith("__"):
+                return
+
+            self._started_at[run_id] = time.perf_counter()
+            self._nodes[run_id] = node
+            task = metadata.get("langgraph_checkpoint_ns")
+            retried = task in self._tasks
+            self._tasks.add(task)
+
+        if retried:
+            NODE_RETRIES.labels(node=node).inc()
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any):
+        self._on_chain_finish(run_id)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        node = self._on_chain_finish(run_id)
+        if node is not None:
+            NODE_ERRORS.labels(node=node, error=type(error).__name__).inc()
+
+    def on_chat_model_start(
+        self,
+        serialized: Dict[str, Any],
+        messages: List[List[Any]],
+        *,
+        run_id: UUID,
+        metadata: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ):
+        self._on_llm_start(run_id, metadata)
+
+    def on_llm_start(
+        self,
+        serialized: Dict[str, Any],
+        prompts: List[str],
+        *,
+        run_id: UUID,
+        metadata: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ):
+        self._on_llm_start(run_id, metadata)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any):
+        with self._lock:
+            started_at = self._llm_started_at.pop(run_id, None)
+            node = self._llm_nodes.pop(run_id, "unknown")
+
+        llm_output = response.llm_output or {}
+        model = llm_output.get("model_name") or "unknown"
+        token_usage = llm_output.get("token_usage") or {}
+        prompt_tokens = token_usage.get("prompt_tokens") or 0
+        completion_tokens = token_usage.get("completion_tokens") or 0
+
+        if started_at is not None:
+            LLM_DURATION.labels(node=node, model=model).observe(
+                time.perf_counter() - started_at
+            )
+        LLM_TOKENS.labels(node=node, model=model, type="prompt").inc(prompt_tokens)
+        LLM_TOKENS.labels(node=node, model=model, type="completion").inc(
+            completion_tokens
+        )
+        LLM_COST.labels(node=node, model=model).inc(
+            model_cost_usd(model, prompt_tokens, completion_tokens)
+        )
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        with self._lock:
+            self._llm_started_at.pop(run_id, None)
+            node = self._llm_nodes.pop(run_id, "unknown")
+
+        LLM_ERRORS.labels(node=node, error=type(error).__name__).inc()
+
+    def _on_chain_finish(self, run_id: UUID) -> Optional[str]:
+        with self._lock:
+            started_at = self._started_at.pop(run_id, None)
+            node = self._nodes.pop(run_id, None)
+
+        if started_at is None:
+            return None
+
+        elapsed_s = time.perf_counter() - started_at
+        if node is None:
+            ANALYSIS_DURATION.observe(elapsed_s)
+        else:
+            NODE_DURATION.labels(node=node).observe(elapsed_s)
+
+        return node
+
+    def _on_llm_start(self, run_id: UUID, metadata: Optional[Dict[str, Any]]):
+        with self._lock:
+            self._llm_started_at[run_id] = time.perf_counter()
+            self._llm_nodes[run_id] = (metadata or {}).get("langgraph_node", "unknown")
@@ -0,0 +1,64 @@
+from speech_grade.pipeline.transcript import Transcript
+from speech_grade.pipeline.llm import get_chat_model, registered_chain
+from speech_grade.pipeline.prompts.classify_sentiment import Sentiment
+from speech_grade.pipeline.prompts.extract_keywords import Keywords
+from speech_grade.pipeline.prompts.extract_target_group import TargetGroup
+from speech_grade.pipeline.prompts.generate_questions import Questions
+from speech_grade.pipeline.prompts.ner import Entities
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.output_parsers import PydanticOutputParser
+
+
+class TranscriptAnalysis(Keywords, Sentiment, TargetGroup, Entities, Questions):
+    pass
+
+
+@registered_chain
+def _build_chain():
+    model = get_chat_model("gpt-4o")
+
+    parser = PydanticOutputParser(pydantic_object=TranscriptAnalysis)
+
+    prompt = ChatPromptTemplate.from_messages(
+        [
+            (
+                "system",
+                "Your task is to analyze the transcript and fill in every field of the output:\n"
+                "- keywords: generate keywords describing the content of the transcript (from 4 to 6). Keywords should be short, simple, unique and not related to each other.\n"
+                "- sentiment: classify the sentiment of the transcription into positive, negative or neutral.\n"
+                "- target_group: describe the target group of the video in polish language. Focus on education level and age. Be concise (max 2 sentences).\n"
+                "- entities: find named entities in the transcript.\n"
+                "- questions: generate questions that listener could ask to the speaker based on the transcription. The questions must be in Polish and must be about something related to the content of the speech, but not answerable from the speech itself. Generate 10 questions.\n"
+                "{output_format}",
+            ),
+            ("user", "{transcription_formatted}"),
+        ]
+    )
+
+    prompt.input_variables = ["transcription_formatted"]
+    prompt.partial_variables = {"output_format": parser.get_format_instructions()}
+
+    return prompt | model | parser
+
+
+def _chain_input(transcript: Transcript) -> dict:
+    return {
+        "transcription_formatted": transcript.text(),
+    }
+
+
+def analyze_transcript(transcript: Transcript) -> TranscriptAnalysis:
+    """
+    Extract keywords, sentiment, target group, named entities and questions with a single call.
+
+    Sends the transcript once instead of once per result, the fields match the
+    outputs of the separate prompts.
+
+    :param transcript: Transcript of the video
+    :return: All five results
+    """
+    return _build_chain().invoke(_chain_input(transcript))
+
+
+async def aanalyze_transcript(transcript: Transcript) -> TranscriptAnalysis:
+    return await _build_chain().ainvoke(_chain_input(transcript))
@@ -2,11 +2,11 @@ import base64
 from typing import List, Literal
 
 
-from speech_grade.pipeline.types import Event
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import PydanticOutputParser, StrOutputParser
-from pathlib import Path
+from speech_grade.pipeline.types import Event, Frame
+from speech_grade.pipeline.llm import get_chat_model, registered_chain
+from langchain_core.messages import HumanMessage
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.output_parsers import PydanticOutputParser
 
 
 from pydantic import BaseModel, Field
@@ -22,6 +22,16 @@ class FrameProblems(BaseModel):
     ] = Field(..., description="List of quality problems with the video.")
 
 
+class IndexedFrameProblems(FrameProblems):
+    frame_index: int = Field(..., description="Index of the frame, as given by user.")
+
+
+class FramesProblems(BaseModel):
+    frames: List[IndexedFrameProblems] = Field(
+        ..., description="Quality problems of every frame provided by user."
+    )
+
+
 class_names = {
     "another_person_in_frame": "Inny człowiek na tle",
     "wrong_posture": "Zła postawa / gestykulacja",
@@ -35,79 +45,116 @@ class_descriptions = {
 }
 
 
-def classify_image(image_path: str) -> List[Event]:
-    """
-    Classify images in a folder into one of three classes using OpenAI's API, running in parallel.
+CLASSES = "\n".join(
+    [
+        "another_person_in_frame -> Another, potentialy unwanted person in the frame.",
+        "wrong_posture -> Speaker is not looking at the camera, turning away, making movements, argresive gesticulation.",
+        "facial_expressions -> Speaker is makeing wierd or agresive factial expresions.",
+    ]
+)
 
-    :param folder_path: Path to the folder containing images
-    :return: List of dictionaries containing image names and their classifications
-    """
-    # Define the three classes
-    classes = "\n".join(
+
+@registered_chain
+def _build_chain():
+    model = get_chat_model("gpt-4o-mini", max_retries=3, max_tokens=1024)
+
+    parser = PydanticOutputParser(pydantic_object=FrameProblems)
+
+    prompt = ChatPromptTemplate.from_messages(
         [
-            "another_person_in_frame -> Another, potentialy unwanted person in the frame.",
-            "wrong_posture -> Speaker is not looking at the camera, turning away, making movements, argresive gesticulation.",
-            "facial_expressions -> Speaker is makeing wierd or agresive factial expresions.",
+            (
+                "system",
+                "Your task is to analyze the image provided by user and see if there are any quality problems of the following categories:\n{classes}\n\nIf you don't see any problems of the mentioned types, set problems to empty list.\n{output_format}",
+            ),
+            MessagesPlaceholder("images"),
         ]
     )
 
-    frame_name = Path(image_path).stem
+    prompt.input_variables = ["images"]
+    prompt.partial_variables = {
+        "output_format": parser.get_format_instructions(),
+        "classes": CLASSES,
+    }
 
-    frame_start, frame_end = frame_name.split("_")
+    return prompt | model | parser
 
-    frame_start_s = int(frame_start) / 1000
-    frame_end_s = int(frame_end) / 1000
 
-    model = ChatOpenAI(model="gpt-4o-mini", max_retries=3, max_tokens=1024)
+@registered_chain
+def _build_batch_chain():
+    model = get_chat_model("gpt-4o-mini", max_retries=3, max_tokens=4096)
 
-    parser = PydanticOutputParser(pydantic_object=FrameProblems)
+    parser = PydanticOutputParser(pydantic_object=FramesProblems)
 
     prompt = ChatPromptTemplate.from_messages(
         [
             (
                 "system",
-                "Your task is to analyze the image provided by user and see if there are any quality problems of the following categories:\n{classes}\n\nIf you don't see any problems of the mentioned types, set problems to empty list.\n{output_format}",
-            ),
-            (
-                "user",
-                [
-                    # {"type": "text", "text": "What problems are in this image?"},
-                    {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:image/jpeg;base64,{encode_image(image_path)}",
-                            "detail": "high",
-                        },
-                    },
-                ],
+                "Your task is to analyze every frame provided by user and see if there are any quality problems of the following categories:\n{classes}\n\nAnalyze every frame on its own and return an entry for each of them with the frame index given by user. If you don't see any problems of the mentioned types in a frame, set its problems to empty list.\n{output_format}",
             ),
+            MessagesPlaceholder("images"),
         ]
     )
 
-    prompt.input_variables = []
+    prompt.input_variables = ["images"]
     prompt.partial_variables = {
         "output_format": parser.get_format_instructions(),
-        "classes": classes,
+        "classes": CLASSES,
     }
 
-    chain = prompt | model | StrOutputParser()  # | parser
+    return prompt | model | parser
+
+
+def _image_content(frame: Frame) -> dict:
+    return {
+        "type": "image_url",
+        "image_url": {
+            "url": f"data:image/jpeg;base64,{encode_image(frame['image'])}",
+            "detail": "high",
+        },
+    }
+
+
+def _chain_input(frame: Frame) -> dict:
+    return {"images": [HumanMessage(content=[_image_content(frame)])]}
 
-    result = chain.invoke({}).strip()
 
-    # Parsing hack as langchain seems to not work well with images
-    if result.startswith("```json"):
-        result = result[7:]
+def _batch_chain_input(frames: List[Frame]) -> dict:
+    content = []
+    for i, frame in enumerate(frames):
+        content.append({"type": "text", "text": f"Frame {i}:"})
+        content.append(_image_content(frame))
 
-    if result.endswith("```"):
-        result = result[:-3]
+    return {"images": [HumanMessage(content=content)]}
 
-    import json
 
-    result = json.loads(result)
-    # result = parser.parse(result)
+def _to_events(
+    result: FrameProblems, frame_start_s: float, frame_end_s: float
+) -> List[Event]:
+    return _problems_to_events(result.problems_list, frame_start_s, frame_end_s)
 
+
+def _to_batch_events(result: FramesProblems, frames: List[Frame]) -> List[Event]:
+    events = []
+    for frame_problems in result.frames:
+        # Skip indices the model made up
+        if not 0 <= frame_problems.frame_index < len(frames):
+            continue
+
+        frame = frames[frame_problems.frame_index]
+        events.extend(
+            _problems_to_events(
+                frame_problems.problems_list, frame["start_s"], frame["end_s"]
+            )
+        )
+
+    return events
+
+
+def _problems_to_events(
+    problems: List[str], frame_start_s: float, frame_end_s: float
+) -> List[Event]:
     events = []
-    for problem in result.get("problems_list", []):
+    for problem in problems:
         events.append(
             Event(
                 start_s=frame_start_s,
@@ -120,6 +167,18 @@ def classify_image(image_path: str) -> List[Event]:
 
     return events
 
+
+def classify_image(frame: Frame) -> List[Event]:
+    """
+    Classify a single frame into the quality problem classes using OpenAI's API.
+
+    :param frame: JPEG encoded frame with its time range
+    :return: List of events spanning the frame time range, one per detected problem
+    """
+    result = _build_chain().invoke(_chain_input(frame))
+
+    return _to_events(result, frame["start_s"], frame["end_s"])
+
     # # Initialize OpenAI client
     # client = OpenAI()
 
@@ -163,8 +222,34 @@ def classify_image(image_path: str) -> List[Event]:
     # return results
 
 
-def encode_image(image_path):
+async def aclassify_image(frame: Frame) -> List[Event]:
+    result = await _build_chain().ainvoke(_chain_input(frame))
+
+    return _to_events(result, frame["start_s"], frame["end_s"])
+
+
+def classify_images(frames: List[Frame]) -> List[Event]:
+    """
+    Classify several frames with a single multimodal request.
+
+    Frames are numbered in the request and the problems come back keyed by the
+    frame index, so the events are the same as from classify_image on every frame.
+
+    :param frames: JPEG encoded frames with their time ranges
+    :return: List of events spanning the frame time ranges, one per detected problem
+    """
+    result = _build_batch_chain().invoke(_batch_chain_input(frames))
+
+    return _to_batch_events(result, frames)
+
+
+async def aclassify_images(frames: List[Frame]) -> List[Event]:
+    result = await _build_batch_chain().ainvoke(_batch_chain_input(frames))
+
+    return _to_batch_events(result, frames)
+
+
+def encode_image(image: bytes) -> str:
     """Encode the image to base64."""
 
-    with open(image_path, "rb") as image_file:
-        return base64.b64encode(image_file.read()).decode("utf-8")
+    return base64.b64encode(image).decode("utf-8")
@@ -1,6 +1,6 @@
-from openai.types.audio import TranscriptionWord
+from speech_grade.pipeline.transcript import Transcript
 from typing import List, Literal
-from langchain_openai import ChatOpenAI
+from speech_grade.pipeline.llm import get_chat_model, registered_chain
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import PydanticOutputParser
 
@@ -14,10 +14,9 @@ class Sentiment(BaseModel):
     )
 
 
-def classify_sentiment(transcription_words: List[TranscriptionWord]) -> str:
-    model = ChatOpenAI(model="gpt-4o")
-
-    transcription_formatted = " ".join([word.word for word in transcription_words])
+@registered_chain
+def _build_chain():
+    model = get_chat_model("gpt-4o")
 
     parser = PydanticOutputParser(pydantic_object=Sentiment)
 
@@ -34,12 +33,22 @@ def classify_sentiment(transcription_words: List[TranscriptionWord]) -> str:
     prompt.input_variables = ["transcription_formatted"]
     prompt.partial_variables = {"output_format": parser.get_format_instructions()}
 
-    chain = prompt | model | parser
+    return prompt | model | parser
 
-    result: Sentiment = chain.invoke(
-        {
-            "transcription_formatted": transcription_formatted,
-        }
-    )
+
+def _chain_input(transcript: Transcript) -> dict:
+    return {
+        "transcription_formatted": transcript.text(),
+    }
+
+
+def classify_sentiment(transcript: Transcript) -> str:
+    result: Sentiment = _build_chain().invoke(_chain_input(transcript))
+
+    return result.sentiment
+
+
+async def aclassify_sentiment(transcript: Transcript) -> str:
+    result: Sentiment = await _build_chain().ainvoke(_chain_input(transcript))
 
     return result.sentiment
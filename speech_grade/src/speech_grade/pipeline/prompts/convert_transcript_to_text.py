@@ -1,6 +1,7 @@
-from openai.types.audio import TranscriptionWord
-from typing import List
-from langchain_openai import ChatOpenAI
+from speech_grade.pipeline.transcript import Transcript
+from typing import List, Literal
+from speech_grade.pipeline.tools.format_transcription import encode_transcript
+from speech_grade.pipeline.llm import get_chat_model, registered_chain
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import PydanticOutputParser
 
@@ -14,14 +15,9 @@ class Transcription(BaseModel):
     )
 
 
-def convert_transcript_to_text(transcription_words: List[TranscriptionWord]) -> str:
-    model = ChatOpenAI(model="gpt-4o-mini")
-
-    id_to_word = {i + 1: word for i, word in enumerate(transcription_words)}
-
-    transcription_formatted = "\n".join(
-        [f"Word id: {i}, word: {word.word}" for i, word in id_to_word.items()]
-    )
+@registered_chain
+def _build_chain():
+    model = get_chat_model("gpt-4o-mini")
 
     parser = PydanticOutputParser(pydantic_object=Transcription)
 
@@ -38,12 +34,35 @@ def convert_transcript_to_text(transcription_words: List[TranscriptionWord]) ->
     prompt.input_variables = ["transcription_formatted"]
     prompt.partial_variables = {"output_format": parser.get_format_instructions()}
 
-    chain = prompt | model | parser
+    return prompt | model | parser
+
+
+def _chain_input(
+    transcript: Transcript, encoding: Literal["verbose", "compact"] = "verbose"
+) -> dict:
+    # The model doesn't cite word ids here, compact encoding leaves them out
+    return {
+        "transcription_formatted": (
+            encode_transcript(transcript)
+            if encoding == "verbose"
+            else transcript.text()
+        ),
+    }
+
+
+def convert_transcript_to_text(
+    transcript: Transcript, encoding: Literal["verbose", "compact"] = "verbose"
+) -> str:
+    result: Transcription = _build_chain().invoke(_chain_input(transcript, encoding))
+
+    return result.readable_transcription
+
 
-    result: Transcription = chain.invoke(
-        {
-            "transcription_formatted": transcription_formatted,
-        }
+async def aconvert_transcript_to_text(
+    transcript: Transcript, encoding: Literal["verbose", "compact"] = "verbose"
+) -> str:
+    result: Transcription = await _build_chain().ainvoke(
+        _chain_input(transcript, encoding)
     )
 
     return result.readable_transcription
@@ -1,7 +1,12 @@
 from speech_grade.pipeline.types import Event
-from openai.types.audio import TranscriptionWord
-from typing import List, Literal, get_args
-from langchain_openai import ChatOpenAI
+from speech_grade.pipeline.transcript import Transcript
+from speech_grade.pipeline.utils import combine_overlapping_events
+from speech_grade.pipeline.tools.format_transcription import (
+    COMPACT_ENCODING_DESCRIPTION,
+    encode_transcript,
+)
+from typing import List, Literal, Optional, Sequence, get_args
+from speech_grade.pipeline.llm import get_chat_model, registered_chain
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import PydanticOutputParser
 
@@ -124,21 +129,9 @@ class AudioProblems(BaseModel):
     )
 
 
-def detect_audio_problems(transcription_words: List[TranscriptionWord]) -> List[Event]:
-    model = ChatOpenAI(model="gpt-4o")
-
-    id_to_word = {i + 1: word for i, word in enumerate(transcription_words)}
-
-    transcription_formatted = "\n".join(
-        [f"Word id: {i}, word: {word.word}" for i, word in id_to_word.items()]
-    )
-
-    class_descriptions_formatted = "\n".join(
-        [
-            f"- Class: {problem_class}, description: {class_descriptions[problem_class]}"
-            for problem_class in problem_classes
-        ]
-    )
+@registered_chain
+def _build_chain():
+    model = get_chat_model("gpt-4o")
 
     parser = PydanticOutputParser(pydantic_object=AudioProblems)
 
@@ -146,34 +139,67 @@ def detect_audio_problems(transcription_words: List[TranscriptionWord]) -> List[
         [
             (
                 "system",
-                "You will be given a transcription of a video in polish language and you will need to detect problems in the audio. Here are possible classes with descriptions:\n{class_descriptions}\nStart with thinking what problems could be in the audio via citing parts. Then you will need to return list of problems with start and end word id and problem class.\n {output_format}",
+                "You will be given a transcription of a video in polish language and you will need to detect problems in the audio. Here are possible classes with descriptions:\n{class_descriptions}\nStart with thinking what problems could be in the audio via citing parts. Then you will need to return list of problems with start and end word id and problem class.\n{transcription_format} {output_format}",
             ),
             ("user", "{transcription_formatted}"),
         ]
     )
 
-    prompt.input_variables = ["transcription_formatted"]
+    prompt.input_variables = ["transcription_formatted", "transcription_format"]
     prompt.partial_variables = {"output_format": parser.get_format_instructions()}
 
-    chain = prompt | model | parser
+    return prompt | model | parser
 
-    result: AudioProblems = chain.invoke(
-        {
-            "transcription_formatted": transcription_formatted,
-            "class_descriptions": class_descriptions_formatted,
-        }
+
+def _chain_input(
+    transcript: Transcript,
+    encoding: Literal["verbose", "compact"] = "verbose",
+    exclude_classes: Sequence[str] = (),
+) -> dict:
+    transcription_formatted = encode_transcript(transcript, encoding)
+
+    class_descriptions_formatted = "\n".join(
+        [
+            f"- Class: {problem_class}, description: {class_descriptions[problem_class]}"
+            for problem_class in problem_classes
+            if problem_class not in exclude_classes
+        ]
     )
 
+    return {
+        "transcription_formatted": transcription_formatted,
+        "transcription_format": (
+            COMPACT_ENCODING_DESCRIPTION + "\n" if encoding == "compact" else ""
+        ),
+        "class_descriptions": class_descriptions_formatted,
+    }
+
+
+def _word_index(transcript: Transcript, word_id: int) -> int:
+    # Word ids in the prompt start at 1
+    if not 1 <= word_id <= len(transcript):
+        raise KeyError(word_id)
+
+    return word_id - 1
+
+
+def _to_events(
+    result: AudioProblems, transcript: Transcript, exclude_classes: Sequence[str] = ()
+) -> List[Event]:
     final_result = []
     for problem in result.problems:
-        start_word = id_to_word[problem.start_word_id]
-        end_word = id_to_word[problem.end_word_id]
+        # The schema still lists every class, the model may return an excluded one
+        if problem.problem_class in exclude_classes:
+            continue
+
+        start_index = _word_index(transcript, problem.start_word_id)
+        end_index = _word_index(transcript, problem.end_word_id)
         problem_class = problem.problem_class
 
         final_result.append(
             Event(
-                start_s=start_word.start,
-                end_s=end_word.end,
+                start_s=float(transcript.starts[start_index]),
+                end_s=float(transcript.ends[end_index]),
                 event=class_pl_names[problem_class],
                 description=class_pl_problem_description[problem_class],
                 color=class_colors[problem_class],
@@ -181,3 +207,118 @@ def detect_audio_problems(transcription_words: List[TranscriptionWord]) -> List[
         )
 
     return final_result
+
+
+def check_window_settings(window_size: int, window_overlap: int):
+    """
+    Reject window settings with which the windows wouldn't advance through the
+    transcript, eg. an overlap as large as the window would start a window at
+    every word and make thousands of LLM calls for an hour long talk.
+
+    :raises ValueError: When the window size or overlap is out of range
+    """
+    if window_size <= 0:
+        raise ValueError(f"Window size must be positive, got {window_size}")
+    if not 0 <= window_overlap < window_size:
+        raise ValueError(
+            f"Window overlap must be between 0 and the window size {window_size},"
+            f" got {window_overlap}"
+        )
+
+
+def split_into_windows(
+    transcript: Transcript, window_size: int, window_overlap: int
+) -> List[Transcript]:
+    """
+    Split the transcript into windows of window_size words, consecutive windows
+    share window_overlap words so problems spanning a boundary are seen whole.
+
+    :raises ValueError: On bad window settings, see check_window_settings
+    """
+    check_window_settings(window_size, window_overlap)
+    step = window_size - window_overlap
+
+    windows = []
+    for start in range(0, len(transcript), step):
+        windows.append(transcript[start : start + window_size])
+
+        if start + window_size >= len(transcript):
+            break
+
+    return windows
+
+
+def _windowed_events(
+    results: List[AudioProblems],
+    windows: List[Transcript],
+    exclude_classes: Sequence[str] = (),
+) -> List[Event]:
+    events = []
+    for result, window in zip(results, windows):
+        # Word ids are local to the window, its arrays map them back to time
+        events.extend(_to_events(result, window, exclude_classes))
+
+    # Problems found twice in the overlaps are merged
+    return combine_overlapping_events(events)
+
+
+def detect_audio_problems(
+    transcript: Transcript,
+    window_size: Optional[int] = None,
+    window_overlap: int = 100,
+    max_concurrency: int = 4,
+    encoding: Literal["verbose", "compact"] = "verbose",
+    exclude_classes: Sequence[str] = (),
+) -> List[Event]:
+    """
+    Detect speech problems in the transcript with an LLM.
+
+    Transcripts longer than window_size words are split into overlapping windows
+    analyzed concurrently, so long talks don't hit the context or output limits.
+
+    :param transcript: Transcript of the video
+    :param window_size: Maximum number of words in a single call (None means no windows)
+    :param window_overlap: Number of words shared by consecutive windows
+    :param max_concurrency: Maximum number of windows analyzed at the same time
+    :param encoding: Encoding of the word ids in the prompt, see encode_transcript
+    :param exclude_classes: Problem classes left out of the prompt, eg. ones detected locally
+    :return: List of detected problems
+    """
+    if window_size is None or len(transcript) <= window_size:
+        result: AudioProblems = _build_chain().invoke(
+            _chain_input(transcript, encoding, exclude_classes)
+        )
+
+        return _to_events(result, transcript, exclude_classes)
+
+    windows = split_into_windows(transcript, window_size, window_overlap)
+    results = _build_chain().batch(
+        [_chain_input(window, encoding, exclude_classes) for window in windows],
+        {"max_concurrency": max_concurrency},
+    )
+
+    return _windowed_events(results, windows, exclude_classes)
+
+
+async def adetect_audio_problems(
+    transcript: Transcript,
+    window_size: Optional[int] = None,
+    window_overlap: int = 100,
+    max_concurrency: int = 4,
+    encoding: Literal["verbose", "compact"] = "verbose",
+    exclude_classes: Sequence[str] = (),
+) -> List[Event]:
+    if window_size is None or len(transcript) <= window_size:
+        result: AudioProblems = await _build_chain().ainvoke(
+            _chain_input(transcript, encoding, exclude_classes)
+        )
+
+        return _to_events(result, transcript, exclude_classes)
+
+    windows = split_into_windows(transcript, window_size, window_overlap)
+    results = await _build_chain().abatch(
+        [_chain_input(window, encoding, exclude_classes) for window in windows],
+        {"max_concurrency": max_concurrency},
+    )
+
+    return _windowed_events(results, windows, exclude_classes)
@@ -1,6 +1,6 @@
-from openai.types.audio import TranscriptionWord
+from speech_grade.pipeline.transcript import Transcript
 from typing import List
-from langchain_openai import ChatOpenAI
+from speech_grade.pipeline.llm import get_chat_model, registered_chain
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import PydanticOutputParser
 
@@ -15,10 +15,9 @@ class TargetGroup(BaseModel):
     )
 
 
-def extract_target_group(transcription_words: List[TranscriptionWord]) -> str:
-    model = ChatOpenAI(model="gpt-4o")
-
-    transcription_formatted = " ".join([word.word for word in transcription_words])
+@registered_chain
+def _build_chain():
+    model = get_chat_model("gpt-4o")
 
     parser = PydanticOutputParser(pydantic_object=TargetGroup)
 
@@ -35,12 +34,22 @@ def extract_target_group(transcription_words: List[TranscriptionWord]) -> str:
     prompt.input_variables = ["transcription_formatted"]
     prompt.partial_variables = {"output_format": parser.get_format_instructions()}
 
-    chain = prompt | model | parser
+    return prompt | model | parser
 
-    result: TargetGroup = chain.invoke(
-        {
-            "transcription_formatted": transcription_formatted,
-        }
-    )
+
+def _chain_input(transcript: Transcript) -> dict:
+    return {
+        "transcription_formatted": transcript.text(),
+    }
+
+
+def extract_target_group(transcript: Transcript) -> str:
+    result: TargetGroup = _build_chain().invoke(_chain_input(transcript))
+
+    return result.target_group
+
+
+async def aextract_target_group(transcript: Transcript) -> str:
+    result: TargetGroup = await _build_chain().ainvoke(_chain_input(transcript))
 
     return result.target_group
@@ -1,6 +1,7 @@
-from openai.types.audio import TranscriptionWord
-from typing import List
-from langchain_openai import ChatOpenAI
+from speech_grade.pipeline.transcript import Transcript
+from typing import List, Literal
+from speech_grade.pipeline.tools.format_transcription import encode_transcript
+from speech_grade.pipeline.llm import get_chat_model, registered_chain
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import PydanticOutputParser
 
@@ -12,14 +13,9 @@ class Questions(BaseModel):
     questions: List[str] = Field(..., description="Questions to the speaker.")
 
 
-def generate_questions(transcription_words: List[TranscriptionWord]) -> str:
-    model = ChatOpenAI(model="gpt-4o")
-
-    id_to_word = {i + 1: word for i, word in enumerate(transcription_words)}
-
-    transcription_formatted = "\n".join(
-        [f"Word id: {i}, word: {word.word}" for i, word in id_to_word.items()]
-    )
+@registered_chain
+def _build_chain():
+    model = get_chat_model("gpt-4o")
 
     parser = PydanticOutputParser(pydantic_object=Questions)
 
@@ -36,12 +32,33 @@ def generate_questions(transcription_words: List[TranscriptionWord]) -> str:
     prompt.input_variables = ["transcription_formatted"]
     prompt.partial_variables = {"output_format": parser.get_format_instructions()}
 
-    chain = prompt | model | parser
+    return prompt | model | parser
 
-    result: Questions = chain.invoke(
-        {
-            "transcription_formatted": transcription_formatted,
-        }
-    )
+
+def _chain_input(
+    transcript: Transcript, encoding: Literal["verbose", "compact"] = "verbose"
+) -> dict:
+    # The model doesn't cite word ids here, compact encoding leaves them out
+    return {
+        "transcription_formatted": (
+            encode_transcript(transcript)
+            if encoding == "verbose"
+            else transcript.text()
+        ),
+    }
+
+
+def generate_questions(
+    transcript: Transcript, encoding: Literal["verbose", "compact"] = "verbose"
+) -> str:
+    result: Questions = _build_chain().invoke(_chain_input(transcript, encoding))
+
+    return result.questions
+
+
+async def agenerate_questions(
+    transcript: Transcript, encoding: Literal["verbose", "compact"] = "verbose"
+) -> str:
+    result: Questions = await _build_chain().ainvoke(_chain_input(transcript, encoding))
 
     return result.questions
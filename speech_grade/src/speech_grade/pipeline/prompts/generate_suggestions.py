@@ -1,7 +1,7 @@
 from speech_grade.pipeline.types import Event
-from openai.types.audio import TranscriptionWord
+from speech_grade.pipeline.transcript import Transcript
 from typing import List
-from langchain_openai import ChatOpenAI
+from speech_grade.pipeline.llm import get_chat_model, registered_chain
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import PydanticOutputParser
 
@@ -15,18 +15,9 @@ class Suggestions(BaseModel):
     )
 
 
-def generate_suggestions(
-    transcription_words: List[TranscriptionWord], events: List[Event]
-) -> List[str]:
-    model = ChatOpenAI(model="gpt-4o")
-
-    events_set = set()
-    for event in events:
-        events_set.add(event["event"])
-
-    problems_formatted = "\n".join([f"- {event}" for event in events_set])
-
-    transcription_formatted = " ".join([word.word for word in transcription_words])
+@registered_chain
+def _build_chain():
+    model = get_chat_model("gpt-4o")
 
     parser = PydanticOutputParser(pydantic_object=Suggestions)
 
@@ -46,13 +37,33 @@ def generate_suggestions(
     prompt.input_variables = ["transcription_formatted"]
     prompt.partial_variables = {"output_format": parser.get_format_instructions()}
 
-    chain = prompt | model | parser
+    return prompt | model | parser
 
-    result: Suggestions = chain.invoke(
-        {
-            "transcription_formatted": transcription_formatted,
-            "problems_formatted": problems_formatted,
-        }
-    )
+
+def _chain_input(transcript: Transcript, events: List[Event]) -> dict:
+    events_set = set()
+    for event in events:
+        events_set.add(event["event"])
+
+    problems_formatted = "\n".join([f"- {event}" for event in sorted(events_set)])
+
+    transcription_formatted = transcript.text()
+
+    return {
+        "transcription_formatted": transcription_formatted,
+        "problems_formatted": problems_formatted,
+    }
+
+
+def generate_suggestions(transcript: Transcript, events: List[Event]) -> List[str]:
+    result: Suggestions = _build_chain().invoke(_chain_input(transcript, events))
+
+    return result.suggestions
+
+
+async def agenerate_suggestions(
+    transcript: Transcript, events: List[Event]
+) -> List[str]:
+    result: Suggestions = await _build_chain().ainvoke(_chain_input(transcript, events))
 
     return result.suggestions
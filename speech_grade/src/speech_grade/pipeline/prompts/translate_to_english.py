@@ -1,4 +1,4 @@
-from langchain_openai import ChatOpenAI
+from speech_grade.pipeline.llm import get_chat_model, registered_chain
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import PydanticOutputParser
 
@@ -12,8 +12,9 @@ class Translation(BaseModel):
     )
 
 
-def translate_to_english(text: str) -> str:
-    model = ChatOpenAI(model="gpt-4o-mini")
+@registered_chain
+def _build_chain():
+    model = get_chat_model("gpt-4o-mini")
 
     parser = PydanticOutputParser(pydantic_object=Translation)
 
@@ -30,12 +31,16 @@ def translate_to_english(text: str) -> str:
     prompt.input_variables = ["text"]
     prompt.partial_variables = {"output_format": parser.get_format_instructions()}
 
-    chain = prompt | model | parser
+    return prompt | model | parser
 
-    result: Translation = chain.invoke(
-        {
-            "text": text,
-        }
-    )
+
+def translate_to_english(text: str) -> str:
+    result: Translation = _build_chain().invoke({"text": text})
+
+    return result.translation
+
+
+async def atranslate_to_english(text: str) -> str:
+    result: Translation = await _build_chain().ainvoke({"text": text})
 
     return result.translation
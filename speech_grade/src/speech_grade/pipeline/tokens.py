@@ -0,0 +1,102 @@
+import threading
+from typing import Any, Dict, List, Optional
+from langchain_core.messages import BaseMessage
+
+# Used when the tokenizer can't be loaded (tiktoken downloads its vocabularies on first use)
+CHARS_PER_TOKEN = 4
+# Base and per 512x512 tile tokens of an image, looked up by the longest matching
+# model prefix. The mini model bills images at ~33x the tokens for the same price.
+IMAGE_TOKENS = {
+    "gpt-4o-mini": (2833, 5667),
+    "gpt-4o": (85, 170),
+}
+# Tokens added to every chat message by the chat format
+MESSAGE_OVERHEAD_TOKENS = 3
+
+# Encoding of every model, None when it couldn't be loaded
+_encodings: Dict[str, Any] = {}
+# Held while loading, so concurrent first calls don't all try the download
+_encodings_lock = threading.Lock()
+
+
+def _load_encoding(model: str):
+    try:
+        import tiktoken
+
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        print(f"Tokenizer for {model} is not available, estimating tokens: {e}")
+        return None
+
+
+def _get_encoding(model: str):
+    if model in _encodings:
+        return _encodings[model]
+
+    with _encodings_lock:
+        if model not in _encodings:
+            _encodings[model] = _load_encoding(model)
+
+        return _encodings[model]
+
+
+def count_tokens(text: str, model: str = "gpt-4o") -> int:
+    """
+    Count tokens of the text with the model's tokenizer.
+
+    Falls back to an estimate of CHARS_PER_TOKEN characters per token when the
+    tokenizer is not available.
+    """
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_image_tokens(image_url: Dict[str, Any], model: str = "gpt-4o") -> int:
+    """
+    Tokens of an image sent to the model, assuming the 512x512 frames of the
+    pipeline which fit a single tile. Low detail images are billed the base only.
+    """
+    prefixes = [prefix for prefix in IMAGE_TOKENS if model.startswith(prefix)]
+    base_tokens, tile_tokens = IMAGE_TOKENS[max(prefixes, key=len, default="gpt-4o")]
+    if image_url.get("detail") == "low":
+        return base_tokens
+
+    return base_tokens + tile_tokens
+
+
+def count_message_tokens(
+    messages: List[BaseMessage], model: Optional[str] = None
+) -> int:
+    """
+    Count input tokens of chat messages, images are counted by count_image_tokens.
+
+    :param messages: Messages sent to the model
+    :param model: Model name, selects the tokenizer (default is gpt-4o)
+    :return: Number of input tokens
+    """
+    model = model or "gpt-4o"
+
+    tokens = 0
+    for message in messages:
+        tokens += MESSAGE_OVERHEAD_TOKENS
+
+        content = message.content
+        if isinstance(content, str):
+            tokens += count_tokens(content, model)
+            continue
+
+        for part in content:
+            if isinstance(part, str):
+                tokens += count_tokens(part, model)
+            elif part.get("type") == "image_url":
+                tokens += count_image_tokens(part.get("image_url") or {}, model)
+            else:
+                tokens += count_tokens(part.get("text", ""), model)
+
+    return tokens
@@ -0,0 +1,161 @@
+import io
+import subprocess
+import wave
+import numpy as np
+from typing import List, Literal, Tuple
+from moviepy.config import get_setting
+
+FFMPEG_BINARY = get_setting("FFMPEG_BINARY")
+
+# Frames converted to floats at once by frame_energies
+ENERGY_BLOCK_FRAMES = 4096
+
+# Largest file taken by the transcription API
+MAX_UPLOAD_BYTES = 25_000_000
+# Bits per second of the opus encoding, -b:a 24k below
+OPUS_BITRATE = 24_000
+
+AudioFormat = Literal["wav", "flac", "opus"]
+
+# File name, content type and ffmpeg output options of the formats encoded by encode_audio
+AUDIO_FORMATS = {
+    "wav": ("audio.wav", "audio/wav", []),
+    "flac": ("audio.flac", "audio/flac", ["-c:a", "flac", "-f", "flac"]),
+    # Low bitrate speech mode, Whisper hears no difference at 24 kbps
+    "opus": (
+        "audio.ogg",
+        "audio/ogg",
+        ["-c:a", "libopus", "-b:a", "24k", "-application", "voip", "-f", "ogg"],
+    ),
+}
+
+
+def frame_energies(samples: np.ndarray, sample_rate: int, frame_s: float = 0.02):
+    """
+    Mean square of the samples in consecutive frames of frame_s seconds.
+
+    :param samples: Mono int16 PCM samples of the audio
+    :param sample_rate: Sample rate of the samples
+    :param frame_s: Length of a frame in seconds, the last partial frame is dropped
+    :return: Array with the mean square of every frame
+    """
+    frame_length = max(1, int(frame_s * sample_rate))
+    frame_count = len(samples) // frame_length
+    frames = samples[: frame_count * frame_length].reshape(frame_count, frame_length)
+
+    # Converted in blocks, a float copy of a long track would take hundreds of MB
+    energies = np.empty(frame_count, dtype=np.float64)
+    for start in range(0, frame_count, ENERGY_BLOCK_FRAMES):
+        block = frames[start : start + ENERGY_BLOCK_FRAMES].astype(np.float64)
+        energies[start : start + len(block)] = np.einsum("ij,ij->i", block, block)
+
+    return energies / frame_length
+
+
+def split_at_silences(
+    samples: np.ndarray,
+    sample_rate: int,
+    chunk_s: float,
+    search_s: float = 30,
+    frame_s: float = 0.02,
+) -> List[Tuple[int, int]]:
+    """
+    Split the audio into chunks of at most chunk_s seconds, cut at the quietest moments.
+
+    Every cut is placed in the quietest frame of the last search_s seconds before
+    the chunk would exceed chunk_s, so it falls between words whenever there is
+    a pause in that part.
+
+    :param samples: Mono int16 PCM samples of the audio
+    :param sample_rate: Sample rate of the samples
+    :param chunk_s: Maximum length of a chunk in seconds
+    :param search_s: Length of the part before the maximum where the cut is searched for
+    :param frame_s: Resolution of the cuts in seconds
+    :return: List of [start, end) sample ranges covering all samples
+    """
+    frame_length = max(1, int(frame_s * sample_rate))
+    energies = frame_energies(samples, sample_rate, frame_s)
+
+    chunk_frames = max(1, int(chunk_s / frame_s))
+    search_frames = max(1, min(int(search_s / frame_s), chunk_frames // 2))
+
+    cuts = [0]
+    while len(samples) - cuts[-1] > chunk_frames * frame_length:
+        start_frame = cuts[-1] // frame_length
+        search_start = start_frame + chunk_frames - search_frames
+        search_end = min(start_frame + chunk_frames, len(energies))
+
+        quietest = search_start + int(np.argmin(energies[search_start:search_end]))
+        # Cut in the middle of the quietest frame
+        cuts.append(quietest * frame_length + frame_length // 2)
+
+    cuts.append(len(samples))
+
+    return list(zip(cuts[:-1], cuts[1:]))
+
+
+def max_chunk_s(audio_format: AudioFormat, sample_rate: int) -> float:
+    """
+    Longest audio in seconds which is sure to fit in MAX_UPLOAD_BYTES once encoded.
+
+    WAV takes 2 bytes per sample and FLAC is at worst about the same, opus has
+    a fixed bitrate. 5% are left for the headers and the container.
+
+    :param audio_format: One of AUDIO_FORMATS
+    :param sample_rate: Sample rate of the encoded samples
+    :return: Maximum length of a chunk in seconds
+    """
+    bytes_per_s = OPUS_BITRATE / 8 if audio_format == "opus" else 2 * sample_rate
+
+    return MAX_UPLOAD_BYTES * 0.95 / bytes_per_s
+
+
+def wav_bytes(samples: np.ndarray, sample_rate: int) -> bytes:
+    """Mono int16 PCM samples as a WAV file in memory."""
+    buffer = io.BytesIO()
+
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(samples.astype(np.int16).tobytes())
+
+    return buffer.getvalue()
+
+
+def encode_audio(
+    samples: np.ndarray, sample_rate: int, audio_format: AudioFormat = "wav"
+) -> Tuple[str, bytes, str]:
+    """
+    Encode mono int16 PCM samples in memory, piped through ffmpeg for compressed formats.
+
+    :param samples: Mono int16 PCM samples of the audio
+    :param sample_rate: Sample rate of the samples, 16000 is all Whisper needs
+    :param audio_format: One of AUDIO_FORMATS
+    :return: File name, content and content type, as accepted by the OpenAI client
+    """
+    file_name, content_type, options = AUDIO_FORMATS[audio_format]
+
+    if audio_format == "wav":
+        return file_name, wav_bytes(samples, sample_rate), content_type
+
+    # fmt: off
+    command = [
+        FFMPEG_BINARY, "-v", "error",
+        "-f", "s16le", "-ac", "1", "-ar", str(sample_rate), "-i", "pipe:0",
+        *options, "pipe:1",
+    ]
+    # fmt: on
+    process = subprocess.run(
+        command,
+        input=samples.astype(np.int16).tobytes(),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+
+    if process.returncode != 0:
+        raise RuntimeError(
+            f"ffmpeg failed to encode {audio_format}: {process.stderr.decode(errors='replace')}"
+        )
+
+    return file_name, process.stdout, content_type
@@ -0,0 +1,54 @@
+import cv2
+import numpy as np
+from typing import List
+from speech_grade.pipeline.types import Frame
+
+
+def perceptual_hash(image: bytes) -> int:
+    """
+    Compute a 64 bit DCT based perceptual hash (pHash) of a JPEG encoded image.
+
+    Visually similar images get hashes with a small Hamming distance.
+    """
+    gray = cv2.imdecode(np.frombuffer(image, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+    small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA)
+
+    # Keep the lowest frequencies, they describe the overall structure of the image
+    low_frequencies = cv2.dct(np.float32(small))[:8, :8].flatten()
+    bits = low_frequencies > np.median(low_frequencies[1:])
+
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def dedupe_frames(frames: List[Frame], max_distance: int = 6) -> List[Frame]:
+    """
+    Group consecutive, visually similar frames and keep one frame per group.
+
+    A frame joins the current group while the Hamming distance between its hash
+    and the hash of the group's first frame is at most max_distance. The first
+    frame represents the group and its time range is stretched over the whole
+    group, so events found on it cover every frame it stands for.
+
+    :param frames: Frames ordered by time
+    :param max_distance: Maximum Hamming distance (out of 64 bits) within a group
+    :return: One frame per group
+    """
+    deduplicated_frames = []
+    group_hash = None
+
+    for frame in frames:
+        frame_hash = perceptual_hash(frame["image"])
+
+        if (
+            group_hash is not None
+            and bin(frame_hash ^ group_hash).count("1") <= max_distance
+        ):
+            deduplicated_frames[-1]["end_s"] = frame["end_s"]
+            continue
+
+        deduplicated_frames.append(Frame(**frame))
+        group_hash = frame_hash
+
+    print(f"Deduplicated {len(frames)} frames to {len(deduplicated_frames)}")
+
+    return deduplicated_frames
@@ -0,0 +1,174 @@
+import re
+import numpy as np
+from speech_grade.pipeline.transcript import Transcript
+from typing import List, Tuple
+
+# Hesitations as Whisper spells them in Polish transcripts
+# fmt: off
+FILLER_WORDS = frozenset([
+    "y", "yy", "yyy", "e", "ee", "eee", "eh", "ehm", "em", "aaa", "hm", "hmm",
+    "mhm", "mmm", "yhm", "uh", "um",
+])
+# fmt: on
+# Stretched variants of the above, eg. "yyyy", "eeem", "hmmm", "yyymmm"
+FILLER_PATTERN = re.compile(r"^(y+|e+|a{3,}|u{2,}|[yeau]*h*m+|[yeau]+h+|m+h+m+)$")
+
+# Function words, a phrase made only of these isn't counted as overused
+# fmt: off
+STOPWORDS = frozenset([
+    "a", "ale", "bo", "by", "czy", "do", "go", "i", "ich", "jak", "jest",
+    "już", "jej", "mi", "na", "nie", "o", "od", "po", "się", "są", "ta",
+    "tak", "te", "to", "tu", "w", "we", "z", "za", "ze", "że",
+])
+# fmt: on
+
+PUNCTUATION = ".,!?;:…\"'()[]-–—"
+
+
+def normalize_word(word: str) -> str:
+    """Lowercase word without the punctuation Whisper attaches to it."""
+    return word.strip().strip(PUNCTUATION).lower()
+
+
+def is_filler(word: str) -> bool:
+    word = normalize_word(word)
+
+    return word in FILLER_WORDS or FILLER_PATTERN.match(word) is not None
+
+
+def _token_ids(transcript: Transcript) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Normalized token of every word, and whether it's a filler or a stopword.
+
+    Words are normalized once per vocabulary entry, so the cost doesn't grow
+    with the length of the transcript.
+
+    :return: Token id of every word, filler mask and stopword mask of the words
+    """
+    normalized = [normalize_word(word) for word in transcript.vocabulary]
+    tokens, vocabulary_tokens = np.unique(normalized, return_inverse=True)
+
+    filler_tokens = np.array([is_filler(token) for token in tokens], dtype=bool)
+    stopword_tokens = np.array([token in STOPWORDS for token in tokens], dtype=bool)
+
+    token_ids = vocabulary_tokens.reshape(-1)[transcript.word_ids]
+
+    return token_ids, filler_tokens[token_ids], stopword_tokens[token_ids]
+
+
+def _word_ranges(
+    transcript: Transcript, first: np.ndarray, last: np.ndarray
+) -> List[Tuple[float, float]]:
+    """Time from the start of word first to the end of word last, for every pair."""
+    return list(zip(transcript.starts[first].tolist(), transcript.ends[last].tolist()))
+
+
+def find_filler_words(transcript: Transcript) -> List[Tuple[float, float]]:
+    """
+    Find hesitations like "yyy", "eee" or "hmm" in the transcript.
+
+    Consecutive fillers are reported as a single range.
+
+    :param transcript: Transcript of the audio
+    :return: Start and end in seconds of every run of filler words
+    """
+    if len(transcript) == 0:
+        return []
+
+    _, fillers, _ = _token_ids(transcript)
+
+    edges = np.diff(np.concatenate(([0], fillers.astype(np.int8), [0])))
+    first = np.flatnonzero(edges == 1)
+    last = np.flatnonzero(edges == -1) - 1
+
+    return _word_ranges(transcript, first, last)
+
+
+def _ngram_keys(token_ids: np.ndarray, n: int) -> np.ndarray:
+    """Single int64 key of the n words starting at every position."""
+    base = np.int64(token_ids.max()) + 1 if len(token_ids) else np.int64(1)
+
+    keys = token_ids[: len(token_ids) - n + 1].astype(np.int64)
+    for offset in range(1, n):
+        keys = keys * base + token_ids[offset : len(token_ids) - n + 1 + offset]
+
+    return keys
+
+
+def find_repetitions(
+    transcript: Transcript,
+    max_n: int = 3,
+    min_count: int = 3,
+    window_words: int = 50,
+) -> List[Tuple[float, float]]:
+    """
+    Find repeated words and overused phrases in the transcript.
+
+    Two kinds of repetition are found for every phrase length n up to max_n:
+    a phrase said twice in a row ("że że", "to jest to jest"), and a phrase of
+    at least two words said min_count times within window_words words, which
+    is reported at each of its occurrences. Fillers are left to
+    find_filler_words, and phrases made only of function words don't count as
+    overused.
+
+    :param transcript: Transcript of the audio
+    :param max_n: Longest phrase in words
+    :param min_count: Number of occurrences of an overused phrase
+    :param window_words: Number of words the occurrences of an overused phrase fall within
+    :return: Start and end in seconds of every repetition
+    :raises ValueError: When min_count is below 2
+    """
+    if min_count < 2:
+        raise ValueError(f"An overused phrase needs min_count >= 2, got {min_count}")
+
+    token_ids, fillers, stopwords = _token_ids(transcript)
+
+    firsts = []
+    lasts = []
+    for n in range(1, max_n + 1):
+        if len(token_ids) < 2 * n:
+            break
+
+        keys = _ngram_keys(token_ids, n)
+        # Phrases with a filler are hesitations, not repetitions
+        has_filler = _ngram_keys(fillers.astype(np.int64), n) > 0
+
+        # The same phrase right after itself
+        repeated = np.flatnonzero(
+            (keys[:-n] == keys[n:]) & ~has_filler[:-n] & ~has_filler[n:]
+        )
+        firsts.append(repeated)
+        lasts.append(repeated + 2 * n - 1)
+
+        if n < 2:
+            continue
+
+        # The same phrase min_count times within window_words, found by sorting
+        # the occurrences by phrase and position
+        positions = np.flatnonzero(
+            ~has_filler & (_ngram_keys((~stopwords).astype(np.int64), n) > 0)
+        )
+        order = np.lexsort((positions, keys[positions]))
+        sorted_keys = keys[positions][order]
+        sorted_positions = positions[order]
+
+        span = min_count - 1
+        overused = np.flatnonzero(
+            (sorted_keys[span:] == sorted_keys[:-span])
+            & (sorted_positions[span:] - sorted_positions[:-span] <= window_words)
+        )
+        for back in range(min_count):
+            occurrences = sorted_positions[overused + span - back]
+            firsts.append(occurrences)
+            lasts.append(occurrences + n - 1)
+
+    if not firsts:
+        return []
+
+    # An occurrence within several overused windows is found once per window,
+    # unique also sorts the ranges by their start
+    ranges = np.unique(
+        np.stack([np.concatenate(firsts), np.concatenate(lasts)]), axis=1
+    )
+
+    return _word_ranges(transcript, ranges[0], ranges[1])
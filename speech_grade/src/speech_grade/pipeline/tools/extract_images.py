@@ -1,15 +1,40 @@
 import cv2
 import os
+import time
+from typing import List, Literal, Optional
+from speech_grade.pipeline.types import Frame
 
+# Number of kept frames timed with each strategy before "auto" picks one
+AUTO_PROBE_FRAMES = 3
 
-def extract_frames(video_path, output_folder, interval=2):
+
+def extract_frames(
+    video_path,
+    output_folder: Optional[str] = None,
+    interval=2,
+    sampling: Literal["decode", "grab", "seek", "auto"] = "auto",
+) -> List[Frame]:
     """
-    Extract frames from a video file at specified intervals, resize to 512x512, and save them to a folder.
+    Extract frames from a video file at specified intervals, resize to 512x512 and encode them as JPEG.
+
+    Every frame covers the time range since the previously extracted one.
+
+    Sampling strategies:
+    - decode: decode and convert every frame, keep one per interval
+    - grab: decode every frame but only convert the kept ones (grab without retrieve)
+    - seek: jump straight to every kept frame, only frames between the preceding
+      keyframe and the kept one are decoded. Much faster for videos with short
+      GOPs, slower than grab when keyframes are further apart than the interval
+    - auto: time seek and grab on the first frames and continue with the faster one
 
     :param video_path: Path to the input video file
-    :param output_folder: Path to the folder where frames will be saved
+    :param output_folder: Optional folder where frames are also saved as "{start_ms}_{end_ms}.jpg"
     :param interval: Interval in seconds between frame extractions (default is 2)
+    :param sampling: Frame sampling strategy (default is auto)
+    :return: List of extracted frames
     """
+    started_at = time.perf_counter()
+
     # Open the video file
     video = cv2.VideoCapture(video_path)
 
@@ -17,14 +42,58 @@ def extract_frames(video_path, output_folder, interval=2):
     fps = video.get(cv2.CAP_PROP_FPS)
     total_frames = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
 
+    # Calculate frame interval
+    frame_interval = int(fps * interval)
+
+    if sampling == "decode":
+        frames = _extract_frames_decode(video, fps, total_frames, frame_interval)
+    else:
+        frames = _extract_frames_sparse(
+            video, fps, total_frames, frame_interval, sampling
+        )
+
+    # Release the video capture object
+    video.release()
+
+    if output_folder is not None:
+        save_frames(frames, output_folder)
+
+    print(
+        f"Extracted {len(frames)} frames in {time.perf_counter() - started_at:.2f}s ({sampling})"
+    )
+
+    return frames
+
+
+def encode_frame(frame, timestamp_start: int, timestamp_end: int) -> Frame:
+    """Resize a decoded BGR frame to 512x512 and encode it as JPEG."""
+    resized_frame = cv2.resize(frame, (512, 512), interpolation=cv2.INTER_AREA)
+
+    _, image = cv2.imencode(".jpg", resized_frame)
+
+    return Frame(
+        start_s=timestamp_start / 1000,
+        end_s=timestamp_end / 1000,
+        image=image.tobytes(),
+    )
+
+
+def save_frames(frames: List[Frame], output_folder: str):
     # Create output folder if it doesn't exist
     os.makedirs(output_folder, exist_ok=True)
 
-    # Calculate frame interval
-    frame_interval = int(fps * interval)
+    for frame in frames:
+        frame_filename = os.path.join(
+            output_folder,
+            f"{int(frame['start_s'] * 1000):04d}_{int(frame['end_s'] * 1000):04d}.jpg",
+        )
+        with open(frame_filename, "wb") as frame_file:
+            frame_file.write(frame["image"])
 
+
+def _extract_frames_decode(video, fps, total_frames, frame_interval) -> List[Frame]:
     frame_count = 0
-    saved_count = 0
+    frames = []
     last_timestamp = 0
 
     while True:
@@ -39,17 +108,7 @@ def extract_frames(video_path, output_folder, interval=2):
 
         # Save frame at specified intervals
         if frame_count % frame_interval == 0:
-            timestamp_start = last_timestamp
-            timestamp_end = current_timestamp
-            frame_filename = os.path.join(
-                output_folder, f"{timestamp_start:04d}_{timestamp_end:04d}.jpg"
-            )
-
-            # Resize the frame to 512x512
-            resized_frame = cv2.resize(frame, (512, 512), interpolation=cv2.INTER_AREA)
-
-            cv2.imwrite(frame_filename, resized_frame)
-            saved_count += 1
+            frames.append(encode_frame(frame, last_timestamp, current_timestamp))
             last_timestamp = current_timestamp
 
         frame_count += 1
@@ -58,7 +117,49 @@ def extract_frames(video_path, output_folder, interval=2):
         if frame_count % 100 == 0:
             print(f"Processed {frame_count}/{total_frames} frames")
 
-    # Release the video capture object
-    video.release()
+    return frames
+
+
+def _extract_frames_sparse(
+    video, fps, total_frames, frame_interval, sampling
+) -> List[Frame]:
+    position = 0
+    frames = []
+    last_timestamp = 0
+    timings = {"seek": [], "grab": []}
+
+    for i, frame_number in enumerate(range(0, total_frames, frame_interval)):
+        strategy = sampling
+        if sampling == "auto":
+            if i <= AUTO_PROBE_FRAMES:
+                strategy = "seek"
+            elif i <= 2 * AUTO_PROBE_FRAMES:
+                strategy = "grab"
+            else:
+                strategy = min(timings, key=lambda s: sum(timings[s]))
+
+        started_at = time.perf_counter()
+
+        if strategy == "seek" and frame_number != position:
+            video.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+            position = frame_number
+        else:
+            # Decode the skipped frames without converting them
+            while position < frame_number and video.grab():
+                position += 1
+
+        success, frame = video.read()
+
+        if not success or position != frame_number:
+            break
+
+        # The first frame is read the same way by both strategies
+        if i > 0:
+            timings[strategy].append(time.perf_counter() - started_at)
+        position += 1
+
+        current_timestamp = int((frame_number / fps) * 1000)
+        frames.append(encode_frame(frame, last_timestamp, current_timestamp))
+        last_timestamp = current_timestamp
 
-    print(f"Extracted {saved_count} frames to {output_folder}")
+    return frames
@@ -1,22 +1,61 @@
 from speech_grade.pipeline.types import (
     TranscriptionSentence as TranscriptionSentenceType,
 )
-from openai.types.audio import TranscriptionWord
-from typing import List
-from more_itertools import chunked
-
+from speech_grade.pipeline.transcript import Transcript
+from typing import List, Literal
 
 
 def format_transcription(
-    transcription_words: List[TranscriptionWord],
+    transcript: Transcript,
 ) -> List[TranscriptionSentenceType]:
+    SENTENCE_SIZE = 7
+
+    words = transcript.words
+    starts = transcript.starts.tolist()
+
     result = []
-    for words_chunk in chunked(transcription_words, 7):
+    for i in range(0, len(transcript), SENTENCE_SIZE):
         result.append(
             TranscriptionSentenceType(
-                sentence=" ".join([word.word for word in words_chunk]),
-                sentence_start=words_chunk[0].start,
+                sentence=" ".join(words[i : i + SENTENCE_SIZE]),
+                sentence_start=starts[i],
             )
         )
 
     return result
+
+
+COMPACT_ENCODING_DESCRIPTION = 'Word ids are marked sparsely: "[N]" is the id of the word right after it and the next words have consecutive ids (N+1, N+2, ...) until the next marker. Markers are not words.'
+
+
+def encode_transcript(
+    transcript: Transcript,
+    encoding: Literal["verbose", "compact"] = "verbose",
+    marker_every: int = 5,
+) -> str:
+    """
+    Render the transcript with word ids (starting at 1) for prompts citing word ranges.
+
+    - verbose: one "Word id: {id}, word: {word}" line per word
+    - compact: words separated by spaces with an "[id]" marker before every
+      marker_every-th word, see COMPACT_ENCODING_DESCRIPTION
+
+    :param transcript: Transcript to render
+    :param encoding: Encoding of the word ids
+    :param marker_every: Number of words between id markers of the compact encoding
+    :return: Rendered transcript
+    """
+    words = transcript.words
+
+    if encoding == "verbose":
+        return "\n".join(
+            [f"Word id: {i}, word: {word}" for i, word in enumerate(words, start=1)]
+        )
+
+    parts = []
+    for i, word in enumerate(words):
+        if i % marker_every == 0:
+            parts.append(f"[{i + 1}]")
+        parts.append(word)
+
+    return " ".join(parts)
@@ -0,0 +1,140 @@
+import os
+import subprocess
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from moviepy.config import get_setting
+from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+from tempfile import TemporaryFile
+from typing import List, Literal, Optional, Tuple
+from speech_grade.pipeline.tools.extract_images import encode_frame, extract_frames
+from speech_grade.pipeline.types import Frame
+
+FFMPEG_BINARY = get_setting("FFMPEG_BINARY")
+
+
+def ingest_media(
+    video_path: str,
+    audio_path: Optional[str],
+    interval: float = 2,
+    sample_rate: int = 16000,
+    frame_sampling: Literal["filter", "decode", "grab", "seek", "auto"] = "auto",
+) -> Tuple[np.ndarray, int, List[Frame]]:
+    """
+    Decode the video once and produce everything the pipeline needs from it.
+
+    A single ffmpeg process demuxes the container and fans the decoded streams
+    out to the MP3 used for transcription, raw mono PCM used by the audio tools
+    and, with frame_sampling="filter", 512x512 frames sampled every interval
+    seconds. Frames are kept in memory as JPEG buffers with their time range.
+    Without audio_path the MP3 is skipped and the audio is sent for
+    transcription encoded from the PCM instead (see encode_audio).
+
+    The filter decodes every video frame though. With the other frame_sampling
+    values the ffmpeg pass only decodes audio, while extract_frames decodes just
+    the frames it keeps in parallel (see extract_frames for the strategies).
+
+    :param video_path: Path to the input video file
+    :param audio_path: Path where the MP3 file will be saved, None skips it
+    :param interval: Interval in seconds between frame extractions (default is 2)
+    :param sample_rate: Sample rate of the returned PCM (default is 16000)
+    :param frame_sampling: How the frames are sampled (default is auto)
+    :return: Tuple of mono int16 PCM samples, their sample rate and the extracted frames
+    """
+    command = [FFMPEG_BINARY, "-v", "error", "-y", "-i", video_path]
+    if audio_path is not None:
+        # MP3 for the transcription
+        command += ["-map", "0:a:0", "-c:a", "libmp3lame", "-q:a", "4", audio_path]
+    # Raw PCM for the audio tools
+    # fmt: off
+    command += [
+        "-map", "0:a:0", "-ac", "1", "-ar", str(sample_rate), "-f", "s16le",
+    ]
+    # fmt: on
+
+    if frame_sampling == "filter":
+        samples, frames = _run_ffmpeg_with_frames(command, video_path, interval)
+    else:
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            frames_future = executor.submit(
+                extract_frames, video_path, interval=interval, sampling=frame_sampling
+            )
+            samples = _run_ffmpeg(command + ["pipe:1"], video_path)
+            frames = frames_future.result()
+
+    print(
+        f"Ingested {video_path}: {len(samples) / sample_rate:.1f}s of audio, {len(frames)} frames"
+    )
+
+    return samples, sample_rate, frames
+
+
+def probe_duration_s(video_path: str) -> Optional[float]:
+    """Duration of the video read from its container, None when ffmpeg can't tell."""
+    try:
+        return ffmpeg_parse_infos(video_path).get("duration")
+    except OSError:
+        return None
+
+
+def _run_ffmpeg(command, video_path) -> np.ndarray:
+    process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    if process.returncode != 0:
+        raise RuntimeError(
+            f"ffmpeg failed to ingest {video_path}: {process.stderr.decode(errors='replace')}"
+        )
+
+    return np.frombuffer(process.stdout, dtype=np.int16)
+
+
+def _run_ffmpeg_with_frames(
+    command, video_path, interval
+) -> Tuple[np.ndarray, List[Frame]]:
+    """Run ffmpeg writing PCM to an extra pipe and raw sampled frames to stdout."""
+    pcm_read_fd, pcm_write_fd = os.pipe()
+
+    # fmt: off
+    command = command + [
+        f"pipe:{pcm_write_fd}",
+        "-map", "0:v:0", "-vf", f"fps=1/{interval},scale=512:512:flags=area",
+        "-f", "rawvideo", "-pix_fmt", "bgr24", "pipe:1",
+    ]
+    # fmt: on
+
+    with TemporaryFile() as stderr, ThreadPoolExecutor(max_workers=1) as executor:
+        process = subprocess.Popen(
+            command, stdout=subprocess.PIPE, stderr=stderr, pass_fds=(pcm_write_fd,)
+        )
+        os.close(pcm_write_fd)
+
+        with os.fdopen(pcm_read_fd, "rb") as pcm_pipe:
+            pcm_future = executor.submit(pcm_pipe.read)
+
+            # Encode frames as they arrive so only one raw frame is held at a time
+            frames = []
+            frame_size = 512 * 512 * 3
+            last_timestamp = 0
+            while raw_frame := process.stdout.read(frame_size):
+                if len(raw_frame) < frame_size:
+                    break
+
+                current_timestamp = int(len(frames) * interval * 1000)
+                frames.append(
+                    encode_frame(
+                        np.frombuffer(raw_frame, dtype=np.uint8).reshape(512, 512, 3),
+                        last_timestamp,
+                        current_timestamp,
+                    )
+                )
+                last_timestamp = current_timestamp
+
+            samples = np.frombuffer(pcm_future.result(), dtype=np.int16)
+
+        process.stdout.close()
+        if process.wait() != 0:
+            stderr.seek(0)
+            raise RuntimeError(
+                f"ffmpeg failed to ingest {video_path}: {stderr.read().decode(errors='replace')}"
+            )
+
+    return samples, frames
@@ -0,0 +1,74 @@
+import numpy as np
+from typing import List, Optional, Tuple
+from speech_grade.pipeline.tools.audio_chunks import frame_energies
+
+# Below this difference between speech and background level no silence can be told apart
+MIN_DYNAMIC_RANGE_DB = 10
+
+
+def _runs(mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """First index and index after the last one of every run of True values."""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def detect_silences(
+    samples: np.ndarray,
+    sample_rate: int,
+    min_silence_s: float = 2.0,
+    frame_s: float = 0.02,
+    threshold_db: Optional[float] = None,
+    max_gap_s: float = 0.1,
+) -> List[Tuple[float, float]]:
+    """
+    Find silences in decoded audio from the energy of short frames.
+
+    A frame is silent when its level is below threshold_db. By default the
+    threshold adapts to the recording and lies a quarter of the way from the
+    background level (10th percentile of the frame levels) to the speech level
+    (90th percentile). Clicks and breaths shorter than max_gap_s don't break a
+    silence. Silences at the very start and end of the audio are not pauses in
+    the speech and are skipped.
+
+    :param samples: Mono int16 PCM samples of the audio
+    :param sample_rate: Sample rate of the samples
+    :param min_silence_s: Minimum length of a reported silence in seconds
+    :param frame_s: Resolution of the silences in seconds
+    :param threshold_db: Level in dB below which a frame is silent, None adapts it to the audio
+    :param max_gap_s: Longest sound in seconds which is treated as part of a silence
+    :return: Start and end in seconds of every silence
+    """
+    energies = frame_energies(samples, sample_rate, frame_s)
+    if len(energies) == 0:
+        return []
+
+    # Same scale as the word volumes, 20 * log10 of the RMS
+    db = 10 * np.log10(energies + 1)
+
+    if threshold_db is None:
+        background_db, speech_db = np.percentile(db, [10, 90])
+        if speech_db - background_db < MIN_DYNAMIC_RANGE_DB:
+            return []
+        threshold_db = background_db + (speech_db - background_db) / 4
+
+    silent = db < threshold_db
+
+    # Fill short sounds surrounded by silence
+    sound_starts, sound_ends = _runs(~silent)
+    short = (sound_ends - sound_starts <= int(max_gap_s / frame_s)) & (
+        (sound_starts > 0) & (sound_ends < len(silent))
+    )
+    fill = np.zeros(len(silent) + 1, dtype=np.int64)
+    np.add.at(fill, sound_starts[short], 1)
+    np.add.at(fill, sound_ends[short], -1)
+    silent |= np.cumsum(fill[:-1]) > 0
+
+    starts, ends = _runs(silent)
+    keep = (
+        (ends - starts >= int(np.ceil(min_silence_s / frame_s)))
+        & (starts > 0)
+        & (ends < len(silent))
+    )
+
+    return list(zip((starts[keep] * frame_s).tolist(), (ends[keep] * frame_s).tolist()))
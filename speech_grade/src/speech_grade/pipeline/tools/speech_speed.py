@@ -1,41 +1,34 @@
-from openai.types.audio import TranscriptionWord
+import numpy as np
+from speech_grade.pipeline.transcript import Transcript
 from typing import List, Tuple
-from more_itertools import windowed
-
 
 
 def speech_speed(
-    transcription_words: List[TranscriptionWord],
+    transcript: Transcript,
 ) -> Tuple[float, List[float]]:
     CHUNK_SIZE = 7
 
-    words_per_minute = []
-    wpm_timestamps = []
-
-    for words_chunk in windowed(transcription_words, CHUNK_SIZE, step=1):
-        duration = words_chunk[-1].end - words_chunk[0].start
+    if len(transcript) == 0:
+        return 0.0, [], [], [], []
 
-        middle_chunk = words_chunk[len(words_chunk) // 2]
+    starts = transcript.starts
+    ends = transcript.ends
 
-        if duration == 0:
-            continue
+    # Sliding windows of CHUNK_SIZE consecutive words (a single window for shorter transcripts)
+    chunk_size = min(CHUNK_SIZE, len(transcript))
+    durations = ends[chunk_size - 1 :] - starts[: len(starts) - chunk_size + 1]
+    middle = np.arange(len(durations)) + chunk_size // 2
 
-        words_per_minute.append(len(words_chunk) / duration * 60)
-        wpm_timestamps.append((middle_chunk.start, middle_chunk.end))
-
-    avg_words_per_minute = (
-        len(transcription_words)
-        / (transcription_words[-1].end - transcription_words[0].start)
-        * 60
+    non_empty = durations != 0
+    words_per_minute = (chunk_size / durations[non_empty] * 60).tolist()
+    wpm_timestamps = list(
+        zip(starts[middle[non_empty]].tolist(), ends[middle[non_empty]].tolist())
     )
 
-    pauses = []
-    pauses_timestamps = []
-    last_word_end = transcription_words[0].end
-    for word in transcription_words[1:]:
-        pauses.append(word.start - last_word_end)
-        last_word_end = word.end
-        pauses_timestamps.append((last_word_end, word.end))
+    avg_words_per_minute = float(len(transcript) / (ends[-1] - starts[0]) * 60)
+
+    pauses = (starts[1:] - ends[:-1]).tolist()
+    pauses_timestamps = list(zip(ends[1:].tolist(), ends[1:].tolist()))
 
     return (
         avg_words_per_minute,
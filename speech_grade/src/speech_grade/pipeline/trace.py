@@ -0,0 +1,348 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from uuid import UUID, uuid4
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.callbacks.manager import dispatch_custom_event
+from langchain_core.outputs import LLMResult
+from langchain_core.runnables import RunnableConfig
+from langchain_core.runnables.config import (
+    ensure_config,
+    get_callback_manager_for_config,
+)
+
+# Custom callback events the spans of trace_span and trace_event are sent with
+SPAN_START_EVENT = "speech_grade_span_start"
+SPAN_END_EVENT = "speech_grade_span_end"
+INSTANT_EVENT = "speech_grade_instant"
+
+
+def _dispatch(name: str, data: Dict[str, Any], config: RunnableConfig):
+    # Outside of a run there are no callbacks to send the event to
+    if get_callback_manager_for_config(config).parent_run_id is None:
+        return
+
+    dispatch_custom_event(name, data, config=config)
+
+
+@contextmanager
+def trace_span(
+    cat: str, name: str, config: Optional[RunnableConfig] = None, **args: Any
+) -> Iterator[None]:
+    """
+    Record the body as a span in the trace of the run it's called from.
+
+    The span is nested in the row of the node it's called from, outside of a
+    run it's not recorded. Threads started by the node need its context, eg.
+    a ContextThreadPoolExecutor.
+
+    :param cat: Category of the span, eg. "transcription"
+    :param name: Name of the span
+    :param config: Config of the run, defaults to the one of the running node
+    :param args: Arguments shown with the span
+    """
+    config = ensure_config(config)
+    span_id = uuid4()
+    _dispatch(
+        SPAN_START_EVENT,
+        {
+            "id": span_id,
+            "cat": cat,
+            "name": name,
+            "time": time.perf_counter(),
+            "args": args,
+        },
+        config,
+    )
+
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = repr(e)
+        raise
+    finally:
+        _dispatch(
+            SPAN_END_EVENT,
+            {"id": span_id, "time": time.perf_counter(), "error": error},
+            config,
+        )
+
+
+def trace_event(
+    cat: str, name: str, config: Optional[RunnableConfig] = None, **args: Any
+):
+    """Record a moment in the trace of the run it's called from, see trace_span."""
+    _dispatch(
+        INSTANT_EVENT,
+        {"cat": cat, "name": name, "time": time.perf_counter(), "args": args},
+        ensure_config(config),
+    )
+
+
+class TraceCallbackHandler(BaseCallbackHandler):
+    """
+    Records a timeline of a single graph run in the Chrome trace event format.
+
+    Every node attempt, including each Send of step_classify_image, becomes a
+    complete ("X") event, and every model call an event nested in its node.
+    Spans of trace_span, eg. the Whisper requests, and moments of trace_event,
+    eg. LLM cache hits, are nested in their node the same way.
+    Nodes running at the same time are put on separate rows, so the trace
+    opened in chrome://tracing or ui.perfetto.dev shows the parallelism and
+    the critical path of the run.
+
+    Pass a new instance in the config of a run, eg.
+    graph.invoke(state, {"callbacks": [tracer]}), then call to_chrome_trace().
+    """
+
+    def __init__(self):
+        self._started_at = time.perf_counter()
+        self._graph_run_id: Optional[UUID] = None
+        self._graph_span: Optional[Dict[str, Any]] = None
+        # Running and finished spans by run id
+        self._spans: Dict[UUID, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def on_chain_start(
+        self,
+        serialized: Dict[str, Any],
+        inputs: Dict[str, Any],
+        *,
+        run_id: UUID,
+        parent_run_id: Optional[UUID] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ):
+        metadata = metadata or {}
+
+        with self._lock:
+            if parent_run_id is None:
+                self._graph_run_id = run_id
+                self._graph_span = self._span("graph", kwargs.get("name") or "graph")
+                return
+
+            node = metadata.get("langgraph_node", "")
+            # Only the nodes themselves, not the runnables inside them
+            if parent_run_id != self._graph_run_id or node.startswith("__"):
+                return
+
+            self._spans[run_id] = self._span(
+                "node",
+                node,
+                task=metadata.get("langgraph_checkpoint_ns"),
+                step=metadata.get("langgraph_step"),
+            )
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any):
+        self._finish(run_id)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._finish(run_id, error=repr(error))
+
+    def on_chat_model_start(
+        self,
+        serialized: Dict[str, Any],
+        messages: List[List[Any]],
+        *,
+        run_id: UUID,
+        metadata: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ):
+        self._on_llm_start(run_id, metadata, kwargs)
+
+    def on_llm_start(
+        self,
+        serialized: Dict[str, Any],
+        prompts: List[str],
+        *,
+        run_id: UUID,
+        metadata: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ):
+        self._on_llm_start(run_id, metadata, kwargs)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any):
+        llm_output = response.llm_output or {}
+        token_usage = llm_output.get("token_usage") or {}
+
+        self._finish(
+            run_id,
+            prompt_tokens=token_usage.get("prompt_tokens"),
+            completion_tokens=token_usage.get("completion_tokens"),
+        )
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._finish(run_id, error=repr(error))
+
+    def on_custom_event(
+        self,
+        name: str,
+        data: Any,
+        *,
+        run_id: UUID,
+        metadata: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ):
+        if name == SPAN_END_EVENT:
+            self._finish(
+                data["id"],
+                end_us=self._to_us(data["time"]),
+                error=data["error"],
+            )
+            return
+
+        if name not in (SPAN_START_EVENT, INSTANT_EVENT):
+            return
+
+        metadata = metadata or {}
+        span = self._span(
+            data["cat"],
+            data["name"],
+            start_us=self._to_us(data["time"]),
+            node=metadata.get("langgraph_node"),
+            task=metadata.get("langgraph_checkpoint_ns"),
+            **data["args"],
+        )
+        if name == INSTANT_EVENT:
+            span["instant"] = True
+            span["end_us"] = span["start_us"]
+
+        with self._lock:
+            self._spans[data.get("id", uuid4())] = span
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """
+        Chrome trace of the recorded spans, unfinished ones end at the time of the call.
+
+        :return: JSON serializable trace in the JSON Object Format
+        """
+        now = self._now_us()
+
+        with self._lock:
+            spans = list(self._spans.values())
+            graph_span = self._graph_span
+
+        pid = os.getpid()
+        events = []
+
+        def add(span: Dict[str, Any], tid: int):
+            event = {
+                "name": span["name"],
+                "cat": span["cat"],
+                "ph": "X",
+                "ts": span["start_us"],
+                "pid": pid,
+                "tid": tid,
+                "args": span["args"],
+            }
+            if span.get("instant"):
+                # Instant event scoped to its row
+                event.update(ph="i", s="t")
+            else:
+                event["dur"] = span.get("end_us", now) - span["start_us"]
+            events.append(event)
+
+        if graph_span is not None:
+            add(graph_span, 0)
+
+        # Rows are reused by the nodes in order of their start, a node goes to
+        # the first row free at that time, so the number of rows is the
+        # highest number of nodes running at once
+        row_ends: List[float] = []
+        # (start, row) of every attempt of a task
+        task_rows: Dict[str, List[Tuple[float, int]]] = {}
+        nodes = sorted(
+            (span for span in spans if span["cat"] == "node"),
+            key=lambda span: span["start_us"],
+        )
+        for span in nodes:
+            row = next(
+                (i for i, end_us in enumerate(row_ends) if end_us <= span["start_us"]),
+                len(row_ends),
+            )
+            if row == len(row_ends):
+                row_ends.append(0)
+
+            row_ends[row] = span.get("end_us", now)
+            task_rows.setdefault(span["args"].get("task"), []).append(
+                (span["start_us"], row)
+            )
+            add(span, row + 1)
+
+        # Model calls and the other spans are nested in the row of the node
+        # attempt which made them
+        for span in spans:
+            if span["cat"] == "node":
+                continue
+
+            attempts = task_rows.get(span["args"].get("task"), [])
+            rows = [row for start_us, row in attempts if start_us <= span["start_us"]]
+            add(span, rows[-1] + 1 if rows else 0)
+
+        events.append(self._thread_name(pid, 0, "graph"))
+        for row in range(len(row_ends)):
+            events.append(self._thread_name(pid, row + 1, f"nodes {row + 1}"))
+
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def _on_llm_start(
+        self,
+        run_id: UUID,
+        metadata: Optional[Dict[str, Any]],
+        kwargs: Dict[str, Any],
+    ):
+        metadata = metadata or {}
+        model = (kwargs.get("invocation_params") or {}).get("model")
+
+        with self._lock:
+            self._spans[run_id] = self._span(
+                "llm",
+                model or kwargs.get("name") or "llm",
+                node=metadata.get("langgraph_node"),
+                task=metadata.get("langgraph_checkpoint_ns"),
+            )
+
+    def _span(
+        self, cat: str, name: str, start_us: Optional[float] = None, **args: Any
+    ) -> Dict[str, Any]:
+        return {
+            "cat": cat,
+            "name": name,
+            "start_us": self._now_us() if start_us is None else start_us,
+            "args": args,
+        }
+
+    def _finish(self, run_id: UUID, end_us: Optional[float] = None, **args: Any):
+        with self._lock:
+            if run_id == self._graph_run_id:
+                span = self._graph_span
+            else:
+                span = self._spans.get(run_id)
+
+            if span is None or "end_us" in span:
+                return
+
+            span["end_us"] = self._now_us() if end_us is None else end_us
+            span["args"].update(
+                {key: value for key, value in args.items() if value is not None}
+            )
+
+    def _now_us(self) -> float:
+        return self._to_us(time.perf_counter())
+
+    def _to_us(self, perf_counter: float) -> float:
+        # Events may be handled later, eg. in an executor, so they carry their own time
+        return (perf_counter - self._started_at) * 1e6
+
+    @staticmethod
+    def _thread_name(pid: int, tid: int, name: str) -> Dict[str, Any]:
+        return {
+            "name": "thread_name",
+            "ph": "M",
+            "pid": pid,
+            "tid": tid,
+            "args": {"name": name},
+        }
@@ -0,0 +1,114 @@
+import numpy as np
+from openai.types.audio import TranscriptionWord
+from typing import Dict, List, Union
+
+
+class Transcript:
+    """
+    Columnar transcript of timed words.
+
+    Word i is spoken from starts[i] to ends[i] seconds and reads
+    vocabulary[word_ids[i]]. Every distinct word is stored once in the
+    vocabulary. Words are ordered by time, which is how the transcription
+    returns them.
+
+    Slicing by word index or time returns a new Transcript sharing the
+    vocabulary, plain slices are views of the arrays.
+
+    :param starts: Start of every word in seconds
+    :param ends: End of every word in seconds
+    :param word_ids: Index of every word in the vocabulary
+    :param vocabulary: Distinct words
+    """
+
+    def __init__(
+        self,
+        starts: np.ndarray,
+        ends: np.ndarray,
+        word_ids: np.ndarray,
+        vocabulary: List[str],
+    ):
+        self.starts = starts
+        self.ends = ends
+        self.word_ids = word_ids
+        self.vocabulary = vocabulary
+
+    @classmethod
+    def from_words(cls, words: List[TranscriptionWord]) -> "Transcript":
+        vocabulary: List[str] = []
+        word_to_id: Dict[str, int] = {}
+
+        word_ids = np.empty(len(words), dtype=np.int32)
+        for i, word in enumerate(words):
+            word_id = word_to_id.get(word.word)
+            if word_id is None:
+                word_id = word_to_id[word.word] = len(vocabulary)
+                vocabulary.append(word.word)
+            word_ids[i] = word_id
+
+        return cls(
+            starts=np.array([word.start for word in words], dtype=np.float64),
+            ends=np.array([word.end for word in words], dtype=np.float64),
+            word_ids=word_ids,
+            vocabulary=vocabulary,
+        )
+
+    def to_words(self) -> List[TranscriptionWord]:
+        return [
+            TranscriptionWord(word=word, start=start, end=end)
+            for word, start, end in zip(
+                self.words, self.starts.tolist(), self.ends.tolist()
+            )
+        ]
+
+    @property
+    def words(self) -> List[str]:
+        vocabulary = self.vocabulary
+        return [vocabulary[word_id] for word_id in self.word_ids.tolist()]
+
+    @property
+    def start_s(self) -> float:
+        """Start of the first word, 0 for an empty transcript."""
+        return float(self.starts.min()) if len(self) > 0 else 0.0
+
+    @property
+    def end_s(self) -> float:
+        """End of the last word, 0 for an empty transcript."""
+        return float(self.ends.max()) if len(self) > 0 else 0.0
+
+    def text(self, separator: str = " ") -> str:
+        return separator.join(self.words)
+
+    def slice_time(self, start_s: float, end_s: float) -> "Transcript":
+        """Words overlapping the [start_s, end_s) time range."""
+        first = int(np.searchsorted(self.ends, start_s, side="right"))
+        last = int(np.searchsorted(self.starts, end_s, side="left"))
+
+        return self[first : max(first, last)]
+
+    def __len__(self) -> int:
+        return len(self.word_ids)
+
+    def __getitem__(
+        self, index: Union[int, slice, np.ndarray]
+    ) -> Union[TranscriptionWord, "Transcript"]:
+        """
+        A single word for an integer index, otherwise a Transcript with the words
+        selected by a slice, an array of indices or a boolean mask.
+        """
+        if isinstance(index, (int, np.integer)):
+            return TranscriptionWord(
+                word=self.vocabulary[self.word_ids[index]],
+                start=float(self.starts[index]),
+                end=float(self.ends[index]),
+            )
+
+        return Transcript(
+            starts=self.starts[index],
+            ends=self.ends[index],
+            word_ids=self.word_ids[index],
+            vocabulary=self.vocabulary,
+        )
+
+    def __repr__(self) -> str:
+        return f"Transcript({len(self)} words, {len(self.vocabulary)} distinct)"
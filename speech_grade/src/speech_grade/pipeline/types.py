@@ -13,3 +13,9 @@ class Event(TypedDict):
 class TranscriptionSentence(TypedDict):
     sentence_start: float
     sentence: str
+
+
+class Frame(TypedDict):
+    start_s: float
+    end_s: float
+    image: bytes  # JPEG encoded
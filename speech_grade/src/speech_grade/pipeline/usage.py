@@ -0,0 +1,143 @@
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from speech_grade.pipeline.tokens import count_message_tokens
+
+
+class UsageCallbackHandler(BaseCallbackHandler):
+    """
+    Collects LLM calls, token usage and latency of a single graph run, per graph node.
+
+    Pass it in the run config, eg. graph.invoke(state, {"callbacks": [handler]}).
+    Results served from the LLM cache never reach the model and are not counted.
+    With a prompt_token_budget the input tokens are also counted locally before
+    each call (estimated_tokens), so oversized prompts are flagged before they
+    are sent. Without it nothing is tokenized and estimated_tokens stay 0.
+
+    :param prompt_token_budget: Warn about calls with more estimated input tokens (0 disables)
+    """
+
+    def __init__(self, prompt_token_budget: int = 0):
+        self.usage: Dict[str, Dict[str, float]] = {}
+        self.prompt_token_budget = prompt_token_budget
+        self._started_at: Dict[UUID, float] = {}
+        self._nodes: Dict[UUID, str] = {}
+        self._estimated_tokens: Dict[UUID, int] = {}
+        self._lock = threading.Lock()
+
+    def on_chat_model_start(
+        self,
+        serialized: Dict[str, Any],
+        messages: List[List[Any]],
+        *,
+        run_id: UUID,
+        metadata: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ):
+        estimated_tokens = 0
+        if self.prompt_token_budget:
+            model = (kwargs.get("invocation_params") or {}).get("model")
+            estimated_tokens = sum(
+                count_message_tokens(prompt, model) for prompt in messages
+            )
+
+        self._on_start(run_id, metadata, estimated_tokens)
+
+    def on_llm_start(
+        self,
+        serialized: Dict[str, Any],
+        prompts: List[str],
+        *,
+        run_id: UUID,
+        metadata: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ):
+        self._on_start(run_id, metadata)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any):
+        token_usage = (response.llm_output or {}).get("token_usage") or {}
+
+        with self._lock:
+            started_at = self._started_at.pop(run_id, None)
+            node = self._nodes.pop(run_id, "unknown")
+            estimated_tokens = self._estimated_tokens.pop(run_id, 0)
+
+            usage = self.usage.setdefault(
+                node,
+                {
+                    "calls": 0,
+                    "prompt_tokens": 0,
+                    "completion_tokens": 0,
+                    "estimated_tokens": 0,
+                    "latency_s": 0.0,
+                },
+            )
+            usage["calls"] += 1
+            usage["prompt_tokens"] += token_usage.get("prompt_tokens") or 0
+            usage["completion_tokens"] += token_usage.get("completion_tokens") or 0
+            usage["estimated_tokens"] += estimated_tokens
+            if started_at is not None:
+                usage["latency_s"] += time.perf_counter() - started_at
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        with self._lock:
+            self._started_at.pop(run_id, None)
+            self._nodes.pop(run_id, None)
+            self._estimated_tokens.pop(run_id, None)
+
+    def total(self) -> Dict[str, float]:
+        total = {
+            "calls": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "estimated_tokens": 0,
+            "latency_s": 0.0,
+        }
+        for usage in self.usage.values():
+            for key in total:
+                total[key] += usage[key]
+
+        return total
+
+    def report(self) -> str:
+        lines = [
+            f"{node}: {self._format(usage)}"
+            for node, usage in sorted(self.usage.items())
+        ]
+        lines.append(f"total: {self._format(self.total())}")
+
+        return "\n".join(lines)
+
+    def _format(self, usage: Dict[str, float]) -> str:
+        estimated = (
+            f" (~{usage['estimated_tokens']} estimated)"
+            if self.prompt_token_budget
+            else ""
+        )
+
+        return (
+            f"{usage['calls']} calls, {usage['prompt_tokens']} prompt tokens{estimated}, "
+            f"{usage['completion_tokens']} completion tokens, {usage['latency_s']:.2f}s"
+        )
+
+    def _on_start(
+        self,
+        run_id: UUID,
+        metadata: Optional[Dict[str, Any]],
+        estimated_tokens: int = 0,
+    ):
+        node = (metadata or {}).get("langgraph_node", "unknown")
+
+        if self.prompt_token_budget and estimated_tokens > self.prompt_token_budget:
+            print(
+                f"Prompt of {node} has ~{estimated_tokens} tokens, "
+                f"over the budget of {self.prompt_token_budget}"
+            )
+
+        with self._lock:
+            self._started_at[run_id] = time.perf_counter()
+            self._nodes[run_id] = node
+            self._estimated_tokens[run_id] = estimated_tokens
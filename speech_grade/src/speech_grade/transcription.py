@@ -1,4 +1,20 @@
-from openai import OpenAI
+import asyncio
+import numpy as np
+from typing import List, Tuple
+from langchain_core.runnables.config import ContextThreadPoolExecutor
+from openai.types.audio import TranscriptionWord
+from speech_grade.pipeline.llm import get_async_openai_client, get_openai_client
+from speech_grade.pipeline.trace import trace_span
+from speech_grade.pipeline.tools.audio_chunks import (
+    AudioFormat,
+    encode_audio,
+    max_chunk_s,
+    split_at_silences,
+)
+
+WHISPER_PROMPT = (
+    "Wydaje mi się, że yyymmm że jest to dobry pomysł! [pauza] Chyba, że nie..."
+)
 
 
 def transcribe_audio(audio_file_path):
@@ -10,18 +26,48 @@ def transcribe_audio(audio_file_path):
     :return: The transcription text
     """
     try:
-        client = OpenAI()
+        client = get_openai_client()
 
         audio_file = open(audio_file_path, "rb")
 
-        transcript = client.audio.transcriptions.create(
-            file=audio_file,
-            model="whisper-1",
-            language="pl",
-            response_format="verbose_json",
-            prompt="Wydaje mi się, że yyymmm że jest to dobry pomysł! [pauza] Chyba, że nie...",
-            timestamp_granularities=["word"],
-        )
+        with trace_span("transcription", "whisper-1"):
+            transcript = client.audio.transcriptions.create(
+                file=audio_file,
+                model="whisper-1",
+                language="pl",
+                response_format="verbose_json",
+                prompt=WHISPER_PROMPT,
+                timestamp_granularities=["word"],
+            )
+
+        return transcript.words
+
+    except Exception as e:
+        print(f"An error occurred during transcription: {str(e)}")
+        return None
+
+
+async def atranscribe_audio(audio_file_path):
+    """
+    Async variant of transcribe_audio, doesn't block the event loop while waiting for the API.
+
+    :param audio_file_path: Path to the input audio file (MP3)
+    :return: The transcription words
+    """
+    try:
+        client = get_async_openai_client()
+
+        with open(audio_file_path, "rb") as audio_file, trace_span(
+            "transcription", "whisper-1"
+        ):
+            transcript = await client.audio.transcriptions.create(
+                file=audio_file,
+                model="whisper-1",
+                language="pl",
+                response_format="verbose_json",
+                prompt=WHISPER_PROMPT,
+                timestamp_granularities=["word"],
+            )
 
         return transcript.words
 
@@ -30,6 +76,168 @@ def transcribe_audio(audio_file_path):
         return None
 
 
+def _split(
+    samples: np.ndarray,
+    sample_rate: int,
+    chunk_s: float,
+    overlap_s: float,
+    audio_format: AudioFormat,
+) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]:
+    """
+    Split the audio at silences, every chunk is padded with overlap_s seconds of
+    its neighbours so words cut at a seam are heard whole by one of the chunks.
+
+    :return: Sample ranges owned by the chunks, and the padded sample ranges sent for transcription
+    :raises ValueError: When a padded chunk could exceed the upload limit of the API
+    """
+    max_s = max_chunk_s(audio_format, sample_rate)
+    if chunk_s + 2 * overlap_s > max_s:
+        raise ValueError(
+            f"Chunks of {chunk_s:.0f}s with {overlap_s:.0f}s of overlap exceed the"
+            f" upload limit, {audio_format} chunks can be at most {max_s:.0f}s long"
+        )
+
+    chunks = split_at_silences(samples, sample_rate, chunk_s)
+    overlap = int(overlap_s * sample_rate)
+
+    padded = [
+        (max(0, start - overlap), min(len(samples), end + overlap))
+        for start, end in chunks
+    ]
+
+    return chunks, padded
+
+
+def _stitch(
+    chunks: List[Tuple[int, int]],
+    padded: List[Tuple[int, int]],
+    chunk_words: List[List[TranscriptionWord]],
+    sample_rate: int,
+) -> List[TranscriptionWord]:
+    """
+    Move the words of every chunk to the time of the whole audio and keep only the
+    ones in the range owned by the chunk, words from the padding are dropped as
+    the neighbouring chunk has them too.
+    """
+    words = []
+    for (start, end), (padded_start, _), chunk in zip(chunks, padded, chunk_words):
+        offset_s = padded_start / sample_rate
+        for word in chunk or []:
+            word = TranscriptionWord(
+                word=word.word, start=word.start + offset_s, end=word.end + offset_s
+            )
+            # A word belongs to the chunk holding its middle
+            middle = (word.start + word.end) / 2 * sample_rate
+            if start <= middle < end:
+                words.append(word)
+
+    return words
+
+
+def transcribe_chunked(
+    samples: np.ndarray,
+    sample_rate: int,
+    chunk_s: float = 600,
+    overlap_s: float = 2,
+    max_concurrency: int = 4,
+    audio_format: AudioFormat = "wav",
+) -> List[TranscriptionWord]:
+    """
+    Transcribe PCM audio in chunks cut at silences, up to max_concurrency at the same time.
+
+    Every chunk is encoded in memory and uploaded without touching the disk, so
+    audio shorter than chunk_s is a single in-memory upload. The word
+    timestamps of the chunks are moved to the time of the whole audio and
+    stitched into a single list, words in the overlaps are kept once. The API
+    takes files up to 25 MB, a padded chunk can be at most max_chunk_s long, at
+    16 kHz that's ~12 minutes of WAV or FLAC and ~2 hours of Opus.
+
+    :param samples: Mono int16 PCM samples of the audio
+    :param sample_rate: Sample rate of the samples
+    :param chunk_s: Maximum length of a chunk in seconds
+    :param overlap_s: Seconds of the neighbouring chunks added to every chunk
+    :param max_concurrency: Maximum number of chunks transcribed at the same time
+    :param audio_format: Format the chunks are uploaded in, see AUDIO_FORMATS
+    :return: The transcription words
+    :raises ValueError: When the chunks could exceed the upload limit of the API
+    """
+    chunks, padded = _split(samples, sample_rate, chunk_s, overlap_s, audio_format)
+    client = get_openai_client()
+
+    def transcribe(chunk: int, start: int, end: int) -> List[TranscriptionWord]:
+        file = encode_audio(samples[start:end], sample_rate, audio_format)
+
+        with trace_span(
+            "transcription",
+            "whisper-1",
+            chunk=chunk,
+            start_s=start / sample_rate,
+            end_s=end / sample_rate,
+        ):
+            return client.audio.transcriptions.create(
+                file=file,
+                model="whisper-1",
+                language="pl",
+                response_format="verbose_json",
+                prompt=WHISPER_PROMPT,
+                timestamp_granularities=["word"],
+            ).words
+
+    # Workers get the context of the node, so their spans land in its trace
+    with ContextThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        chunk_words = list(
+            executor.map(
+                lambda r: transcribe(*r), [(i, *r) for i, r in enumerate(padded)]
+            )
+        )
+
+    return _stitch(chunks, padded, chunk_words, sample_rate)
+
+
+async def atranscribe_chunked(
+    samples: np.ndarray,
+    sample_rate: int,
+    chunk_s: float = 600,
+    overlap_s: float = 2,
+    max_concurrency: int = 4,
+    audio_format: AudioFormat = "wav",
+) -> List[TranscriptionWord]:
+    """Async variant of transcribe_chunked, the API is awaited on the event loop."""
+    chunks, padded = _split(samples, sample_rate, chunk_s, overlap_s, audio_format)
+    client = get_async_openai_client()
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def transcribe(chunk: int, start: int, end: int) -> List[TranscriptionWord]:
+        async with semaphore:
+            # ffmpeg runs in a thread, encoding doesn't block the event loop
+            file = await asyncio.to_thread(
+                encode_audio, samples[start:end], sample_rate, audio_format
+            )
+            with trace_span(
+                "transcription",
+                "whisper-1",
+                chunk=chunk,
+                start_s=start / sample_rate,
+                end_s=end / sample_rate,
+            ):
+                transcript = await client.audio.transcriptions.create(
+                    file=file,
+                    model="whisper-1",
+                    language="pl",
+                    response_format="verbose_json",
+                    prompt=WHISPER_PROMPT,
+                    timestamp_granularities=["word"],
+                )
+
+        return transcript.words
+
+    chunk_words = await asyncio.gather(
+        *[transcribe(i, *r) for i, r in enumerate(padded)]
+    )
+
+    return _stitch(chunks, padded, chunk_words, sample_rate)
+
+
 # Example usage
 # api_key = "your-api-key-here"
 # transcription = transcribe_audio("path/to/your/audio.mp3", api_key)
@@ -0,0 +1,85 @@
+import hashlib
+import json
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from speech_grade import app as app_module
+from speech_grade.app import MAX_UPLOAD_BYTES, app, save_upload
+from speech_grade.disk_cache import DiskCache
+
+MULTIPART = {"content-type": "multipart/form-data; boundary=x"}
+
+
+@pytest.mark.parametrize(
+    "content_length, status_code",
+    [("abc", 400), ("", 400), (str(MAX_UPLOAD_BYTES + 1), 413)],
+)
+def test_upload_is_rejected_by_its_content_length(content_length, status_code):
+    response = TestClient(app).post(
+        "/analyze_video",
+        content=b"x",
+        headers={**MULTIPART, "content-length": content_length},
+    )
+
+    assert response.status_code == status_code
+
+
+def test_stored_analysis_doesnt_leak_the_first_video_name(monkeypatch, tmp_path):
+    cache = DiskCache(path=str(tmp_path / "cache.sqlite"), namespace="a", version="1")
+    cache.set("abc", json.dumps({"video_name": "first.mp4", "score": 7}))
+    monkeypatch.setattr(app_module, "result_cache", cache)
+    monkeypatch.setattr(app_module, "RESULT_CACHE_ENABLED", True)
+    client = TestClient(app)
+
+    assert client.get("/analysis/ABC").json() == {"score": 7}
+    assert client.get("/analysis/abc", params={"video_name": "mine.mp4"}).json() == {
+        "video_name": "mine.mp4",
+        "score": 7,
+    }
+
+
+@pytest.fixture
+def upload_client(tmp_path):
+    upload_app = FastAPI()
+
+    @upload_app.post("/upload")
+    async def upload(request: Request):
+        video_name, video_md5 = await save_upload(request, str(tmp_path / "video"))
+        return {"name": video_name, "md5": video_md5}
+
+    return TestClient(upload_app)
+
+
+def test_upload_is_written_as_it_arrives(upload_client, tmp_path):
+    video = b"\x00video" * 100_000
+    response = upload_client.post(
+        "/upload", data={"note": "x"}, files={"video": ("talk.mp4", video)}
+    )
+
+    assert response.json() == {
+        "name": "talk.mp4",
+        "md5": hashlib.md5(video).hexdigest(),
+    }
+    assert (tmp_path / "video").read_bytes() == video
+
+
+def test_upload_without_content_length_is_limited(upload_client, monkeypatch):
+    monkeypatch.setattr(app_module, "MAX_UPLOAD_BYTES", 1000)
+    body = (
+        b'--x\r\nContent-Disposition: form-data; name="video"; filename="a.mp4"\r\n\r\n'
+        + b"\x00" * 2000
+        + b"\r\n--x--\r\n"
+    )
+
+    def chunked():
+        yield from (body[i : i + 100] for i in range(0, len(body), 100))
+
+    response = upload_client.post("/upload", content=chunked(), headers=MULTIPART)
+
+    assert response.status_code == 413
+
+
+def test_upload_without_the_video_is_rejected(upload_client):
+    response = upload_client.post("/upload", data={"note": "x"}, files={"other": b"x"})
+
+    assert response.status_code == 422
@@ -0,0 +1,46 @@
+import pytest
+from openai.types.audio import TranscriptionWord
+from speech_grade.pipeline.graph import step_calculate_speech_speed
+from speech_grade.pipeline.prompts.detect_audio_problems import split_into_windows
+from speech_grade.pipeline.tools.disfluencies import find_repetitions
+from speech_grade.pipeline.transcript import Transcript
+
+
+def transcript(words: int, spacing_s: float, length_s: float) -> Transcript:
+    return Transcript.from_words(
+        [
+            TranscriptionWord(
+                word="słowo", start=i * spacing_s, end=i * spacing_s + length_s
+            )
+            for i in range(words)
+        ]
+    )
+
+
+def test_speech_speed_of_a_short_transcript():
+    result = step_calculate_speech_speed({"transcript": transcript(3, 0.3, 0.25)})
+
+    assert len(result["words_per_minute"]) == 1
+    assert result["events"] == []
+
+
+def test_windows_overlapping_whole_windows_are_rejected():
+    with pytest.raises(ValueError):
+        split_into_windows(transcript(10, 0.3, 0.25), 5, 5)
+
+    windows = split_into_windows(transcript(10, 0.3, 0.25), 5, 2)
+    assert [len(window) for window in windows] == [5, 5, 4]
+
+
+def test_overused_phrases_are_reported_once_per_occurrence():
+    words = [
+        TranscriptionWord(word=word, start=i, end=i + 0.5)
+        for i, word in enumerate(("dobry plan " * 5 + "koniec").split())
+    ]
+    repetitions = find_repetitions(Transcript.from_words(words))
+
+    assert len(repetitions) == len(set(repetitions))
+    assert repetitions == sorted(repetitions)
+
+    with pytest.raises(ValueError):
+        find_repetitions(Transcript.from_words(words), min_count=1)
@@ -0,0 +1,30 @@
+import asyncio
+import os
+from speech_grade.jobs import JobQueue
+
+
+def test_stop_fails_unfinished_jobs(tmp_path):
+    async def run(video_name, temp_dir, video_path, video_md5):
+        await asyncio.sleep(60)
+
+    async def submit_and_stop():
+        queue = JobQueue(run, workers=1, max_queued=4)
+        queue.start()
+
+        jobs = []
+        for i in range(3):
+            temp_dir = tmp_path / str(i)
+            temp_dir.mkdir()
+            jobs.append(queue.submit("video", str(temp_dir), "", ""))
+
+        # Let the worker pick up the first job
+        await asyncio.sleep(0)
+        await queue.stop()
+
+        return jobs
+
+    jobs = asyncio.run(submit_and_stop())
+
+    assert [job["status"] for job in jobs] == ["failed"] * 3
+    assert all(job["finished_at"] is not None for job in jobs)
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,15 @@
+import asyncio
+from speech_grade.pipeline.llm import LoopLocalTransport
+
+
+def test_every_event_loop_gets_its_own_pool():
+    transport = LoopLocalTransport()
+
+    async def pools():
+        return transport._transport(), transport._transport()
+
+    first, same = asyncio.run(pools())
+    second, _ = asyncio.run(pools())
+
+    assert first is same
+    assert first is not second
@@ -0,0 +1,96 @@
+import asyncio
+import json
+import pytest
+from langchain_core.exceptions import OutputParserException
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.output_parsers import PydanticOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+from speech_grade.disk_cache import DiskCache
+from speech_grade.pipeline import llm
+from speech_grade.pipeline.llm_cache import cached_chain
+from speech_grade.pipeline.prompts import classify_images
+
+VALID_ANSWER = json.dumps({"problems_list": ["wrong_posture"]})
+FRAME = {"start_s": 0.0, "end_s": 2.0, "image": b"\xff\xd8\xff\xd9"}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return DiskCache(path=str(tmp_path / "cache.sqlite"), namespace="llm", version="1")
+
+
+def build_chain(responses):
+    parser = PydanticOutputParser(pydantic_object=classify_images.FrameProblems)
+    prompt = ChatPromptTemplate.from_messages([("user", "{question}")])
+
+    return prompt | FakeListChatModel(responses=responses) | parser
+
+
+def test_parsed_result_is_cached(cache):
+    chain = cached_chain(build_chain([VALID_ANSWER, "not json"]), "test", cache)
+
+    first = chain.invoke({"question": "?"})
+    second = chain.invoke({"question": "?"})
+
+    assert first == second
+    assert first.problems_list == ["wrong_posture"]
+    assert cache.stats()["entries"] == 1
+
+
+def test_bad_answer_is_not_cached(cache):
+    chain = cached_chain(build_chain(["not json", VALID_ANSWER]), "test", cache)
+
+    with pytest.raises(OutputParserException):
+        chain.invoke({"question": "?"})
+    assert cache.stats()["entries"] == 0
+
+    # The retry calls the model again instead of replaying the bad answer
+    assert chain.invoke({"question": "?"}).problems_list == ["wrong_posture"]
+    assert cache.stats()["entries"] == 1
+
+
+def test_bad_answer_is_not_cached_async(cache):
+    chain = cached_chain(build_chain(["not json", VALID_ANSWER]), "test", cache)
+
+    with pytest.raises(OutputParserException):
+        asyncio.run(chain.ainvoke({"question": "?"}))
+    assert cache.stats()["entries"] == 0
+
+    result = asyncio.run(chain.ainvoke({"question": "?"}))
+    assert result.problems_list == ["wrong_posture"]
+
+
+@pytest.mark.parametrize(
+    "bad_answer",
+    ["I can't help with that.", json.dumps({"problems_list": ["unknown_class"]})],
+)
+def test_classify_image_does_not_cache_bad_answer(monkeypatch, cache, bad_answer):
+    model = FakeListChatModel(
+        responses=[bad_answer, "```json\n" + VALID_ANSWER + "\n```"]
+    )
+    monkeypatch.setattr(classify_images, "get_chat_model", lambda *_, **__: model)
+    monkeypatch.setattr(llm, "get_llm_cache", lambda: cache)
+    llm.clear_chains()
+
+    try:
+        with pytest.raises(OutputParserException):
+            classify_images.classify_image(FRAME)
+
+        events = classify_images.classify_image(FRAME)
+    finally:
+        llm.clear_chains()
+
+    assert [event["event"] for event in events] == ["Zła postawa / gestykulacja"]
+    assert cache.stats()["entries"] == 1
+
+
+def test_other_versions_keep_their_entries(cache, tmp_path):
+    cache.set("key", "old")
+    new_cache = DiskCache(
+        path=str(tmp_path / "cache.sqlite"), namespace="llm", version="2"
+    )
+    new_cache.set("other", "new")
+
+    assert new_cache.get("key") is None
+    assert cache.get("key") == "old"
+    assert cache.get("other") is None
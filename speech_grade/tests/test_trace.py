@@ -0,0 +1,59 @@
+import asyncio
+import pytest
+from langchain_core.runnables import RunnableLambda
+from langchain_core.runnables.config import ContextThreadPoolExecutor
+from speech_grade.pipeline.trace import TraceCallbackHandler, trace_event, trace_span
+
+
+def spans(tracer: TraceCallbackHandler, cat: str):
+    return [
+        event
+        for event in tracer.to_chrome_trace()["traceEvents"]
+        if event.get("cat") == cat
+    ]
+
+
+def test_spans_of_worker_threads_are_recorded():
+    def run(_):
+        def request(chunk: int):
+            with trace_span("transcription", "whisper-1", chunk=chunk):
+                return chunk
+
+        with ContextThreadPoolExecutor(max_workers=2) as executor:
+            return list(executor.map(request, [0, 1, 2]))
+
+    tracer = TraceCallbackHandler()
+    RunnableLambda(run).invoke(None, {"callbacks": [tracer]})
+
+    recorded = spans(tracer, "transcription")
+    assert sorted(span["args"]["chunk"] for span in recorded) == [0, 1, 2]
+    assert all(span["ph"] == "X" and span["dur"] >= 0 for span in recorded)
+
+
+def test_failed_span_records_the_error():
+    def run(_):
+        with trace_span("transcription", "whisper-1"):
+            raise ValueError("rate limited")
+
+    tracer = TraceCallbackHandler()
+    with pytest.raises(ValueError):
+        RunnableLambda(run).invoke(None, {"callbacks": [tracer]})
+
+    [span] = spans(tracer, "transcription")
+    assert "rate limited" in span["args"]["error"]
+
+
+def test_events_of_async_runs_are_recorded():
+    async def run(_):
+        trace_event("llm_cache", "chain", hit=True)
+
+    tracer = TraceCallbackHandler()
+    asyncio.run(RunnableLambda(run).ainvoke(None, {"callbacks": [tracer]}))
+
+    [event] = spans(tracer, "llm_cache")
+    assert event["ph"] == "i" and event["args"]["hit"] is True
+
+
+def test_nothing_is_recorded_outside_of_a_run():
+    with trace_span("transcription", "whisper-1"):
+        trace_event("llm_cache", "chain")
@@ -0,0 +1,42 @@
+import asyncio
+import numpy as np
+import pytest
+from speech_grade import transcription
+
+SAMPLE_RATE = 16000
+SAMPLES = np.zeros(5 * SAMPLE_RATE, dtype=np.int16)
+
+
+class FailingClient:
+    class audio:
+        class transcriptions:
+            @staticmethod
+            def create(**kwargs):
+                raise ConnectionError("API unreachable")
+
+
+class AsyncFailingClient:
+    class audio:
+        class transcriptions:
+            @staticmethod
+            async def create(**kwargs):
+                raise ConnectionError("API unreachable")
+
+
+def test_chunks_over_the_upload_limit_are_rejected():
+    with pytest.raises(ValueError):
+        transcription.transcribe_chunked(SAMPLES, SAMPLE_RATE, chunk_s=800)
+
+
+def test_failed_chunk_raises(monkeypatch):
+    monkeypatch.setattr(transcription, "get_openai_client", FailingClient)
+
+    with pytest.raises(ConnectionError):
+        transcription.transcribe_chunked(SAMPLES, SAMPLE_RATE, chunk_s=2)
+
+
+def test_failed_chunk_raises_async(monkeypatch):
+    monkeypatch.setattr(transcription, "get_async_openai_client", AsyncFailingClient)
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(transcription.atranscribe_chunked(SAMPLES, SAMPLE_RATE, chunk_s=2))
@@ -78,7 +78,12 @@ const VideoPlayerWithTimeline = forwardRef(({ setIsLoading: setParentIsLoading }
         if (has_inference(videoId, inferences)) {
           response_data = get_inference_by_id(videoId, inferences);
         } else {
-          const response = await axios.post(`${serverAddress}/analyze_video`, formData, {
+          // Ask the server whether it already analyzed this video before uploading it
+          const cached = await axios.get(`${serverAddress}/analysis/${videoId}`, {
+            validateStatus: status => status === 200 || status === 404,
+          });
+
+          const response = cached.status === 200 ? cached : await axios.post(`${serverAddress}/analyze_video`, formData, {
             headers: { 'Content-Type': 'multipart/form-data' },
           });
           response_data = response.data;